@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+MODES = ('record', 'replay', 'off')
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a prompt was never recorded"""
+
+def prompt_key(model_name: str, prompt: str) -> str:
+    """Cassette key: SHA-256 of the model name and prompt (prompts themselves are not stored)"""
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode('utf-8')).hexdigest()
+
+class LLMCassette:
+    """
+    Record/replay store for LLM calls, keyed on a hash of (model name, prompt).
+    In 'record' mode every live call is made and its response text and latency are appended to the
+    cassette (one JSON line per call, so a crashed run keeps what it recorded). In 'replay' mode
+    responses are served from the cassette without touching the network, optionally sleeping for the
+    recorded latency; an unknown prompt raises CassetteMiss. 'off' always calls the model.
+    """
+
+    def __init__(self, path: str, mode: str = 'replay', replay_latency: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Truncated last line of an interrupted recording
+                self._entries[entry['k']] = (entry['r'], entry['l'])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def generate(self, model_name: str, prompt: str, call: Callable[[], str]) -> str:
+        """
+        Return the response text for a prompt, calling `call()` for the live model when needed.
+        Args:
+            model_name (str): Model the prompt is sent to (part of the key).
+            prompt (str): Full prompt text.
+            call (Callable[[], str]): Makes the live call and returns the response text.
+        Returns:
+            str: Live or recorded response text.
+        """
+        if self.mode == 'off':
+            return call()
+        key = prompt_key(model_name, prompt)
+        if self.mode == 'replay':
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {model_name} prompt {key[:12]}")
+            self.hits += 1
+            text, latency = entry
+            if self.replay_latency and latency > 0:
+                time.sleep(latency)
+            return text
+        start = time.perf_counter()
+        text = call()
+        self.record(key, text, time.perf_counter() - start)
+        return text
+
+    def record(self, key: str, text: str, latency: float):
+        """Store one response (the latest recording of a key wins)"""
+        line = json.dumps({'k': key, 'r': text, 'l': round(latency, 4)}, separators=(',', ':'))
+        with self._lock:
+            self._entries[key] = (text, latency)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            self.recorded += 1
+
+    def compact(self):
+        """Rewrite the cassette with one line per key, dropping superseded recordings"""
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for key, (text, latency) in self._entries.items():
+                    f.write(json.dumps({'k': key, 'r': text, 'l': round(latency, 4)}, separators=(',', ':')) + '\n')
+            os.replace(tmp_path, self.path)
+
+def cassette_from_env() -> Optional[LLMCassette]:
+    """
+    Cassette configured through the environment, or None:
+    LLM_CASSETTE (path), LLM_CASSETTE_MODE ('record' or 'replay', default 'replay') and
+    LLM_CASSETTE_LATENCY ('1' to replay recorded latencies).
+    """
+    path = os.environ.get('LLM_CASSETTE')
+    if not path:
+        return None
+    return LLMCassette(path, os.environ.get('LLM_CASSETTE_MODE', 'replay'),
+                       replay_latency=os.environ.get('LLM_CASSETTE_LATENCY') == '1')
+
+_default = None
+_default_loaded = False
+
+def default_cassette() -> Optional[LLMCassette]:
+    """Process-wide cassette from cassette_from_env(), loaded on first use"""
+    global _default, _default_loaded
+    if not _default_loaded:
+        _default = cassette_from_env()
+        _default_loaded = True
+    return _default
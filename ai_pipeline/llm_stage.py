@@ -1,11 +1,61 @@
-def extract_kpis_with_llm(text: str) -> list[dict]:
+import json
+import os
+from typing import Optional
+
+from lazy_imports import optional_lazy_import
+from ai_pipeline.llm_cassette import LLMCassette, default_cassette
+
+genai = optional_lazy_import('google.generativeai')
+
+KPI_EXTRACTION_PROMPT = (
+    "Extract Environmental, Social, and Governance (ESG) KPIs from the report text below. "
+    "Return a single JSON object with the keys \"environmental\", \"social\" and \"governance\", each an "
+    "array of objects with the fields \"name\", \"value\", \"metric_type\", \"year\" and \"reference\". "
+    "Output only the JSON object."
+)
+
+def generate_text(prompt: str, model_name: str = 'gemini-1.5-pro', cassette: Optional[LLMCassette] = None) -> str:
+    """
+    Send a prompt to a Gemini model and return the response text.
+    Args:
+        prompt (str): Full prompt text.
+        model_name (str): Gemini model name.
+        cassette (LLMCassette, optional): Record/replay store; defaults to the one configured
+            through LLM_CASSETTE, if any.
+    Returns:
+        str: Response text.
+    """
+    def call() -> str:
+        if not genai:
+            raise ImportError("google-generativeai is required for the LLM stage. Please install it.")
+        if os.environ.get('GEMINI_API_KEY'):
+            genai.configure(api_key=os.environ['GEMINI_API_KEY'])
+        return genai.GenerativeModel(model_name).generate_content(prompt).text
+
+    cassette = cassette if cassette is not None else default_cassette()
+    if cassette is None:
+        return call()
+    return cassette.generate(model_name, prompt, call)
+
+def extract_kpis_with_llm(text: str, model_name: str = 'gemini-1.5-pro',
+                          cassette: Optional[LLMCassette] = None) -> list[dict]:
     """
     Use an LLM to extract ESG KPIs from text.
     Args:
         text (str): Input text.
+        model_name (str): Gemini model name.
+        cassette (LLMCassette, optional): Record/replay store, see generate_text.
     Returns:
-        list[dict]: List of extracted KPIs (stub).
-    Note:
-        For real implementation, use Gemini, GPT, or similar LLM APIs.
+        list[dict]: List of extracted KPIs, each with a 'category' key.
     """
-    raise NotImplementedError("LLM-based KPI extraction requires Gemini, GPT, or similar. This is a stub.")
+    result = generate_text(f"{KPI_EXTRACTION_PROMPT}\n\nReport Text:\n{text}", model_name, cassette).strip()
+    if result.startswith('```'):
+        result = result.split('\n', 1)[-1]
+    if result.endswith('```'):
+        result = result[:-3]
+    data = json.loads(result)
+    return [
+        {**kpi, 'category': category}
+        for category in ('environmental', 'social', 'governance')
+        for kpi in data.get(category, [])
+    ]
@@ -1,20 +1,89 @@
-try:
-    import spacy
-except ImportError:
-    spacy = None
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-def extract_entities(text: str) -> list[dict]:
+from lazy_imports import optional_lazy_import, register_warmup
+
+spacy = optional_lazy_import('spacy')
+
+DEFAULT_MODEL = 'en_core_web_sm'
+# Components of the standard English pipelines that named entity recognition does not use
+NER_EXCLUDE = ('tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'senter', 'morphologizer')
+
+_models: Dict[Tuple[str, Tuple[str, ...], Tuple[str, ...]], Any] = {}
+_models_lock = threading.Lock()
+
+def get_nlp(model: str = DEFAULT_MODEL, exclude: Sequence[str] = NER_EXCLUDE, disable: Sequence[str] = ()):
+    """
+    Load a spaCy pipeline once per process and return the cached instance afterwards.
+    Args:
+        model (str): Package name or path of the spaCy pipeline.
+        exclude (Sequence[str]): Components not loaded at all (faster load, less memory).
+        disable (Sequence[str]): Components loaded but not run.
+    Returns:
+        spacy.language.Language: Cached pipeline for this (model, exclude, disable) combination.
+    """
+    if not spacy:
+        raise ImportError("spaCy is required for NLP. Please install it.")
+    key = (model, tuple(sorted(exclude)), tuple(sorted(disable)))
+    nlp = _models.get(key)
+    if nlp is None:
+        with _models_lock:
+            nlp = _models.get(key)
+            if nlp is None:
+                nlp = _models[key] = spacy.load(model, exclude=list(exclude), disable=list(disable))
+    return nlp
+
+def clear_model_cache():
+    """Drop cached pipelines (e.g. after installing a new model version)"""
+    with _models_lock:
+        _models.clear()
+
+def _entities(doc, labels: Optional[Sequence[str]]) -> List[Dict[str, str]]:
+    return [{"text": ent.text, "label": ent.label_} for ent in doc.ents if labels is None or ent.label_ in labels]
+
+def extract_entities(text: str, model: str = DEFAULT_MODEL) -> list[dict]:
     """
     Extract named entities from text using spaCy.
     Args:
         text (str): Input text.
+        model (str): spaCy pipeline, loaded once per process (see get_nlp).
     Returns:
         list[dict]: List of entities with type and text.
     Note:
         This is a placeholder for more advanced metric extraction.
     """
-    if not spacy:
-        raise ImportError("spaCy is required for NLP. Please install it.")
-    nlp = spacy.load('en_core_web_sm')
-    doc = nlp(text)
-    return [{"text": ent.text, "label": ent.label_} for ent in doc.ents]
+    return _entities(get_nlp(model)(text), None)
+
+def iter_entities(texts: Iterable[Any], batch_size: int = 256, n_process: int = 1, model: str = DEFAULT_MODEL,
+                  labels: Optional[Sequence[str]] = None, as_tuples: bool = False) -> Iterator[Any]:
+    """
+    Stream entities for many texts through nlp.pipe, yielding one result per text in input order.
+    Args:
+        texts (Iterable): Texts, or (text, context) pairs when as_tuples is True; consumed lazily.
+        batch_size (int): Texts per batch handed to the pipeline.
+        n_process (int): Worker processes used by nlp.pipe (1 runs in this process).
+        model (str): spaCy pipeline, loaded once per process (see get_nlp).
+        labels (Sequence[str], optional): Keep only these entity labels (e.g. ['ORG', 'PERCENT']).
+        as_tuples (bool): Pass a context object through with each text.
+    Yields:
+        list[dict]: Entities of each text, or (entities, context) when as_tuples is True.
+    """
+    nlp = get_nlp(model)
+    labels = set(labels) if labels is not None else None
+    if as_tuples:
+        for doc, context in nlp.pipe(texts, batch_size=batch_size, n_process=n_process, as_tuples=True):
+            yield _entities(doc, labels), context
+    else:
+        for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+            yield _entities(doc, labels)
+
+def extract_entities_batch(texts: Iterable[str], batch_size: int = 256, n_process: int = 1,
+                           model: str = DEFAULT_MODEL, labels: Optional[Sequence[str]] = None) -> List[List[dict]]:
+    """
+    Extract entities from many texts at once (see iter_entities for the arguments).
+    Returns:
+        List[list[dict]]: Entities per input text, in input order.
+    """
+    return list(iter_entities(texts, batch_size, n_process, model, labels))
+
+register_warmup('spacy_model', get_nlp)
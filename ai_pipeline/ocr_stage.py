@@ -1,9 +1,17 @@
-try:
-    import pytesseract
-    from PIL import Image
-except ImportError:
-    pytesseract = None
-    Image = None
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from lazy_imports import lazy_import, optional_lazy_import
+
+pytesseract = optional_lazy_import('pytesseract')
+Image = optional_lazy_import('PIL.Image')
+pdfplumber = lazy_import('pdfplumber')
+
+BBox = Tuple[float, float, float, float]  # (x0, top, x1, bottom) in PDF points, as in pdfplumber
+TABLE_CONFIG = '--psm 6 -c preserve_interword_spaces=1'  # One uniform block: keeps table rows on one line
 
 def ocr_image(image_path: str) -> str:
     """
@@ -19,3 +27,114 @@ def ocr_image(image_path: str) -> str:
         raise ImportError("pytesseract and Pillow are required for OCR. Please install them.")
     img = Image.open(image_path)
     return pytesseract.image_to_string(img)
+
+class OcrCache:
+    """
+    OCR text cached on disk by a hash of the page image and OCR settings, one small file per entry.
+    Writes go through a temp file and rename, so concurrent worker processes can share a directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, text: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+def image_key(image, lang: str = 'eng', config: str = '') -> str:
+    """Cache key of a rendered page image: SHA-256 of its pixels, size, mode and the OCR settings"""
+    digest = hashlib.sha256(f"{image.mode}|{image.size}|{lang}|{config}|".encode('utf-8'))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def render_page(page, resolution: int = 300, bbox: Optional[BBox] = None):
+    """Rasterize a pdfplumber page (or a region of it) to a grayscale PIL image"""
+    region = page.crop(bbox) if bbox is not None else page
+    return region.to_image(resolution=resolution).original.convert('L')
+
+def pages_without_text(pdf_path: str, min_chars: int = 20) -> List[int]:
+    """Zero-based numbers of pages with fewer than `min_chars` characters in their text layer"""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [i for i, page in enumerate(pdf.pages) if len(page.chars) < min_chars]
+
+def _ocr_page_batch(pdf_path: str, pages: Sequence[int], resolution: int, regions: Optional[Sequence[BBox]],
+                    lang: str, config: str, cache_dir: Optional[str]) -> List[Dict]:
+    """Worker: render and OCR a batch of pages of one PDF (opened once per batch)"""
+    cache = OcrCache(cache_dir) if cache_dir else None
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for number in pages:
+            page = pdf.pages[number]
+            texts, render_s, ocr_s, cached = [], 0.0, 0.0, True
+            for bbox in regions or [None]:
+                start = time.perf_counter()
+                image = render_page(page, resolution, bbox)
+                key = image_key(image, lang, config)
+                render_s += time.perf_counter() - start
+                text = cache.get(key) if cache else None
+                if text is None:
+                    if not pytesseract:
+                        raise ImportError("pytesseract is required for OCR. Please install it.")
+                    cached = False
+                    start = time.perf_counter()
+                    text = pytesseract.image_to_string(image, lang=lang, config=config)
+                    ocr_s += time.perf_counter() - start
+                    if cache:
+                        cache.set(key, text)
+                texts.append(text)
+            results.append({'page': number, 'text': '\n'.join(t.strip() for t in texts), 'cached': cached,
+                            'render_s': render_s, 'ocr_s': ocr_s})
+    return results
+
+def ocr_pdf_pages(pdf_path: str, pages: Optional[Sequence[int]] = None, resolution: int = 300,
+                  max_workers: Optional[int] = None, batch_size: int = 4, cache_dir: Optional[str] = None,
+                  regions: Optional[Sequence[BBox]] = None, table_mode: bool = False, lang: str = 'eng',
+                  config: str = '', min_chars: int = 20) -> List[Dict]:
+    """
+    OCR the pages of a PDF in parallel, skipping pages that already have a text layer by default.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        pages (Sequence[int], optional): Zero-based pages to OCR; defaults to pages_without_text().
+        resolution (int): Rasterization DPI.
+        max_workers (int, optional): Worker processes (default: CPU count); 1 runs in this process.
+        batch_size (int): Pages per worker task (each task opens the PDF once).
+        cache_dir (str, optional): OcrCache directory; a page image OCRed before is not OCRed again.
+        regions (Sequence[BBox], optional): Only OCR these regions of each page, e.g. a table's bbox.
+        table_mode (bool): Use Tesseract settings that keep table rows and column spacing.
+        lang (str): Tesseract language(s).
+        config (str): Extra Tesseract options (overrides table_mode's).
+        min_chars (int): Text layer threshold used when `pages` is not given.
+    Returns:
+        List[dict]: Per page, in page order: page, text, cached, render_s and ocr_s.
+    """
+    if pages is None:
+        pages = pages_without_text(pdf_path, min_chars)
+    pages = sorted(pages)
+    if not pages:
+        return []
+    config = config or (TABLE_CONFIG if table_mode else '')
+    batches = [pages[i:i + batch_size] for i in range(0, len(pages), batch_size)]
+    args = (resolution, regions, lang, config, cache_dir)
+    workers = min(max_workers or os.cpu_count() or 1, len(batches))
+    if workers <= 1:
+        results = [r for batch in batches for r in _ocr_page_batch(pdf_path, batch, *args)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_ocr_page_batch, pdf_path, batch, *args) for batch in batches]
+            results = [r for future in futures for r in future.result()]
+    return results
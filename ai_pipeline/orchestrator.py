@@ -0,0 +1,517 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+POOLS = ('thread', 'process')
+_POLL_S = 0.1  # How often a worker blocked on a queue checks whether the run was stopped
+
+class Stage:
+    """
+    One step of a Pipeline. Its function is called with the outputs of the stages in `after`, in that
+    order (a stage without dependencies gets the pipeline input), and returns the stage's output.
+    Args:
+        name (str): Unique stage name; results hold the output under it.
+        fn (Callable): The work. With pool='process' it must be picklable: a module-level function
+            or a functools.partial of one.
+        after (Sequence[str]): Stages whose outputs this one takes.
+        pool (str): 'thread' for I/O and model calls, 'process' for CPU-bound work (arguments and
+            outputs are pickled to and from a ProcessPoolExecutor of `workers` processes).
+        workers (int): Calls of this stage running at once.
+        queue_size (int, optional): Capacity of the stage's input queue (default: the Pipeline's).
+        keep (bool): Return the output with each result. Otherwise it is dropped as soon as every
+            dependent stage has taken it, e.g. a parsed Document.
+    """
+
+    def __init__(self, name: str, fn: Callable[..., Any], after: Sequence[str] = (), pool: str = 'thread',
+                 workers: int = 1, queue_size: Optional[int] = None, keep: bool = True):
+        if pool not in POOLS:
+            raise ValueError(f"Unknown pool {pool!r} for stage {name!r}; use one of {POOLS}")
+        if workers < 1:
+            raise ValueError(f"Stage {name!r} needs at least one worker")
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.pool = pool
+        self.workers = workers
+        self.queue_size = queue_size
+        self.keep = keep
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r}, after={self.after}, pool={self.pool!r}, workers={self.workers})"
+
+class StageStats:
+    """Counters of one stage over a run; as_dict() derives throughput and utilization"""
+
+    def __init__(self, stage: Stage):
+        self.pool = stage.pool
+        self.workers = stage.workers
+        self.done = self.failed = 0
+        self.busy_s = self.wait_s = self.blocked_s = 0.0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+        self.max_queue = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        calls = self.done + self.failed
+        span = self.last_end - self.first_start if calls else 0.0
+        return {
+            'pool': self.pool,
+            'workers': self.workers,
+            'done': self.done,
+            'failed': self.failed,
+            'items_per_s': self.done / span if span > 0 else 0.0,
+            'mean_s': self.busy_s / calls if calls else 0.0,
+            'busy_s': self.busy_s,
+            # Share of the stage's active span its workers were busy: near 1 marks the bottleneck
+            'utilization': self.busy_s / (self.workers * span) if span > 0 else 0.0,
+            'mean_wait_s': self.wait_s / calls if calls else 0.0,
+            # Time upstream stages spent waiting for room in this stage's full input queue
+            'blocked_s': self.blocked_s,
+            'max_queue': self.max_queue,
+        }
+
+class _Item:
+    """One input on its way through the stages"""
+    __slots__ = ('index', 'value', 'outputs', 'waiting', 'consumers', 'running', 'error', 'seconds')
+
+    def __init__(self, index: int, value: Any, pipeline: 'Pipeline'):
+        self.index = index
+        self.value = value
+        self.outputs: Dict[str, Any] = {}
+        self.waiting = {name: len(stage.after) for name, stage in pipeline.stages.items()}
+        self.consumers = {name: len(dependents) for name, dependents in pipeline.dependents.items()}
+        self.running = 0
+        self.error: Optional[Dict[str, Any]] = None
+        self.seconds: Dict[str, float] = {}
+
+def _topological_order(stages: Dict[str, Stage]) -> List[Stage]:
+    waiting = {name: len(stage.after) for name, stage in stages.items()}
+    ready = [name for name, count in waiting.items() if not count]
+    order = []
+    while ready:
+        name = ready.pop(0)
+        order.append(stages[name])
+        for other in stages.values():
+            if name in other.after:
+                waiting[other.name] -= 1
+                if not waiting[other.name]:
+                    ready.append(other.name)
+    if len(order) < len(stages):
+        raise ValueError(f"Stages form a cycle: {sorted(set(stages) - {stage.name for stage in order})}")
+    return order
+
+def _process_context():
+    # Pools start their processes while stage threads run, and forking a threaded process can deadlock the child
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+class _Run:
+    """Queues, worker threads and process pools of one Pipeline.run"""
+
+    def __init__(self, pipeline: 'Pipeline', max_in_flight: int):
+        self.pipeline = pipeline
+        self.stats = {name: StageStats(stage) for name, stage in pipeline.stages.items()}
+        self.queues = {name: queue.Queue(stage.queue_size or pipeline.queue_size)
+                       for name, stage in pipeline.stages.items()}
+        self.executors = {name: ProcessPoolExecutor(stage.workers, mp_context=_process_context())
+                          for name, stage in pipeline.stages.items() if stage.pool == 'process'}
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.out: queue.Queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+    def start(self, inputs: Iterator[Any]):
+        for stage in self.pipeline.order:
+            for i in range(stage.workers):
+                self.threads.append(threading.Thread(target=self._work, args=(stage,), daemon=True,
+                                                     name=f"pipeline-{stage.name}-{i}"))
+        self.threads.append(threading.Thread(target=self._feed, args=(inputs,), daemon=True, name="pipeline-feed"))
+        for thread in self.threads:
+            thread.start()
+
+    def close(self):
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+        for executor in self.executors.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _put(self, name: str, entry: Tuple[_Item, float]):
+        """Enqueue for a stage, blocking while its queue is full (backpressure on the caller)"""
+        inbox, stats = self.queues[name], self.stats[name]
+        blocked_s = 0.0
+        try:
+            inbox.put_nowait(entry)
+        except queue.Full:
+            started = time.perf_counter()
+            while not self.stop.is_set():
+                try:
+                    inbox.put(entry, timeout=_POLL_S)
+                    break
+                except queue.Full:
+                    continue
+            blocked_s = time.perf_counter() - started
+        with self.lock:
+            stats.blocked_s += blocked_s
+            stats.max_queue = max(stats.max_queue, inbox.qsize())
+
+    def _feed(self, inputs: Iterator[Any]):
+        count = 0
+        try:
+            while True:
+                # Take the next input only once there is room for it
+                while not self.slots.acquire(timeout=_POLL_S):
+                    if self.stop.is_set():
+                        return
+                try:
+                    value = next(inputs)
+                except StopIteration:
+                    break
+                item = _Item(count, value, self.pipeline)
+                count += 1
+                item.running = len(self.pipeline.roots)
+                for name in self.pipeline.roots:
+                    self._put(name, (item, time.perf_counter()))
+                if self.stop.is_set():
+                    return
+        except Exception as e:
+            self.out.put(('error', e))
+            return
+        self.out.put(('fed', count))
+
+    def _take_inputs(self, item: _Item, stage: Stage) -> Tuple[Any, ...]:
+        if not stage.after:
+            return (item.value,)
+        stages = self.pipeline.stages
+        with self.lock:
+            args = tuple(item.outputs[name] for name in stage.after)
+            for name in stage.after:
+                item.consumers[name] -= 1
+                if not item.consumers[name] and not stages[name].keep:
+                    del item.outputs[name]
+        return args
+
+    def _call(self, stage: Stage, args: Tuple[Any, ...]) -> Any:
+        if stage.pool == 'thread':
+            return stage.fn(*args)
+        executor = self.executors[stage.name]
+        try:
+            return executor.submit(stage.fn, *args).result()
+        except BrokenProcessPool:
+            # A worker process died; the next call of this stage gets a new pool
+            with self.lock:
+                if self.executors[stage.name] is executor:
+                    self.executors[stage.name] = ProcessPoolExecutor(stage.workers, mp_context=_process_context())
+            executor.shutdown(wait=False)
+            raise
+
+    def _work(self, stage: Stage):
+        inbox, stats = self.queues[stage.name], self.stats[stage.name]
+        while not self.stop.is_set():
+            try:
+                item, queued = inbox.get(timeout=_POLL_S)
+            except queue.Empty:
+                continue
+            started = time.perf_counter()
+            output, error = None, None
+            try:
+                output = self._call(stage, self._take_inputs(item, stage))
+            except Exception as e:
+                error = {'stage': stage.name, 'type': type(e).__name__, 'message': str(e),
+                         'traceback': traceback.format_exc(limit=8)}
+            ended = time.perf_counter()
+            with self.lock:
+                stats.done += error is None
+                stats.failed += error is not None
+                stats.busy_s += ended - started
+                stats.wait_s += started - queued
+                stats.first_start = started if stats.first_start is None else min(stats.first_start, started)
+                stats.last_end = ended if stats.last_end is None else max(stats.last_end, ended)
+            self._finish(item, stage, output, error, ended - started)
+
+    def _finish(self, item: _Item, stage: Stage, output: Any, error: Optional[Dict[str, Any]], seconds: float):
+        ready = []
+        with self.lock:
+            item.running -= 1
+            item.seconds[stage.name] = seconds
+            if error is not None:
+                item.error = item.error or error
+            else:
+                dependents = self.pipeline.dependents[stage.name]
+                if stage.keep or dependents:
+                    item.outputs[stage.name] = output
+                if item.error is None:
+                    # Stages after a failed one are skipped; branches already running finish first
+                    for name in dependents:
+                        item.waiting[name] -= 1
+                        if not item.waiting[name]:
+                            ready.append(name)
+                    item.running += len(ready)
+            complete = not item.running
+        for name in ready:
+            self._put(name, (item, time.perf_counter()))
+        if complete:
+            self.out.put(('item', item))
+
+class Pipeline:
+    """
+    A DAG of stages that inputs (e.g. document paths) stream through one at a time.
+    Every stage has its own bounded input queue and its own workers: threads, or threads each feeding
+    one call at a time to the stage's process pool. A stage starts on an input as soon as all stages it
+    depends on are done with it, so independent branches run side by side. A full queue blocks the
+    stages feeding it, and at most `max_in_flight` inputs are taken from the input iterable before
+    their results have been consumed, so memory stays bounded however many inputs there are.
+    """
+
+    def __init__(self, stages: Sequence[Stage], queue_size: int = 8, max_in_flight: Optional[int] = None):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage {stage.name!r}")
+            self.stages[stage.name] = stage
+        for stage in stages:
+            unknown = [name for name in stage.after if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown stage(s) {unknown}")
+        self.order = _topological_order(self.stages)
+        self.dependents = {name: [stage.name for stage in self.order if name in stage.after] for name in self.stages}
+        self.roots = [stage.name for stage in self.order if not stage.after]
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight or 2 * sum(stage.workers for stage in stages)
+        self._stats: Optional[Dict[str, Any]] = None
+        self._running = False
+
+    def run(self, inputs: Iterable[Any], ordered: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream inputs through the stages, yielding each result as soon as its last stage is done.
+        A failing stage fails only that input. Stop iterating early to cancel the rest of the run.
+        Args:
+            inputs (Iterable): Consumed lazily, e.g. a generator over a directory.
+            ordered (bool): Yield results in input order (holds back finished results meanwhile).
+        Yields:
+            dict: index (position in inputs), input, outputs (per stage with keep=True that ran),
+            error (None, or the stage, type, message and traceback of the failure; later stages of
+            that input are skipped) and seconds (per stage that ran).
+        Raises:
+            Exception: Whatever iterating `inputs` raised.
+        """
+        if self._running:
+            raise RuntimeError("Pipeline is already running")
+        self._running = True
+        run = _Run(self, self.max_in_flight)
+        started = time.perf_counter()
+        emitted = failed = next_index = 0
+        total, held = None, {}
+        try:
+            run.start(iter(inputs))
+            while total is None or emitted < total:
+                kind, payload = run.out.get()
+                if kind == 'fed':
+                    total = payload
+                    continue
+                if kind == 'error':
+                    raise payload
+                if ordered:
+                    held[payload.index] = payload
+                    finished = []
+                    while next_index in held:
+                        finished.append(held.pop(next_index))
+                        next_index += 1
+                else:
+                    finished = [payload]
+                for item in finished:
+                    emitted += 1
+                    failed += item.error is not None
+                    result = {'index': item.index, 'input': item.value, 'error': item.error, 'seconds': item.seconds,
+                              'outputs': {name: value for name, value in item.outputs.items()
+                                          if self.stages[name].keep}}
+                    run.slots.release()
+                    yield result
+        finally:
+            run.close()
+            seconds = time.perf_counter() - started
+            self._stats = {'items': emitted, 'failed': failed, 'seconds': seconds,
+                           'items_per_s': emitted / seconds if seconds > 0 else 0.0,
+                           'stages': {stage.name: run.stats[stage.name].as_dict() for stage in self.order}}
+            self._running = False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Throughput of the last run, once it has finished or was cancelled.
+        Returns:
+            dict: items, failed, seconds, items_per_s and per stage (in DAG order) pool, workers, done,
+            failed, items_per_s, mean_s, busy_s, utilization, mean_wait_s, blocked_s and max_queue.
+        """
+        if self._stats is None:
+            raise RuntimeError("The pipeline has not run yet")
+        return self._stats
+
+    def format_stats(self) -> str:
+        """Per-stage throughput table of the last run"""
+        stats = self.stats()
+        lines = [f"{stats['items']} items ({stats['failed']} failed) in {stats['seconds']:.2f}s, "
+                 f"{stats['items_per_s']:.2f} items/s",
+                 f"{'stage':<12} {'pool':<8} {'workers':>7} {'done':>6} {'failed':>6} {'items/s':>8} "
+                 f"{'mean ms':>8} {'util':>6} {'wait ms':>8} {'blocked s':>9} {'max q':>5}"]
+        for name, stage in stats['stages'].items():
+            lines.append(f"{name:<12} {stage['pool']:<8} {stage['workers']:>7} {stage['done']:>6} "
+                         f"{stage['failed']:>6} {stage['items_per_s']:>8.2f} {stage['mean_s'] * 1000:>8.1f} "
+                         f"{stage['utilization'] * 100:>5.0f}% {stage['mean_wait_s'] * 1000:>8.1f} "
+                         f"{stage['blocked_s']:>9.2f} {stage['max_queue']:>5}")
+        return '\n'.join(lines)
+
+# Stage functions of the ESG extraction pipeline (module-level so process pools can unpickle them)
+
+def _no_llm(text: str) -> List[Dict[str, Any]]:
+    return []
+
+def ocr_document(doc, **ocr_options):
+    """
+    A PDF Document with the pages that have no text layer (scanned pages) OCRed in; other documents,
+    and PDFs without such pages, are returned as they are.
+    Args:
+        doc (Document): Parsed without OCR (see data_ingestion.dispatcher.load_document).
+        **ocr_options: Passed to ai_pipeline.ocr_stage.ocr_pdf_pages, e.g. resolution or cache_dir.
+    """
+    if doc.format != 'pdf':
+        return doc
+    empty = [number for number, start, end in zip(doc.page_number.tolist(), doc.page_start.tolist(),
+                                                   doc.page_end.tolist()) if start == end]
+    if not empty:
+        return doc
+    from ai_pipeline.ocr_stage import ocr_pdf_pages
+    from data_ingestion.document import DocumentBuilder
+    ocr_options.setdefault('max_workers', 1)  # The stage's process pool already runs documents in parallel
+    texts = {r['page'] + 1: r['text'] for r in ocr_pdf_pages(doc.source, pages=[n - 1 for n in empty], **ocr_options)}
+    builder = DocumentBuilder(doc.source, doc.format)
+    builder.meta.update(doc.meta, ocr_pages=len(texts))
+    for number in doc.page_number.tolist():
+        builder.add_page(number)
+        builder.add_text(texts.get(number, ''), page=number)
+        for i, text in doc.iter_blocks(page=number):
+            table, locator = int(doc.block_table[i]), int(doc.block_locator[i])
+            locator = doc.strings[locator] if locator >= 0 else None
+            if table < 0:
+                builder.add_text(text, page=number, locator=locator, split=False)
+            else:
+                bbox = doc.table_bbox[table]
+                builder.add_table(doc.table_rows(table), page=number, locator=locator,
+                                  bbox=None if np.isnan(bbox).any() else bbox.tolist())
+    return builder.build()
+
+def document_kpis(doc, llm: Optional[Callable[[str], List[Dict[str, Any]]]] = None,
+                  use_llm: bool = True) -> Dict[str, Any]:
+    """
+    KPIs of a Document: XBRL facts (meta['kpis']), KPI data tables (with their page) and the hybrid
+    rules/LLM extraction over the text blocks and the tables that are not KPI data.
+    Args:
+        doc (Document): See data_ingestion.dispatcher.load_document.
+        llm (Callable, optional): text -> KPI dicts (default: llm_stage.extract_kpis_with_llm).
+        use_llm (bool): False extracts with rules only.
+    Returns:
+        dict: 'kpis' and the 'coverage' of rule_stage.extract_kpis_hybrid.
+    """
+    from ai_pipeline.rule_stage import extract_kpis_hybrid, extract_table_kpis
+    from data_ingestion.dispatcher import XBRL_FACTS
+    kpis = list(doc.meta.get('kpis', []))
+    passages = []
+    for i, text in doc.iter_blocks():
+        table, locator = int(doc.block_table[i]), int(doc.block_locator[i])
+        if table < 0:
+            passages.append(text)
+            continue
+        if locator >= 0 and doc.strings[locator] == XBRL_FACTS:
+            continue
+        table_kpis = extract_table_kpis(doc.table_rows(table))
+        page = int(doc.block_page[i])
+        kpis.extend({**kpi, 'page': page if page > 0 else None} for kpi in table_kpis)
+        if not table_kpis:
+            passages.append(text)  # Not KPI data: the model may still make sense of it
+    hybrid = extract_kpis_hybrid('\n\n'.join(passages), llm if use_llm else _no_llm)
+    return {'kpis': kpis + hybrid['kpis'], 'coverage': hybrid['coverage']}
+
+def document_entities(doc, model: Optional[str] = None, labels: Optional[Sequence[str]] = None,
+                      batch_size: int = 64) -> List[Dict[str, Any]]:
+    """Named entities of the text blocks of a Document, each with its block index (see nlp_stage.iter_entities)"""
+    from ai_pipeline.nlp_stage import DEFAULT_MODEL, iter_entities
+    blocks = ((text, i) for i, text in doc.iter_blocks(kind='text'))
+    return [{**entity, 'block': i} for entities, i in iter_entities(blocks, batch_size, model=model or DEFAULT_MODEL,
+                                                                    labels=labels, as_tuples=True)
+            for entity in entities]
+
+def validate_kpis(extracted: Dict[str, Any]) -> Dict[str, Any]:
+    """Validated KPIs and their extraction metadata (see validation_utils)"""
+    from validation_utils import enhance_kpi_with_validation, generate_extraction_metadata
+    kpis = [enhance_kpi_with_validation(dict(kpi)) for kpi in extracted['kpis']]
+    return {'kpis': kpis, 'metadata': generate_extraction_metadata(kpis)}
+
+def qa_kpis(validated: Dict[str, Any]) -> Dict[str, Any]:
+    from qa.qa_checks import run_qa_checks
+    return run_qa_checks(validated['kpis'])
+
+_stores: Dict[str, Any] = {}
+
+def benchmark_kpis(validated: Dict[str, Any], industry: str, store_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Benchmark comparison of every validated KPI; a BenchmarkStore file is loaded once per process"""
+    from benchmarking.benchmark_store import BenchmarkStore
+    from benchmarking.benchmarks import compare_kpis_to_benchmark
+    store = None
+    if store_path:
+        store = _stores.get(store_path)
+        if store is None:
+            store = _stores[store_path] = BenchmarkStore.load(store_path)
+    return compare_kpis_to_benchmark(validated['kpis'], industry, store=store)
+
+def esg_stages(llm: Optional[Callable[[str], List[Dict[str, Any]]]] = None, use_llm: bool = True,
+               llm_concurrency: int = 4, workers: Optional[int] = None, ocr: bool = False,
+               ocr_options: Optional[Dict[str, Any]] = None, nlp_model: Optional[str] = None,
+               industry: Optional[str] = None, benchmark_store: Optional[str] = None,
+               load_options: Optional[Dict[str, Any]] = None) -> List[Stage]:
+    """
+    Stages of the ESG extraction pipeline, from a file path to validated, QA-checked KPIs:
+    parse -> ocr (optional) -> extract -> validate -> qa, with nlp (optional) next to extract and
+    benchmark (optional) next to qa. Parsing, OCR, NER, validation, QA and benchmarking are CPU-bound
+    and get process pools; extract mostly waits on the model, so it runs `llm_concurrency` threads.
+    Args:
+        llm (Callable, optional): text -> KPI dicts (default: llm_stage.extract_kpis_with_llm).
+        use_llm (bool): False extracts with rules only.
+        llm_concurrency (int): Model calls in flight at once.
+        workers (int, optional): Processes of the parse and OCR stages (default: CPU count).
+        ocr (bool): Add the OCR stage for scanned PDF pages; ocr_options go to ocr_stage.ocr_pdf_pages.
+        nlp_model (str, optional): Add the NER stage with this spaCy pipeline.
+        industry (str, optional): Add the benchmark stage for this industry (benchmark_store: a
+            BenchmarkStore file, otherwise the static benchmarks).
+        load_options (dict, optional): Passed to data_ingestion.dispatcher.load_document.
+    Returns:
+        List[Stage]: For Pipeline(); outputs kept are extract, validate, qa and nlp/benchmark if added.
+    """
+    from data_ingestion.dispatcher import load_document
+    workers = workers or os.cpu_count() or 1
+    text = 'ocr' if ocr else 'parse'
+    stages = [Stage('parse', partial(load_document, **(load_options or {})), pool='process', workers=workers,
+                    keep=False)]
+    if ocr:
+        stages.append(Stage('ocr', partial(ocr_document, **(ocr_options or {})), after=['parse'], pool='process',
+                            workers=workers, keep=False))
+    stages.append(Stage('extract', partial(document_kpis, llm=llm, use_llm=use_llm), after=[text],
+                        workers=llm_concurrency))
+    if nlp_model:
+        stages.append(Stage('nlp', partial(document_entities, model=nlp_model), after=[text], pool='process'))
+    stages.append(Stage('validate', validate_kpis, after=['extract'], pool='process'))
+    stages.append(Stage('qa', qa_kpis, after=['validate'], pool='process'))
+    if industry:
+        stages.append(Stage('benchmark', partial(benchmark_kpis, industry=industry, store_path=benchmark_store),
+                            after=['validate'], pool='process'))
+    return stages
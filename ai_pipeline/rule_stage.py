@@ -0,0 +1,326 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from validation_utils import calculate_confidence_score, enhance_kpi_with_validation, normalize_unit
+
+CATEGORIES = ('environmental', 'social', 'governance')
+
+_NUMBER = r'(?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)'
+_UNIT = (
+    r'(?P<unit>%|percent(?:age)?\b'
+    r'|(?:metric\s+)?(?:tons?|tonnes?)\s+(?:of\s+)?CO2(?:\s*-?\s*(?:equivalents?|eq|e))?'
+    r'|[kKmM]?t\s?CO2e?|kg\s?CO2e?'
+    r'|GWh|MWh|kWh|GJ'
+    r'|cubic\s+met(?:er|re)s|m3|m³|megalit(?:er|re)s|lit(?:er|re)s'
+    r'|(?:metric\s+)?(?:tons?|tonnes?)|kg'
+    r'|hours?|employees|people|FTEs?|days)(?!\w)'
+)
+QUANTITY = re.compile(rf'(?<![\w.,]){_NUMBER}\s*(?P<scale>thousand|million|billion)?\s*{_UNIT}', re.IGNORECASE)
+YEAR = re.compile(r'(?<![\w.,])((?:19|20)\d{2})(?!\w|[.,]\d)')
+BARE_NUMBER = re.compile(r'(?<![\w.,])\d[\d,]*(?:\.\d+)?')
+SCOPE = re.compile(r'\bscope\s*\d(?:\s*(?:&|and|\+)\s*\d)?', re.IGNORECASE)  # Numbers in "Scope 1 & 2" are labels
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z])')
+# A quantity (or year) right after these words is a prior-year or baseline figure, not the KPI itself
+_PRIOR_CONTEXT = re.compile(
+    r'(?:\bfrom|\bsince|\bversus|\bvs\.?|\bcompared (?:to|with)|\brelative to|\bbaseline(?: of)?|\bby)'
+    r'\s+(?:our\s+|the\s+|a\s+|fy\s*)?(?:(?:19|20)\d{2}\s+(?:baseline|base year|levels?)\s+of\s+)?$',
+    re.IGNORECASE)
+# A quantity followed by these words is a change, not a level
+_CHANGE_AFTER = re.compile(r'^\s*(?:reduction|decrease|increase|decline|drop|cut|rise|lower|higher|improvement)',
+                           re.IGNORECASE)
+
+# (KPI name, category, keyword pattern, canonical units accepted); the first rule that matches a quantity wins
+METRIC_RULES: List[Tuple[str, str, re.Pattern, Tuple[str, ...]]] = [
+    ("Scope 1 & 2 Emissions", 'environmental', re.compile(r'scope\s*1\s*(?:&|and|\+)\s*2', re.I), ('tCO2e', 't')),
+    ("Scope 3 Emissions", 'environmental', re.compile(r'scope\s*3', re.I), ('tCO2e', 't')),
+    ("Scope 2 Emissions", 'environmental', re.compile(r'scope\s*2', re.I), ('tCO2e', 't')),
+    ("Scope 1 Emissions", 'environmental', re.compile(r'scope\s*1', re.I), ('tCO2e', 't')),
+    ("Total GHG Emissions", 'environmental',
+     re.compile(r'\b(?:ghg|greenhouse gas|co2|carbon)\b.*?\bemissions?\b|\bemissions?\b', re.I), ('tCO2e', 't')),
+    ("Renewable Energy Share", 'environmental', re.compile(r'\brenewable', re.I), ('%',)),
+    ("Energy Consumption", 'environmental',
+     re.compile(r'\b(?:energy|electricity)\b.*?\b(?:consum\w*|use|usage|used)\b|\bconsum\w*\b.*?\b(?:energy|electricity)\b',
+                re.I), ('MWh',)),
+    ("Water Withdrawal", 'environmental', re.compile(r'\bwater\b.*?\bwithdr[ae]w\w*|\bwithdr[ae]w\w*\b.*?\bwater\b', re.I),
+     ('m3',)),
+    ("Water Consumption", 'environmental', re.compile(r'\bwater\b', re.I), ('m3',)),
+    ("Waste Diverted from Landfill", 'environmental',
+     re.compile(r'\bwaste\b.*?\b(?:divert\w*|recycl\w*)|\b(?:divert\w*|recycl\w*)\b.*?\bwaste\b', re.I), ('%',)),
+    ("Total Waste Generated", 'environmental', re.compile(r'\bwaste\b', re.I), ('t',)),
+    ("Employee Turnover Rate", 'social', re.compile(r'\b(?:turnover|attrition)\b', re.I), ('%',)),
+    ("Training Hours per Employee", 'social', re.compile(r'\btraining\b', re.I), ('hours',)),
+    ("Employee Satisfaction", 'social', re.compile(r'\b(?:satisfaction|engagement)\b', re.I), ('%',)),
+    ("Board Gender Diversity", 'governance',
+     re.compile(r'\b(?:women|female|gender)\b.*?\bboard\b|\bboard\b.*?\b(?:women|female|gender)\b', re.I), ('%',)),
+    ("Independent Directors", 'governance', re.compile(r'\bindependent\b', re.I), ('%',)),
+    ("Total Employees", 'social', re.compile(r'\b(?:employees|workforce|headcount|staff)\b', re.I), ('count',)),
+]
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_END.split(' '.join(text.split())) if s.strip()]
+
+def split_passages(text: str) -> List[str]:
+    """Paragraphs (blank-line separated) of a report"""
+    return [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+
+def _is_prior(sentence: str, start: int, end: int) -> bool:
+    return bool(_PRIOR_CONTEXT.search(sentence[max(0, start - 40):start])
+                or _CHANGE_AFTER.match(sentence[end:end + 20]))
+
+def document_year(text: str) -> Optional[int]:
+    """
+    Reporting year of a text: the most frequently mentioned year outside baseline/target context
+    (ties go to the latest), used for KPIs whose sentence names no year of its own.
+    """
+    years = Counter(int(m.group(1)) for m in YEAR.finditer(text) if not _is_prior(text, m.start(), m.end()))
+    return max(years, key=lambda year: (years[year], year)) if years else None
+
+def _sentence_kpis(sentence: str, default_year: Optional[int]) -> Tuple[List[Dict[str, Any]], List[Tuple[int, int]]]:
+    """KPIs of one sentence plus the character spans of every quantity it accounted for"""
+    quantities = []
+    for match in QUANTITY.finditer(sentence):
+        unit = match.group('unit')
+        quantities.append({'match': match, 'unit': unit, 'canonical': normalize_unit(unit)[0],
+                           'prior': _is_prior(sentence, match.start(), match.end()), 'used': False})
+    spans = [q['match'].span() for q in quantities if q['prior']]
+    years = [m for m in YEAR.finditer(sentence) if not _is_prior(sentence, m.start(), m.end())
+             and not any(s <= m.start() <= e + 12 for s, e in spans)]
+    year = int(years[0].group(1)) if years else default_year
+    kpis = []
+    for name, category, keyword, units in METRIC_RULES:
+        if not keyword.search(sentence):
+            continue
+        for quantity in quantities:
+            if quantity['used'] or quantity['prior'] or quantity['canonical'] not in units:
+                continue
+            quantity['used'] = True
+            match = quantity['match']
+            number = match.group('number') + (f" {match.group('scale')}" if match.group('scale') else '')
+            if quantity['canonical'] == '%':
+                value, metric_type = f"{number}%", 'percentage'
+            else:
+                value, metric_type = number, ' '.join(quantity['unit'].split())
+            kpi = {'name': name, 'value': value, 'metric_type': metric_type, 'year': year,
+                   'reference': sentence, 'category': category}
+            kpi['confidence_score'], kpi['confidence_reasoning'] = calculate_confidence_score(
+                name, value, metric_type, sentence)
+            kpi = enhance_kpi_with_validation(kpi)
+            kpi['extraction_method'] = 'rules'
+            kpis.append(kpi)
+            break
+    spans += [q['match'].span() for q in quantities if q['used']]
+    spans += [m.span() for m in YEAR.finditer(sentence)]
+    spans += [m.span() for m in SCOPE.finditer(sentence)]
+    return kpis, spans
+
+def _leftover_numbers(sentence: str, spans: List[Tuple[int, int]]) -> int:
+    """Numbers in a sentence that no extracted KPI, prior-year figure or year accounts for"""
+    return sum(1 for m in BARE_NUMBER.finditer(sentence) if not any(s <= m.start() < e for s, e in spans))
+
+def extract_passage(passage: str, default_year: Optional[int] = None,
+                    min_confidence: int = 70) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Rule-based KPIs of one passage.
+    Returns:
+        (List[dict], bool): KPIs found, and whether the passage is fully resolved, i.e. every number in
+        it was accounted for and every KPI reached `min_confidence`.
+    """
+    kpis, resolved = [], True
+    for sentence in split_sentences(passage):
+        sentence_kpis, spans = _sentence_kpis(sentence, default_year)
+        if _leftover_numbers(sentence, spans):
+            resolved = False
+        kpis.extend(sentence_kpis)
+    if any(kpi['confidence_score'] < min_confidence for kpi in kpis):
+        resolved = False
+    return kpis, resolved
+
+def extract_kpis_with_rules(text: str, default_year: Optional[int] = None) -> list[dict]:
+    """
+    Extract plain "number + unit + year" KPIs with compiled patterns, without calling a model.
+    Args:
+        text (str): Input text.
+        default_year (int, optional): Year for KPIs whose sentence has none (default: the most
+            frequently mentioned year in the text).
+    Returns:
+        list[dict]: KPIs in the extractor schema (name, value, metric_type, year, reference,
+        confidence_score, confidence_reasoning, quality_flags, validation_status), each with
+        'category' and extraction_method 'rules'.
+    """
+    default_year = default_year if default_year is not None else document_year(text)
+    kpis = []
+    for passage in split_passages(text):
+        kpis.extend(extract_passage(passage, default_year)[0])
+    return kpis
+
+# Table cells: a year column header ("2023", "FY2023", "FY 2023"), a numeric value, and named column headers
+_YEAR_HEADER = re.compile(r'^(?:FY\s*)?((?:19|20)\d{2})$', re.IGNORECASE)
+_CELL_NUMBER = re.compile(r'^[<>~≈]?\s*(?P<sign>[-−])?\s*' + _NUMBER + r'\s*(?P<percent>%)?')
+_HEADER_NAMES = {
+    'metric': re.compile(r'^(?:metric|indicator|kpi|parameter|measure|description)s?$', re.IGNORECASE),
+    'unit': re.compile(r'^(?:units?|uom|unit of measure(?:ment)?)$', re.IGNORECASE),
+    'year': re.compile(r'^(?:year|fy|fiscal year|reporting year|period)$', re.IGNORECASE),
+    'value': re.compile(r'^(?:value|amount|figure|data)$', re.IGNORECASE),
+}
+_LABEL_UNIT = re.compile(r'\s*[(\[]([^()\[\]]+)[)\]]\s*$')  # "Scope 1 emissions (tCO2e)"
+_KNOWN_UNITS = {canonical for *_, units in METRIC_RULES for canonical in units}
+
+def _table_layout(cells: List[List[str]]) -> Optional[Dict[str, Any]]:
+    """
+    Header row and column roles of a table: 'wide' (one column per year) or 'long' (year and value
+    columns), or None if the table does not look like KPI data.
+    """
+    for index, row in enumerate(cells[:3]):
+        years = {i: int(m.group(1)) for i, cell in enumerate(row) if (m := _YEAR_HEADER.match(cell))}
+        named = {}
+        for i, cell in enumerate(row):
+            role = next((role for role, pattern in _HEADER_NAMES.items() if pattern.match(cell)), None)
+            if role and role not in named:
+                named[role] = i
+        layout = None
+        if years:
+            layout = {'kind': 'wide', 'years': years}
+        elif 'year' in named and 'value' in named:
+            layout = {'kind': 'long', 'year': named['year'], 'value': named['value']}
+        if layout:
+            taken = set(years) | {named.get(role) for role in ('year', 'value', 'unit')}
+            metric = named.get('metric', next((i for i in range(len(row)) if i not in taken), None))
+            if metric is None:
+                return None
+            return {**layout, 'header': index, 'metric': metric, 'unit': named.get('unit')}
+    return None
+
+def _table_kpi(label: str, unit: str, raw: str, year: Optional[int]) -> Optional[Dict[str, Any]]:
+    match = _CELL_NUMBER.match(raw)
+    if not match:
+        return None
+    if not unit and (label_unit := _LABEL_UNIT.search(label)) and normalize_unit(label_unit.group(1))[0] in _KNOWN_UNITS:
+        unit = label_unit.group(1).strip()
+    metric = _LABEL_UNIT.sub('', label) if unit else label
+    canonical = '%' if match.group('percent') else normalize_unit(unit)[0]
+    name, category = metric, None
+    for rule_name, rule_category, keyword, units in METRIC_RULES:
+        if keyword.search(metric) and (not unit or canonical in units):
+            name, category = rule_name, rule_category
+            break
+    number = ('-' if match.group('sign') else '') + match.group('number')
+    if canonical == '%':
+        value, metric_type = f"{number}%", 'percentage'
+    else:
+        value, metric_type = number, unit
+    reference = f"{metric} ({year}): {raw}" if year else f"{metric}: {raw}"
+    reference += f" {unit}" if unit and unit not in raw else ''
+    kpi = {'name': name, 'value': value, 'metric_type': metric_type, 'year': year, 'reference': reference,
+           'category': category, 'metric': metric, 'unit': canonical if unit or canonical == '%' else ''}
+    kpi['confidence_score'], kpi['confidence_reasoning'] = calculate_confidence_score(
+        name, value, metric_type, reference)
+    kpi = enhance_kpi_with_validation(kpi)
+    kpi['extraction_method'] = 'table'
+    return kpi
+
+def extract_table_kpis(rows: Sequence[Sequence[Optional[str]]]) -> List[Dict[str, Any]]:
+    """
+    KPIs of one data table (a list of rows of cell strings, as returned by pdfplumber or an HTML parser).
+    Recognizes a header row with year columns ("Metric | Unit | 2022 | 2023") or with named year and
+    value columns ("Metric | Year | Value | Unit"); units come from a unit column, a unit in the metric
+    label ("Water withdrawal (m3)") or a '%' in the cell.
+    Args:
+        rows (Sequence[Sequence[str]]): Table cells; None and blank cells are allowed.
+    Returns:
+        List[dict]: One KPI per (metric, year) value in the extractor schema, with extraction_method
+        'table', the table's own 'metric' label and the canonical 'unit'. Metrics matching
+        METRIC_RULES get its name and category; others keep their label and category None.
+        Empty if the table is not recognized as KPI data.
+    """
+    cells = [[' '.join((cell or '').split()) for cell in row] for row in rows]
+    cells = [row for row in cells if any(row)]
+    layout = _table_layout(cells)
+    if layout is None:
+        return []
+    kpis = []
+    for row in cells[layout['header'] + 1:]:
+        label = row[layout['metric']] if layout['metric'] < len(row) else ''
+        if not label:
+            continue
+        unit = row[layout['unit']] if layout['unit'] is not None and layout['unit'] < len(row) else ''
+        if layout['kind'] == 'wide':
+            values = [(year, row[i]) for i, year in layout['years'].items() if i < len(row)]
+        else:
+            cell = row[layout['year']] if layout['year'] < len(row) else ''
+            year = _YEAR_HEADER.match(cell) or YEAR.search(cell)
+            values = [(int(year.group(1)) if year else None, row[layout['value']] if layout['value'] < len(row) else '')]
+        for year, raw in values:
+            kpi = _table_kpi(label, unit, raw, year)
+            if kpi:
+                kpis.append(kpi)
+    return kpis
+
+def extract_kpis_hybrid(text: str, llm: Optional[Callable[[str], List[Dict[str, Any]]]] = None,
+                        min_confidence: int = 70, max_chars: int = 30_000,
+                        required_categories: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Fast path first, LLM only for what the rules could not resolve.
+    Passages whose numbers were all explained by confident rule-based KPIs are taken as is; the rest
+    are batched into as few LLM calls as `max_chars` allows. If a required category is still empty
+    afterwards, the whole text is sent once more and only that category's KPIs are kept.
+    Args:
+        text (str): Input text.
+        llm (Callable, optional): text -> list of KPI dicts with 'category' (default:
+            llm_stage.extract_kpis_with_llm, which honours the LLM cassette).
+        min_confidence (int): Rule-based KPIs below this send their passage to the LLM.
+        max_chars (int): Maximum characters of report text per LLM call.
+        required_categories (Sequence[str]): Categories that must not come back empty.
+    Returns:
+        dict: 'kpis' (flat list), the same KPIs grouped per category, and 'coverage' with passage counts,
+        KPIs per method, llm_calls, llm_calls_saved (vs. sending the whole text in `max_chars` chunks)
+        and llm_chars_saved.
+    """
+    if llm is None:
+        from ai_pipeline.llm_stage import extract_kpis_with_llm as llm
+    default_year = document_year(text)
+    passages = split_passages(text)
+    kpis, unresolved = [], []
+    for passage in passages:
+        passage_kpis, resolved = extract_passage(passage, default_year, min_confidence)
+        if resolved:
+            kpis.extend(passage_kpis)
+        else:
+            unresolved.append(passage)
+
+    batches, current = [], ''
+    for passage in unresolved:
+        if current and len(current) + len(passage) + 2 > max_chars:
+            batches.append(current)
+            current = ''
+        current = f"{current}\n\n{passage}" if current else passage
+    if current:
+        batches.append(current)
+    llm_chars = sum(len(batch) for batch in batches)
+    for batch in batches:
+        kpis.extend({**kpi, 'extraction_method': 'llm'} for kpi in llm(batch))
+
+    found = {kpi.get('category') for kpi in kpis}
+    missing = [c for c in required_categories if c not in found]
+    if missing and text.strip():
+        llm_chars += len(text)
+        batches.append(text)
+        kpis.extend({**kpi, 'extraction_method': 'llm'} for kpi in llm(text) if kpi.get('category') in missing)
+
+    baseline_calls = math.ceil(len(text) / max_chars) if text.strip() else 0
+    methods = Counter(kpi['extraction_method'] for kpi in kpis)
+    return {
+        'kpis': kpis,
+        **{category: [kpi for kpi in kpis if kpi.get('category') == category] for category in CATEGORIES},
+        'coverage': {
+            'passages': len(passages),
+            'resolved_by_rules': len(passages) - len(unresolved),
+            'sent_to_llm': len(unresolved),
+            'rule_coverage': (len(passages) - len(unresolved)) / len(passages) if passages else 1.0,
+            'kpis_by_method': {'rules': methods.get('rules', 0), 'llm': methods.get('llm', 0)},
+            'llm_calls': len(batches),
+            'llm_calls_saved': max(baseline_calls - len(batches), 0),
+            'llm_chars_saved': max(len(text) - llm_chars, 0),
+        },
+    }
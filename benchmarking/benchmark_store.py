@@ -0,0 +1,155 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from kpi_table import KpiTable, MISSING
+from validation_utils import normalize_unit
+
+PERCENTILES = (0, 10, 25, 50, 75, 90, 100)
+ALL_YEARS = MISSING  # Year slot holding every year of a metric pooled together
+
+BenchmarkKey = Tuple[str, str, str, int]  # (industry, lower-cased metric name, canonical unit, year)
+
+class BenchmarkStore:
+    """
+    Industry benchmarks computed from our own corpus of extracted KPIs.
+    Percentiles (min, p10, p25, p50, p75, p90, max) are precomputed per (industry, metric,
+    canonical unit, year) and for all years pooled, so a lookup is a single dict access and a
+    percentile rank is an interpolation over seven points. Sorted samples are kept so that
+    adding KPIs only recomputes the groups they touch.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_count: int = 5):
+        self.path = path
+        self.min_count = min_count
+        self._samples: Dict[BenchmarkKey, np.ndarray] = {}
+        self._stats: Dict[BenchmarkKey, np.ndarray] = {}
+        self._units: Dict[Tuple[str, str, int], set] = {}
+        self._pending: Dict[BenchmarkKey, List[float]] = {}
+
+    def add_kpis(self, kpis: Union[List[Dict[str, Any]], KpiTable], industry: str,
+                 year: Optional[int] = None) -> int:
+        """
+        Queue KPIs for the benchmark of an industry; call rebuild() (or save()) to publish them.
+        Args:
+            kpis (List[Dict] | KpiTable): Extracted KPIs.
+            industry (str): Industry of the reporting company.
+            year (int, optional): Year used for KPIs without one.
+        Returns:
+            int: Number of KPIs with a numeric value that were queued.
+        """
+        table = kpis if isinstance(kpis, KpiTable) else KpiTable.from_records(kpis)
+        names = table.strings('name')
+        units = table.strings('metric_type')
+        years = table.column('year')
+        values = table.column('value')
+        normalized = {}
+        added = 0
+        for name, unit, kpi_year, value in zip(names, units, years.tolist(), values.tolist()):
+            if value != value or not name:  # NaN: no numeric value
+                continue
+            if unit not in normalized:
+                normalized[unit] = normalize_unit(unit or '')
+            canonical, factor = normalized[unit]
+            kpi_year = kpi_year if kpi_year != MISSING else (year if year is not None else ALL_YEARS)
+            metric = name.lower()
+            for slot in {kpi_year, ALL_YEARS}:
+                self._pending.setdefault((industry, metric, canonical, slot), []).append(value * factor)
+            added += 1
+        return added
+
+    def rebuild(self) -> int:
+        """Merge queued values and recompute percentiles for the affected groups only"""
+        for key, new_values in self._pending.items():
+            merged = np.sort(np.concatenate([self._samples.get(key, np.empty(0)), np.asarray(new_values)]))
+            self._samples[key] = merged
+            self._stats[key] = np.percentile(merged, PERCENTILES)
+            industry, metric, unit, year = key
+            self._units.setdefault((industry, metric, year), set()).add(unit)
+        rebuilt = len(self._pending)
+        self._pending = {}
+        return rebuilt
+
+    def _resolve(self, industry: str, metric_name: str, unit: Optional[str],
+                 year: Optional[int]) -> Optional[BenchmarkKey]:
+        metric = metric_name.lower()
+        slot = year if year is not None else ALL_YEARS
+        if unit is None:
+            units = self._units.get((industry, metric, slot), ())
+            if len(units) != 1:
+                return None
+            canonical = next(iter(units))
+        else:
+            canonical = normalize_unit(unit)[0]
+        key = (industry, metric, canonical, slot)
+        if key not in self._stats and slot != ALL_YEARS:
+            key = (industry, metric, canonical, ALL_YEARS)
+        return key if key in self._stats else None
+
+    def lookup(self, industry: str, metric_name: str, unit: Optional[str] = None,
+               year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Precomputed percentiles for a metric, falling back to all years pooled when the year has none.
+        Returns:
+            dict: count, unit, year and p0/p10/p25/p50/p75/p90/p100, or None if there is no benchmark
+            (or fewer than min_count samples, or `unit` is omitted and the metric has several units).
+        """
+        key = self._resolve(industry, metric_name, unit, year)
+        if key is None or len(self._samples[key]) < self.min_count:
+            return None
+        result = {'count': len(self._samples[key]), 'unit': key[2], 'year': None if key[3] == ALL_YEARS else key[3]}
+        result.update({f"p{p}": float(v) for p, v in zip(PERCENTILES, self._stats[key])})
+        return result
+
+    def percentile_rank(self, industry: str, metric_name: str, value: float, unit: Optional[str] = None,
+                        year: Optional[int] = None) -> Optional[float]:
+        """Approximate percentile rank (0-100) of a value, interpolated between the stored percentiles"""
+        key = self._resolve(industry, metric_name, unit, year)
+        if key is None or len(self._samples[key]) < self.min_count:
+            return None
+        factor = normalize_unit(unit)[1] if unit is not None else 1.0
+        stats = self._stats[key]
+        # Collapse repeated percentile values so interp sees strictly increasing x
+        points, first = np.unique(stats, return_index=True)
+        if len(points) == 1:
+            return 50.0
+        return float(np.interp(value * factor, points, np.asarray(PERCENTILES, dtype=float)[first]))
+
+    def save(self, path: Optional[str] = None):
+        """Rebuild pending groups and write the store as one compressed .npz file"""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for the benchmark store")
+        self.rebuild()
+        keys = list(self._samples)
+        lengths = np.array([len(self._samples[k]) for k in keys], dtype=np.int64)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            industries=np.array([k[0] for k in keys], dtype=str),
+            metrics=np.array([k[1] for k in keys], dtype=str),
+            units=np.array([k[2] for k in keys], dtype=str),
+            years=np.array([k[3] for k in keys], dtype=np.int32),
+            stats=np.array([self._stats[k] for k in keys]).reshape(len(keys), len(PERCENTILES)),
+            offsets=np.concatenate([[0], np.cumsum(lengths)]),
+            samples=np.concatenate([self._samples[k] for k in keys]) if keys else np.empty(0),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'BenchmarkStore':
+        """Load a saved store (empty if the file does not exist yet)"""
+        store = cls(path, **kwargs)
+        if not os.path.exists(path):
+            return store
+        with np.load(path) as data:
+            offsets = data['offsets']
+            samples = data['samples']
+            stats = data['stats']
+            for i, key in enumerate(zip(data['industries'].tolist(), data['metrics'].tolist(),
+                                        data['units'].tolist(), data['years'].tolist())):
+                store._samples[key] = samples[offsets[i]:offsets[i + 1]]
+                store._stats[key] = stats[i]
+                store._units.setdefault((key[0], key[1], key[3]), set()).add(key[2])
+        return store
@@ -1,4 +1,11 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from kpi_table import KpiTable, parse_numeric_value
+from validation_utils import normalize_unit
+from benchmarking.benchmark_store import BenchmarkStore
 
 # Example industry benchmarks (expand as needed)
 INDUSTRY_BENCHMARKS = {
@@ -14,24 +21,151 @@ INDUSTRY_BENCHMARKS = {
     }
 }
 
-def compare_to_benchmark(metric_name: str, value: float, industry: str) -> Dict[str, Any]:
+def compare_to_benchmark(metric_name: str, value: float, industry: str, store: Optional[BenchmarkStore] = None,
+                         unit: Optional[str] = None, year: Optional[int] = None) -> Dict[str, Any]:
     """
     Compare a metric value to the industry benchmark.
     Args:
         metric_name (str): Name of the metric (e.g., 'emissions_intensity').
         value (float): Value to compare.
         industry (str): Industry sector (e.g., 'banking').
+        store (BenchmarkStore, optional): Corpus-derived benchmarks; when it covers the metric, the
+            benchmark is the corpus median and values outside p10-p90 are outliers.
+        unit (str, optional): Unit of `value`, used to pick the store's group.
+        year (int, optional): Reporting year, used to pick the store's group.
     Returns:
-        dict: Comparison result with benchmark, difference, and outlier flag.
+        dict: Comparison result with benchmark, difference, outlier flag and percentile rank
+        (None unless the store covers the metric).
     """
+    if store is not None and value is not None:
+        percentiles = store.lookup(industry, metric_name, unit, year)
+        if percentiles is not None:
+            rank = store.percentile_rank(industry, metric_name, value, unit, year)
+            is_outlier = not 10 <= rank <= 90
+            # The store holds canonical units (percentiles['unit']); convert as percentile_rank does
+            canonical_value = value * (normalize_unit(unit)[1] if unit is not None else 1.0)
+            return {
+                'benchmark': percentiles['p50'],
+                'difference': canonical_value - percentiles['p50'],
+                'is_outlier': is_outlier,
+                'note': 'Outlier' if is_outlier else 'Within expected range',
+                'percentile_rank': rank,
+                'percentiles': percentiles
+            }
     benchmark = INDUSTRY_BENCHMARKS.get(industry, {}).get(metric_name)
     if benchmark is None:
-        return {'benchmark': None, 'difference': None, 'is_outlier': False, 'note': 'No benchmark available'}
+        return {'benchmark': None, 'difference': None, 'is_outlier': False, 'note': 'No benchmark available',
+                'percentile_rank': None}
     difference = value - benchmark
     is_outlier = abs(difference) > 0.5 * benchmark  # Flag if >50% deviation
     return {
         'benchmark': benchmark,
         'difference': difference,
         'is_outlier': is_outlier,
-        'note': 'Outlier' if is_outlier else 'Within expected range'
+        'note': 'Outlier' if is_outlier else 'Within expected range',
+        'percentile_rank': None
     }
+
+def _factorize(values):
+    """Integer codes and distinct values of a column (-1 for missing), reusing categorical codes when present"""
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        categorical = values.array if isinstance(values, pd.Series) else values
+        return np.asarray(categorical.codes), list(categorical.categories)
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return codes, list(uniques)
+
+def compare_to_benchmark_bulk(data: Optional[pd.DataFrame] = None, industry=None, metric_name=None, value=None,
+                              benchmarks: Dict[str, Dict[str, float]] = INDUSTRY_BENCHMARKS) -> pd.DataFrame:
+    """
+    Vectorized compare_to_benchmark over whole portfolios.
+    Args:
+        data (DataFrame, optional): Frame with 'industry', 'metric_name' and 'value' columns.
+        industry, metric_name, value (array-like, optional): Equal-length arrays, used when `data` is None.
+        benchmarks (dict): Nested {industry: {metric_name: benchmark}} dict (default: INDUSTRY_BENCHMARKS).
+    Returns:
+        DataFrame: benchmark, difference, is_outlier and note per input row (same index as `data`),
+        row-for-row equal to compare_to_benchmark with None represented as NaN.
+    """
+    if data is not None:
+        industry, metric_name, value, index = data['industry'], data['metric_name'], data['value'], data.index
+    else:
+        index = None
+    # Hash join: factorize each key column once, then resolve the (few) distinct pairs against the table
+    industry_codes, industries = _factorize(industry)
+    metric_codes, metric_names = _factorize(metric_name)
+    table_values = []
+    position = np.full((len(industries) + 1, len(metric_names) + 1), -1, dtype=np.intp)
+    metric_lookup = {name: j for j, name in enumerate(metric_names)}
+    for i, name in enumerate(industries):
+        for metric, benchmark in benchmarks.get(name, {}).items():
+            if metric in metric_lookup:
+                position[i, metric_lookup[metric]] = len(table_values)
+                table_values.append(float(benchmark))
+    position = position[industry_codes, metric_codes]  # code -1 (missing) hits the last, empty row/column
+    benchmark = np.append(np.asarray(table_values, dtype=np.float64), np.nan)[position]
+    values = np.asarray(value, dtype=np.float64)
+    difference = values - benchmark
+    with np.errstate(invalid='ignore'):
+        is_outlier = np.abs(difference) > 0.5 * benchmark  # Flag if >50% deviation
+    note = np.where(position < 0, 2, np.where(is_outlier, 0, 1))
+    return pd.DataFrame({
+        'benchmark': benchmark,
+        'difference': difference,
+        'is_outlier': is_outlier,
+        'note': pd.Categorical.from_codes(note, categories=['Outlier', 'Within expected range',
+                                                            'No benchmark available'])
+    }, index=index)
+
+def compare_kpis_to_benchmark(kpis: Union[List[Dict[str, Any]], KpiTable], industry: str,
+                              name_key: str = 'name', store: Optional[BenchmarkStore] = None) -> List[Dict[str, Any]]:
+    """
+    Compare every KPI in a list or KpiTable to the industry benchmark.
+    Args:
+        kpis (List[Dict] | KpiTable): KPIs whose name is a benchmark metric name.
+        industry (str): Industry sector (e.g., 'banking').
+        name_key (str): Key holding the metric name.
+        store (BenchmarkStore, optional): Corpus-derived benchmarks, see compare_to_benchmark.
+    Returns:
+        List[dict]: One compare_to_benchmark result per KPI; KPIs without a numeric value
+        get a 'No numeric value' note.
+    """
+    no_value = {'benchmark': None, 'difference': None, 'is_outlier': False, 'note': 'No numeric value',
+                'percentile_rank': None}
+    if isinstance(kpis, KpiTable) and store is None:
+        # Resolve each distinct name once instead of once per row
+        benchmarks = INDUSTRY_BENCHMARKS.get(industry, {})
+        per_code = np.array([benchmarks.get(text, np.nan) for text in kpis.vocab] + [np.nan], dtype=np.float64)
+        codes = kpis.codes(name_key)
+        benchmark = per_code[np.where(codes >= 0, codes, len(kpis.vocab))]
+        values = kpis.column('value')
+        difference = values - benchmark
+        is_outlier = np.abs(difference) > 0.5 * benchmark
+        results = []
+        for i in range(len(kpis)):
+            if np.isnan(benchmark[i]):
+                results.append({'benchmark': None, 'difference': None, 'is_outlier': False,
+                                'note': 'No benchmark available', 'percentile_rank': None})
+            elif np.isnan(values[i]):
+                results.append(dict(no_value))
+            else:
+                results.append({
+                    'benchmark': benchmarks[kpis.vocab[codes[i]]],
+                    'difference': float(difference[i]),
+                    'is_outlier': bool(is_outlier[i]),
+                    'note': 'Outlier' if is_outlier[i] else 'Within expected range',
+                    'percentile_rank': None
+                })
+        return results
+
+    results = []
+    for kpi in kpis:
+        value = parse_numeric_value(kpi.get('value'))
+        has_benchmark = INDUSTRY_BENCHMARKS.get(industry, {}).get(kpi.get(name_key)) is not None or (
+            store is not None and store.lookup(industry, kpi.get(name_key) or '', kpi.get('metric_type')) is not None)
+        if value is None and has_benchmark:
+            results.append(dict(no_value))
+        else:
+            year = kpi.get('year') if isinstance(kpi.get('year'), int) else None
+            results.append(compare_to_benchmark(kpi.get(name_key), value, industry, store,
+                                                kpi.get('metric_type'), year))
+    return results
@@ -0,0 +1,334 @@
+"""
+Resumable bulk ingestion of a directory of reports
+Parse, extract, validate and QA every document across a process pool, writing results as they finish
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from data_ingestion.dispatcher import FORMAT_EXTENSIONS, LOADERS
+
+DEFAULT_EXTENSIONS = tuple(extension for file_format in LOADERS for extension in FORMAT_EXTENSIONS[file_format])
+RESULTS_FILE = 'results.jsonl'
+SUMMARY_FILE = 'summary.json'
+
+Llm = Callable[[str], List[Dict[str, Any]]]
+
+# Per-process state of the pool workers, set by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def discover(paths: Iterable[str], extensions: Iterable[str] = DEFAULT_EXTENSIONS) -> List[str]:
+    """Files given directly plus those under the given directories (recursively), sorted, hidden ones skipped"""
+    extensions = tuple(extension.lower() for extension in extensions)
+    found = set()
+    for path in paths:
+        if os.path.isfile(path):
+            found.add(os.path.abspath(path))
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            found.update(os.path.abspath(os.path.join(root, name)) for name in files
+                         if not name.startswith('.') and name.lower().endswith(extensions))
+    return sorted(found)
+
+
+def load_results(output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Latest result per document path from <output_dir>/results.jsonl (later lines win, since a changed
+    file is processed again). A line cut off by an interrupted run is dropped from the file.
+    """
+    results_path = os.path.join(output_dir, RESULTS_FILE)
+    if not os.path.exists(results_path):
+        return {}
+    with open(results_path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+            data = data[:data.rfind(b'\n') + 1]
+    results = {}
+    for line in data.splitlines():
+        record = json.loads(line)
+        results[record['path']] = record
+    return results
+
+
+def _init_worker(llm: Optional[Llm], llm_slots, use_llm: bool, options: Dict[str, Any]):
+    _worker.update(llm=llm, llm_slots=llm_slots, use_llm=use_llm, options=options)
+
+
+def _capped_llm(text: str) -> List[Dict[str, Any]]:
+    """The configured LLM, with at most --llm-concurrency calls in flight across all workers"""
+    llm = _worker['llm']
+    if llm is None:
+        from ai_pipeline.llm_stage import extract_kpis_with_llm as llm
+    with _worker['llm_slots']:
+        return llm(text)
+
+
+def _record(path: str, error: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {'path': path, 'size': None, 'mtime_ns': None, 'digest': None, 'format': None,
+            'status': 'error' if error else 'ok', 'kpis': [], 'metadata': None, 'qa': None, 'coverage': None,
+            'stages': {}, 'error': error}
+
+
+def process_document(path: str) -> Dict[str, Any]:
+    """
+    Run one document through parse -> extract -> validation -> QA in this process. Never raises:
+    a failure is returned as a record with status 'error' so the rest of the run carries on.
+    Returns:
+        dict: path, size, mtime_ns, digest, format, status, kpis, metadata, qa, coverage,
+        stages (wall seconds per stage) and error (None, or the exception and its traceback).
+    """
+    from ai_pipeline.orchestrator import document_kpis
+    from data_ingestion.dispatcher import load_document
+    from data_ingestion.parse_cache import file_digest
+    from qa.qa_checks import run_qa_checks
+    from validation_utils import enhance_kpi_with_validation, generate_extraction_metadata
+
+    record = _record(path)
+    stage = 'parse'
+    try:
+        started = time.perf_counter()
+        stat = os.stat(path)
+        record.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, digest=file_digest(path))
+        doc = load_document(path, **_worker.get('options', {}))
+        record['format'] = doc.format
+        record['stages']['parse'] = time.perf_counter() - started
+
+        stage, started = 'extract', time.perf_counter()
+        extracted = document_kpis(doc, _capped_llm, use_llm=_worker.get('use_llm', True))
+        kpis, record['coverage'] = extracted['kpis'], extracted['coverage']
+        record['stages']['extract'] = time.perf_counter() - started
+
+        stage, started = 'validation', time.perf_counter()
+        kpis = [enhance_kpi_with_validation(dict(kpi)) for kpi in kpis]
+        record['metadata'] = generate_extraction_metadata(kpis)
+        record['stages']['validation'] = time.perf_counter() - started
+
+        stage, started = 'qa', time.perf_counter()
+        record['qa'] = run_qa_checks(kpis)
+        record['stages']['qa'] = time.perf_counter() - started
+        record['kpis'] = kpis
+    except Exception as e:
+        record.update(status='error', error={'stage': stage, 'type': type(e).__name__, 'message': str(e),
+                                             'traceback': traceback.format_exc(limit=8)})
+    return record
+
+
+class Progress:
+    """Throughput and ETA over the documents processed in this run (skipped ones do not count)"""
+
+    def __init__(self, total_docs: int, total_bytes: int, stream: Optional[TextIO] = sys.stderr,
+                 interval: float = 5.0):
+        self.total_docs = total_docs
+        self.total_bytes = total_bytes
+        self.stream = stream
+        self.interval = interval
+        self.done = self.failed = self.bytes = 0
+        self.started = time.perf_counter()
+        self._last_print = self.started
+
+    def update(self, record: Dict[str, Any]):
+        self.done += 1
+        self.failed += record['status'] != 'ok'
+        self.bytes += record['size'] or 0
+        now = time.perf_counter()
+        if self.stream is not None and (now - self._last_print >= self.interval or self.done == self.total_docs):
+            self._last_print = now
+            print(self.line(), file=self.stream, flush=True)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        byte_rate = self.bytes / elapsed
+        # Remaining work by bytes, since report sizes vary far more than their count
+        if byte_rate > 0:
+            eta = (self.total_bytes - self.bytes) / byte_rate
+        else:
+            eta = (self.total_docs - self.done) * elapsed / self.done if self.done else None
+        return {'processed': self.done, 'failed': self.failed, 'elapsed_s': elapsed, 'docs_per_s': self.done / elapsed,
+                'mb_per_s': byte_rate / 2**20, 'eta_s': eta}
+
+    def line(self) -> str:
+        stats = self.stats()
+        eta = stats['eta_s']
+        eta = '--' if eta is None else time.strftime('%H:%M:%S', time.gmtime(eta))
+        return (f"[{self.done}/{self.total_docs}] {stats['docs_per_s']:.2f} docs/s, {stats['mb_per_s']:.2f} MB/s, "
+                f"{self.failed} failed, ETA {eta}")
+
+
+def _pool_failure(path: str, error_type: str, message: str) -> Dict[str, Any]:
+    """Record for a document whose result never came back from the pool"""
+    record = _record(path, {'stage': None, 'type': error_type, 'message': message, 'traceback': None})
+    if os.path.exists(path):
+        stat = os.stat(path)
+        record.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    return record
+
+
+def _run_pool(todo: List[str], workers: int, llm: Optional[Llm], llm_concurrency: int, use_llm: bool,
+              options: Dict[str, Any], max_tasks_per_child: Optional[int]):
+    """
+    Yield the record of every document, keeping at most workers * 2 in flight. When a worker dies, every
+    document in flight is a suspect: suspects are rerun one at a time on a new pool, so only the document
+    that kills a worker on its own is recorded as failed.
+    """
+    pending = list(reversed(todo))
+    suspects: List[str] = []
+    # Recycled workers need spawn (ProcessPoolExecutor refuses fork then); the semaphore must come from
+    # the same context as the pool
+    context = multiprocessing.get_context('spawn' if max_tasks_per_child else None)
+    while pending or suspects:
+        # A fresh semaphore per pool: a worker that died during an LLM call never released its slot
+        llm_slots = context.BoundedSemaphore(llm_concurrency)
+        executor = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                       initargs=(llm, llm_slots, use_llm, options),
+                                       max_tasks_per_child=max_tasks_per_child)
+        in_flight: Dict[Future, Tuple[str, bool]] = {}
+        broken = False
+        try:
+            while in_flight or (not broken and (pending or suspects)):
+                while not broken and (pending or suspects) and len(in_flight) < (1 if suspects else workers * 2):
+                    queue = suspects or pending
+                    path = queue.pop()
+                    try:
+                        in_flight[executor.submit(process_document, path)] = (path, queue is suspects)
+                    except BrokenProcessPool:
+                        queue.append(path)
+                        broken = True
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, alone = in_flight.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        if alone:
+                            yield _pool_failure(path, 'BrokenProcessPool',
+                                                "Worker process died while processing this document")
+                        else:
+                            suspects.append(path)
+                    except Exception as e:
+                        yield _pool_failure(path, type(e).__name__, str(e))
+        finally:
+            executor.shutdown(wait=not broken, cancel_futures=True)
+
+
+def ingest(paths: Iterable[str], output_dir: str, workers: Optional[int] = None, llm: Optional[Llm] = None,
+           llm_concurrency: int = 4, use_llm: bool = True, retry_failed: bool = False,
+           extensions: Iterable[str] = DEFAULT_EXTENSIONS, max_tasks_per_child: Optional[int] = None,
+           progress: Optional[TextIO] = sys.stderr, progress_interval: float = 5.0,
+           load_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Process every report under `paths`, appending one JSON line per finished document to
+    <output_dir>/results.jsonl. The file is also the checkpoint: documents whose path, size and mtime
+    match an existing line are skipped, so an interrupted run picks up where it stopped.
+    Args:
+        paths (Iterable[str]): Files and/or directories.
+        output_dir (str): Where results.jsonl and summary.json are written.
+        workers (int, optional): Worker processes (default: CPU count); 1 runs in this process.
+        llm (Callable, optional): text -> KPI dicts, a module-level function so workers can unpickle it
+            (default: ai_pipeline.llm_stage.extract_kpis_with_llm, which honours LLM_CASSETTE).
+        llm_concurrency (int): LLM calls in flight at once across all workers.
+        use_llm (bool): Rules, tables and XBRL only when False.
+        retry_failed (bool): Process documents that failed in an earlier run again.
+        extensions (Iterable[str]): File extensions picked up in directories (the format itself is sniffed).
+        max_tasks_per_child (int, optional): Replace each worker after this many documents (bounds leaks).
+        progress (TextIO, optional): Stream for throughput/ETA lines (None: silent).
+        progress_interval (float): Seconds between progress lines.
+        load_options (dict, optional): Keyword arguments for data_ingestion.dispatcher.load_document.
+    Returns:
+        dict: Summary (also written to summary.json): discovered, skipped, processed, failed, the
+        failures (path, stage, error), throughput, seconds per stage and the KPIs found.
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    files = discover(paths, extensions)
+    previous = load_results(output_dir)
+    todo, skipped = [], 0
+    for path in files:
+        stat, record = os.stat(path), previous.get(path)
+        if (record and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns
+                and (record['status'] == 'ok' or not retry_failed)):
+            skipped += 1
+        else:
+            todo.append(path)
+    tracker = Progress(len(todo), sum(os.path.getsize(path) for path in todo), progress, progress_interval)
+    if progress is not None:
+        print(f"{len(files)} documents found, {skipped} already done, {len(todo)} to process with "
+              f"{min(workers, max(len(todo), 1))} worker(s)", file=progress, flush=True)
+
+    options = dict(load_options or {})
+    if workers <= 1:
+        _init_worker(llm, multiprocessing.BoundedSemaphore(llm_concurrency), use_llm, options)
+        records = (process_document(path) for path in todo)
+    else:
+        records = _run_pool(todo, workers, llm, llm_concurrency, use_llm, options, max_tasks_per_child)
+
+    stage_seconds: Dict[str, float] = {}
+    failures, kpi_count = [], 0
+    with open(os.path.join(output_dir, RESULTS_FILE), 'a', encoding='utf-8') as out:
+        for record in records:
+            out.write(json.dumps(record, default=str) + '\n')
+            out.flush()
+            os.fsync(out.fileno())
+            tracker.update(record)
+            kpi_count += len(record['kpis'])
+            for stage, seconds in record['stages'].items():
+                stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
+            if record['status'] != 'ok':
+                failures.append({'path': record['path'], 'stage': record['error']['stage'],
+                                 'error': f"{record['error']['type']}: {record['error']['message']}"})
+
+    summary = {'discovered': len(files), 'skipped': skipped, **tracker.stats(), 'kpis': kpi_count,
+               'stage_seconds': stage_seconds, 'failures': failures}
+    summary.pop('eta_s')
+    with open(os.path.join(output_dir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def _import_callable(spec: str) -> Llm:
+    module, _, name = spec.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='+', help="Report files and/or directories (searched recursively)")
+    parser.add_argument('--output-dir', default='ingest_results')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--llm-concurrency', type=int, default=4, help="LLM calls in flight across all workers")
+    parser.add_argument('--llm', default=None, help="Extraction function as module:function (default: Gemini)")
+    parser.add_argument('--no-llm', action='store_true', help="Rules, tables and XBRL only")
+    parser.add_argument('--retry-failed', action='store_true', help="Process previously failed documents again")
+    parser.add_argument('--extensions', default=','.join(DEFAULT_EXTENSIONS),
+                        help="Comma-separated extensions picked up in directories")
+    parser.add_argument('--max-tasks-per-child', type=int, default=None)
+    parser.add_argument('--progress-interval', type=float, default=5.0)
+    args = parser.parse_args()
+
+    summary = ingest(args.paths, args.output_dir, args.workers, _import_callable(args.llm) if args.llm else None,
+                     args.llm_concurrency, not args.no_llm, args.retry_failed, args.extensions.split(','),
+                     args.max_tasks_per_child, progress_interval=args.progress_interval)
+    print(f"{summary['processed']} processed ({summary['failed']} failed), {summary['skipped']} skipped, "
+          f"{summary['kpis']} KPIs in {summary['elapsed_s']:.1f}s ({summary['docs_per_s']:.2f} docs/s) "
+          f"-> {os.path.join(args.output_dir, RESULTS_FILE)}")
+    for failure in summary['failures'][:20]:
+        print(f"  failed: {failure['path']} ({failure['stage']}): {failure['error']}")
+    sys.exit(1 if summary['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+import csv
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from data_ingestion.document import Document, DocumentBuilder
+from data_ingestion.excel_parser import iter_excel_batches
+from data_ingestion.html_parser import extract_html_blocks, iter_xml_text
+from data_ingestion.parse_cache import ParseCache
+from data_ingestion.pdf_parser import PageRange, extract_pdf_tables, iter_pdf_pages
+from data_ingestion.xbrl_parser import load_xbrl
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
+openpyxl = lazy_import('openpyxl')
+
+SNIFF_BYTES = 64 * 1024
+# Leading bytes of binary formats
+MAGIC = (
+    (b'%PDF-', 'pdf'),
+    (b'PAR1', 'parquet'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'xls'),  # OLE2 compound file (legacy Office)
+    (b'\x89PNG\r\n\x1a\n', 'image'),
+    (b'\xff\xd8\xff', 'image'),  # JPEG
+    (b'II*\x00', 'image'),  # TIFF, little-endian
+    (b'MM\x00*', 'image'),  # TIFF, big-endian
+    (b'GIF8', 'image'),
+)
+_INLINE_XBRL = re.compile(rb'http://www\.xbrl\.org/20(?:13|08)/inlineXBRL')
+_XBRL_ROOT = re.compile(rb'<(?:[\w.-]+:)?xbrl[\s>]')
+_HTML = re.compile(rb'<!doctype\s+html|<html[\s>]', re.IGNORECASE)
+# Report of an XBRL report package: <top-level directory>/reports/<name>.xhtml (.html, .xbrl)
+_PACKAGE_REPORT = re.compile(r'^[^/]+/reports/[^/]+\.(?:xhtml|html?|xbrl)$', re.IGNORECASE)
+XBRL_FACTS = 'xbrl:facts'  # Locator of the facts table of XBRL and iXBRL documents
+XBRL_HEADER = ['Concept', 'Period start', 'Period end', 'Value', 'Unit', 'Entity', 'Dimensions']
+
+def _looks_like_csv(head: bytes) -> bool:
+    """Comma-separated rows with the same (more than one) number of fields"""
+    lines = head.decode('utf-8', errors='replace').splitlines()
+    if len(head) == SNIFF_BYTES:
+        lines = lines[:-1]  # Possibly cut off
+    lines = [line for line in lines[:50] if line.strip()]
+    if len(lines) < 2:
+        return False
+    widths = {len(row) for row in csv.reader(lines)}
+    return len(widths) == 1 and widths.pop() > 1
+
+def sniff_format(file_path: str) -> str:
+    """
+    Format of a file from its content rather than its extension.
+    Args:
+        file_path (str): Path to the file.
+    Returns:
+        str: 'pdf', 'html', 'ixbrl', 'xbrl', 'xml', 'xlsx', 'xls', 'csv', 'parquet', 'image', 'zip',
+        'text' or 'binary'.
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    for magic, file_format in MAGIC:
+        if head.startswith(magic):
+            return file_format
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                names = set(archive.namelist())
+        except zipfile.BadZipFile:
+            return 'binary'
+        return 'xlsx' if 'xl/workbook.xml' in names else 'zip'
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')) or (b'\x00' in head and not head.startswith(b'\xef\xbb\xbf')):
+        return 'binary'
+    body = head[3:] if head.startswith(b'\xef\xbb\xbf') else head
+    if body.lstrip().startswith(b'<'):
+        if _INLINE_XBRL.search(body):
+            return 'ixbrl'
+        if _HTML.search(body[:4096]):
+            return 'html'
+        if _XBRL_ROOT.search(body):
+            return 'xbrl'
+        return 'xml'
+    return 'csv' if _looks_like_csv(body) else 'text'
+
+def _read_pdf(builder: DocumentBuilder, file_path: str, page_range: Optional[PageRange] = None,
+              tables: bool = True, table_settings: Optional[Dict[str, Any]] = None, ocr: bool = False,
+              ocr_options: Optional[Dict[str, Any]] = None, workers: int = 1, cache: Optional[ParseCache] = None):
+    by_page: Dict[int, List[Dict[str, Any]]] = {}
+    if tables:
+        for table in extract_pdf_tables(file_path, page_range, table_settings):
+            by_page.setdefault(table['page'], []).append(table)
+    # Tables read as KPI data are left out of the page text and kept as table blocks instead
+    for number, text in iter_pdf_pages(file_path, page_range, workers, ocr=ocr, ocr_options=ocr_options,
+                                       cache=cache, skip_tables=tables, table_settings=table_settings):
+        builder.add_page(number)
+        builder.add_text(text, page=number)
+        for table in by_page.get(number, []):
+            if table['kpis']:
+                builder.add_table(table['rows'], page=number, bbox=table['bbox'])
+    builder.meta['tables_with_kpis'] = sum(1 for page in by_page.values() for table in page if table['kpis'])
+
+def _read_html(builder: DocumentBuilder, file_path: str, strip_boilerplate: bool = True):
+    for text, rows in extract_html_blocks(file_path, strip_boilerplate):
+        if rows is None:
+            builder.add_text(text, page=1, split=False)
+        else:
+            builder.add_table(rows, page=1)
+
+def _read_xbrl(builder: DocumentBuilder, file_path: str):
+    index = load_xbrl(file_path)
+    rows = [XBRL_HEADER]
+    for fact in index.facts:
+        dimensions = ', '.join(f"{axis}={member}" for axis, member in sorted(fact['dimensions'].items()))
+        rows.append([fact['concept'], fact['period_start'], fact['period_end'], fact['raw_value'], fact['unit'],
+                     fact['entity'], dimensions])
+    builder.add_table(rows, locator=XBRL_FACTS)
+    builder.meta['facts'] = len(index)
+    builder.meta['kpis'] = index.to_kpis()
+
+def _read_ixbrl(builder: DocumentBuilder, file_path: str, strip_boilerplate: bool = True):
+    _read_html(builder, file_path, strip_boilerplate)
+    _read_xbrl(builder, file_path)
+
+def _read_xml(builder: DocumentBuilder, file_path: str, tags: Optional[List[str]] = None):
+    for tag, text in iter_xml_text(file_path, tags):
+        builder.add_text(text, locator=tag, split=False)
+
+def _frame_rows(df) -> List[List[Any]]:
+    return [['' if pd.isna(value) else value for value in row] for row in df.itertuples(index=False, name=None)]
+
+def _read_sheets(builder: DocumentBuilder, file_path: str, file_format: str, batch_size: int = 10_000,
+                 sheets: Optional[List[str]] = None):
+    """One table block per batch of rows (each with the header row), a page per worksheet"""
+    if file_format == 'xlsx' and sheets is None:
+        with open(file_path, 'rb') as f:
+            workbook = openpyxl.load_workbook(f, read_only=True)
+            sheets = workbook.sheetnames
+            workbook.close()
+    elif file_format == 'xls' and sheets is None:
+        with pd.ExcelFile(file_path) as workbook:
+            sheets = [str(name) for name in workbook.sheet_names]
+    for page, sheet in enumerate(sheets or [None], start=1):
+        first_row = 2  # Spreadsheet row of the first data row, under the header
+        builder.add_page(page)
+        for df in iter_excel_batches(file_path, batch_size, sheet_name=sheet, file_format=file_format):
+            last_row = first_row + len(df) - 1
+            locator = f"{sheet + '!' if sheet else ''}{first_row}:{last_row}"
+            builder.add_table([[str(column) for column in df.columns]] + _frame_rows(df), page=page, locator=locator)
+            first_row = last_row + 1
+
+def _read_package(builder: DocumentBuilder, file_path: str, **options):
+    """
+    XBRL report package (e.g. an ESEF .zip): the report under <package>/reports/, an inline XBRL document
+    or an XBRL instance, loaded as if it were the file itself.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        reports = sorted(name for name in archive.namelist() if _PACKAGE_REPORT.match(name))
+        if not reports:
+            raise ValueError(f"Unsupported format 'zip' for {file_path}: not an XBRL report package")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, os.path.basename(reports[0]))
+            with archive.open(reports[0]) as source, open(path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            file_format = sniff_format(path)
+            if file_format not in ('ixbrl', 'xbrl', 'html'):
+                raise ValueError(f"Unsupported report {reports[0]!r} ({file_format}) in {file_path}")
+            LOADERS[file_format](builder, path, **options)
+    builder.meta['package_report'] = reports[0]
+
+def _read_image(builder: DocumentBuilder, file_path: str):
+    from ai_pipeline.ocr_stage import ocr_image
+    builder.add_text(ocr_image(file_path), page=1)
+
+def _read_text(builder: DocumentBuilder, file_path: str):
+    with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        builder.add_text(f.read())
+
+LOADERS: Dict[str, Callable[..., None]] = {
+    'pdf': _read_pdf,
+    'html': _read_html,
+    'ixbrl': _read_ixbrl,
+    'xbrl': _read_xbrl,
+    'xml': _read_xml,
+    'xlsx': partial(_read_sheets, file_format='xlsx'),
+    'xls': partial(_read_sheets, file_format='xls'),
+    'csv': partial(_read_sheets, file_format='csv'),
+    'parquet': partial(_read_sheets, file_format='parquet'),
+    'zip': _read_package,
+    'image': _read_image,
+    'text': _read_text,
+}
+
+# File extensions of each format, for picking files to load out of a directory
+FORMAT_EXTENSIONS: Dict[str, tuple] = {
+    'pdf': ('.pdf',),
+    'html': ('.html', '.htm'),
+    'ixbrl': ('.xhtml',),
+    'xbrl': ('.xbrl',),
+    'xml': ('.xml',),
+    'xlsx': ('.xlsx',),
+    'xls': ('.xls',),
+    'csv': ('.csv',),
+    'parquet': ('.parquet',),
+    'zip': ('.zip',),
+    'image': ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.gif'),
+    'text': ('.txt',),
+}
+
+def load_document(file_path: str, file_format: Optional[str] = None, **options) -> Document:
+    """
+    Parse any supported file into a Document, choosing the parser from the file's content.
+    PDFs become a page of text blocks per page plus their KPI data tables (with bbox); HTML a block per
+    paragraph and table; iXBRL the same plus a table of its tagged facts; XBRL instances that facts table
+    (their KPIs from XbrlIndex.to_kpis go to meta['kpis']); spreadsheets a table per batch of rows and a
+    page per worksheet; generic XML a block per element with text (located by tag); images their OCR
+    text; plain text a block per paragraph; XBRL report packages (zip) their report, as if it were the file.
+    Args:
+        file_path (str): Path to the file.
+        file_format (str, optional): Skip sniffing and parse as this format (see sniff_format).
+        **options: Format-specific options, e.g. page_range, tables, ocr, workers and cache for PDFs,
+            strip_boilerplate for HTML, batch_size and sheets for spreadsheets, tags for XML.
+    Returns:
+        Document: The normalized document; `format` is the format it was parsed as.
+    Raises:
+        ValueError: If the format is not supported (zip archives without a report, unknown binary files).
+    """
+    file_format = file_format or sniff_format(file_path)
+    loader = LOADERS.get(file_format)
+    if loader is None:
+        raise ValueError(f"Unsupported format {file_format!r} for {file_path}")
+    builder = DocumentBuilder(file_path, file_format)
+    loader(builder, file_path, **options)
+    return builder.build()
+
+def load_text(file_path: str, **options) -> str:
+    """Text of any supported file, blocks separated by blank lines (see load_document)"""
+    return load_document(file_path, **options).text
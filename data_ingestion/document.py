@@ -0,0 +1,192 @@
+import re
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from kpi_table import MISSING
+
+BLOCK_KINDS = ('text', 'table')  # block_kind codes index into this
+BLOCK_SEPARATOR = '\n\n'  # Between blocks of Document.text: the passage boundary of ai_pipeline.rule_stage
+_BLANK_LINE = re.compile(r'\n\s*\n')
+
+_COLUMNS = {
+    'page_number': np.int32, 'page_start': np.int64, 'page_end': np.int64,
+    'block_start': np.int64, 'block_end': np.int64, 'block_kind': np.int8, 'block_page': np.int32,
+    'block_table': np.int32, 'block_locator': np.int32,
+    'table_block': np.int32, 'table_bbox': np.float32, 'table_row_start': np.int64, 'row_cell_start': np.int64,
+    'cell_code': np.int32,
+}
+
+def render_table(rows: Sequence[Sequence[Any]]) -> str:
+    """Text of a table block: a line per row, cells separated by ' | ' (as in html_parser.extract_html_text)"""
+    return '\n'.join(' | '.join(' '.join(str(cell).split()) if cell is not None else '' for cell in row)
+                     for row in rows)
+
+class Document:
+    """
+    One parsed document in a single shape, whatever the source format. The text of all blocks is kept in
+    one string (`text`, blocks separated by a blank line) and everything else in NumPy columns:
+        pages: page_number (int32), page_start / page_end (int64 character offsets into text)
+        blocks: block_start / block_end (int64), block_kind (int8 code into BLOCK_KINDS), block_page
+            (int32, 1-based, -1 when the format has no pages), block_table (int32 table index or -1),
+            block_locator (int32 code into `strings` of a format-specific location such as a sheet
+            name, XML tag or XBRL concept, or -1)
+        tables: table_block (int32), table_bbox (float32, n x 4, NaN when unknown), table_row_start
+            (int64 index of the first row; n + 1 entries) and row_cell_start (int64 index of each row's
+            first cell; one entry per row plus one)
+        cells: cell_code (int32 code into `strings`)
+    Cell values and locators share the pool of interned strings `strings`. Build one with DocumentBuilder.
+    """
+
+    def __init__(self, text: str, columns: Dict[str, np.ndarray], strings: List[str], source: Optional[str] = None,
+                 file_format: Optional[str] = None, meta: Optional[Dict[str, Any]] = None):
+        self.text = text
+        self.strings = strings
+        self.source = source
+        self.format = file_format
+        self.meta = meta or {}
+        for name, array in columns.items():
+            setattr(self, name, array)
+
+    def __len__(self) -> int:
+        return len(self.block_start)
+
+    def __repr__(self) -> str:
+        return (f"Document(format={self.format!r}, pages={len(self.page_number)}, blocks={len(self)}, "
+                f"tables={len(self.table_block)}, chars={len(self.text)})")
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the NumPy columns"""
+        return sum(getattr(self, name).nbytes for name in _COLUMNS)
+
+    def block_text(self, i: int) -> str:
+        return self.text[self.block_start[i]:self.block_end[i]]
+
+    def iter_blocks(self, kind: Optional[str] = None, page: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """(block index, text) of every block, optionally only one kind ('text'/'table') or one page"""
+        mask = np.ones(len(self), dtype=bool)
+        if kind is not None:
+            mask &= self.block_kind == BLOCK_KINDS.index(kind)
+        if page is not None:
+            mask &= self.block_page == page
+        for i in np.flatnonzero(mask).tolist():
+            yield i, self.block_text(i)
+
+    def page_text(self, page: int) -> str:
+        """Text of a page (its blocks separated by blank lines), '' for pages without text"""
+        i = np.flatnonzero(self.page_number == page)
+        if not len(i):
+            raise KeyError(f"No page {page}")
+        return self.text[self.page_start[i[0]]:self.page_end[i[0]]]
+
+    def table_rows(self, table: int) -> List[List[str]]:
+        """Cell strings of a table, row by row, e.g. for ai_pipeline.rule_stage.extract_table_kpis"""
+        strings, codes, starts = self.strings, self.cell_code, self.row_cell_start
+        first, last = self.table_row_start[table], self.table_row_start[table + 1]
+        return [[strings[code] for code in codes[starts[row]:starts[row + 1]].tolist()] for row in range(first, last)]
+
+    def locate(self, offset: int) -> Dict[str, Any]:
+        """
+        Source location of a character offset into `text`, e.g. of a passage a KPI was extracted from.
+        Returns:
+            dict: block, kind, page (None if the format has no pages), locator, table (None outside tables)
+            and bbox (PDF table bbox or None).
+        """
+        if not 0 <= offset < max(len(self.text), 1) or not len(self):
+            raise IndexError(f"Offset {offset} is outside the document")
+        block = max(int(np.searchsorted(self.block_start, offset, side='right')) - 1, 0)
+        table = int(self.block_table[block])
+        locator = int(self.block_locator[block])
+        bbox = self.table_bbox[table] if table != MISSING else None
+        return {
+            'block': block,
+            'kind': BLOCK_KINDS[self.block_kind[block]],
+            'page': int(self.block_page[block]) if self.block_page[block] != MISSING else None,
+            'locator': self.strings[locator] if locator != MISSING else None,
+            'table': table if table != MISSING else None,
+            'bbox': tuple(bbox.tolist()) if bbox is not None and not np.isnan(bbox).any() else None,
+        }
+
+class DocumentBuilder:
+    """
+    Accumulates the blocks of a document in source order and packs them into a Document.
+    Parsers call add_text / add_table per block; pages are opened implicitly by the `page` argument.
+    """
+
+    def __init__(self, source: Optional[str] = None, file_format: Optional[str] = None):
+        self.source = source
+        self.format = file_format
+        self.meta: Dict[str, Any] = {}
+        self._parts: List[str] = []
+        self._length = 0
+        self._strings: List[str] = []
+        self._lookup: Dict[str, int] = {}
+        self._columns: Dict[str, List[int]] = {name: [] for name in _COLUMNS if name != 'table_bbox'}
+        self._bboxes: List[Tuple[float, float, float, float]] = []
+
+    def _intern(self, text: str) -> int:
+        code = self._lookup.get(text)
+        if code is None:
+            code = len(self._strings)
+            self._strings.append(text)
+            self._lookup[text] = code
+        return code
+
+    def _append(self, text: str, kind: int, page: Optional[int], table: int, locator: Optional[str]):
+        columns = self._columns
+        if page is not None and (not columns['page_number'] or columns['page_number'][-1] != page):
+            self.add_page(page)
+        if self._parts:
+            self._parts.append(BLOCK_SEPARATOR)
+            self._length += len(BLOCK_SEPARATOR)
+        columns['block_start'].append(self._length)
+        self._parts.append(text)
+        self._length += len(text)
+        columns['block_end'].append(self._length)
+        columns['block_kind'].append(kind)
+        columns['block_page'].append(page if page is not None else MISSING)
+        columns['block_table'].append(table)
+        columns['block_locator'].append(self._intern(locator) if locator is not None else MISSING)
+        if page is not None:
+            columns['page_end'][-1] = self._length
+
+    def add_page(self, page: int):
+        """Start a page, so pages without any text still get an (empty) entry"""
+        columns = self._columns
+        start = self._length + (len(BLOCK_SEPARATOR) if self._parts else 0)
+        columns['page_number'].append(page)
+        columns['page_start'].append(start)
+        columns['page_end'].append(start)
+
+    def add_text(self, text: str, page: Optional[int] = None, locator: Optional[str] = None, split: bool = True):
+        """Add text as one block per paragraph (blank-line separated) or, with split=False, as one block"""
+        for paragraph in (_BLANK_LINE.split(text) if split else [text]):
+            paragraph = paragraph.strip()
+            if paragraph:
+                self._append(paragraph, 0, page, MISSING, locator)
+
+    def add_table(self, rows: Sequence[Sequence[Any]], page: Optional[int] = None, locator: Optional[str] = None,
+                  bbox: Optional[Sequence[float]] = None):
+        """Add a table (rows of cells; None becomes '') as one block rendered by render_table"""
+        rows = [['' if cell is None else str(cell) for cell in row] for row in rows]
+        if not any(any(row) for row in rows):
+            return
+        columns = self._columns
+        table = len(columns['table_block'])
+        columns['table_block'].append(len(columns['block_start']))
+        columns['table_row_start'].append(len(columns['row_cell_start']))
+        for row in rows:
+            columns['row_cell_start'].append(len(columns['cell_code']))
+            columns['cell_code'].extend(self._intern(cell) for cell in row)
+        self._bboxes.append(tuple(bbox) if bbox is not None else (np.nan,) * 4)
+        self._append(render_table(rows), 1, page, table, locator)
+
+    def build(self) -> Document:
+        columns = {name: np.asarray(values, dtype=_COLUMNS[name]) for name, values in self._columns.items()
+                   if name != 'table_bbox'}
+        # Closing offsets, so row r of table t spans row_cell_start[r]:row_cell_start[r + 1]
+        columns['table_row_start'] = np.append(columns['table_row_start'], len(columns['row_cell_start']))
+        columns['row_cell_start'] = np.append(columns['row_cell_start'], len(columns['cell_code']))
+        columns['table_bbox'] = np.asarray(self._bboxes, dtype=np.float32).reshape(-1, 4)
+        return Document(''.join(self._parts), columns, self._strings, self.source, self.format, dict(self.meta))
@@ -1,13 +1,183 @@
-import pandas as pd
-from typing import List, Dict
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
 
-def parse_excel(file_path: str) -> List[Dict]:
+from data_ingestion.parse_cache import ParseCache, default_parse_cache, file_digest
+from lazy_imports import lazy_import, optional_lazy_import
+
+pd = lazy_import('pandas')
+openpyxl = lazy_import('openpyxl')
+pa = optional_lazy_import('pyarrow')
+
+PARSER_VERSION = 1  # Bump when the parsed rows change, so cached documents are not reused
+
+def parse_excel(file_path: str, cache: Optional[ParseCache] = None) -> List[Dict]:
     """
     Parse an Excel or CSV file and return its content as a list of dictionaries (one per row).
     Args:
         file_path (str): Path to the Excel or CSV file.
+        cache (ParseCache, optional): Parse cache; defaults to the one configured through
+            PARSE_CACHE_DIR (see data_ingestion.parse_cache), if any.
     Returns:
         List[Dict]: List of rows as dictionaries.
+    Note:
+        This loads the whole sheet; use iter_excel_batches for large data-provider dumps.
+    """
+    cache = cache if cache is not None else default_parse_cache()
+    # The file type decides the reader, so it is part of the key alongside the content hash
+    key = (cache.key('excel', PARSER_VERSION, file_digest(file_path), file_path.rsplit('.', 1)[-1].lower())
+           if cache is not None else None)
+    rows = cache.get_object(key) if key else None
+    if rows is None:
+        df = pd.read_excel(file_path) if file_path.endswith(('.xls', '.xlsx')) else pd.read_csv(file_path)
+        rows = df.to_dict(orient='records')
+        if key:
+            cache.set_object(key, rows)
+    return rows
+
+def _parquet():
+    if not pa:
+        raise ImportError("pyarrow is required for Parquet support. Please install it.")
+    import pyarrow.parquet
+    return pyarrow.parquet
+
+def _frame(rows: List[Sequence], columns: List[str], dtype: Optional[Dict[str, str]]):
+    df = pd.DataFrame(rows, columns=columns)
+    return df.astype(dtype) if dtype else df
+
+def _iter_xlsx(file_path: str, batch_size: int, usecols: Optional[Sequence[str]], dtype: Optional[Dict[str, str]],
+               sheet_name: Optional[str]) -> Iterator:
+    """Row batches of a worksheet read with openpyxl in read-only mode (rows are streamed, not loaded)"""
+    # Through a file object, since openpyxl rejects paths without an Excel extension
+    f = open(file_path, 'rb')
+    workbook = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        keep = [i for i, name in enumerate(header) if usecols is None or name in usecols]
+        columns = [header[i] for i in keep]
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append([row[i] if i < len(row) else None for i in keep])
+            if len(batch) >= batch_size:
+                yield _frame(batch, columns, dtype)
+                batch = []
+        if batch:
+            yield _frame(batch, columns, dtype)
+    finally:
+        workbook.close()
+        f.close()
+
+def _read_batches(file_path: str, batch_size: int, usecols: Optional[Sequence[str]],
+                  dtype: Optional[Dict[str, str]], sheet_name: Optional[str],
+                  file_format: Optional[str] = None) -> Iterator:
+    kind = file_format or file_path.rsplit('.', 1)[-1].lower()
+    if kind == 'parquet':
+        parquet = _parquet().ParquetFile(file_path)
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=list(usecols) if usecols else None):
+            df = batch.to_pandas()
+            yield df.astype(dtype) if dtype else df
+    elif kind in ('xlsx', 'xlsm'):
+        yield from _iter_xlsx(file_path, batch_size, usecols, dtype, sheet_name)
+    elif kind == 'xls':
+        # The legacy format has no streaming reader: load once, hand out slices
+        df = pd.read_excel(file_path, sheet_name=sheet_name or 0, usecols=usecols, dtype=dtype)
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start:start + batch_size]
+    else:
+        with pd.read_csv(file_path, chunksize=batch_size, usecols=usecols, dtype=dtype) as reader:
+            yield from reader
+
+def _tee_to_parquet(batches: Iterator, parquet_path: str, compression: str) -> Iterator:
+    """Pass batches through while appending them to a Parquet file, published only once complete"""
+    parquet = _parquet()
+    tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    writer = None
+    try:
+        for df in batches:
+            try:
+                table = pa.Table.from_pandas(df, schema=writer.schema if writer else None, preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"Column types differ between batches of {parquet_path}; pass an explicit "
+                                 f"dtype for the affected columns ({e})") from e
+            if writer is None:
+                writer = parquet.ParquetWriter(tmp_path, table.schema, compression=compression)
+            writer.write_table(table)
+            yield df
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(tmp_path, parquet_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def parquet_path_for(file_path: str, parquet_dir: str, dtype: Optional[Dict[str, str]] = None,
+                     sheet_name: Optional[str] = None) -> str:
+    """Parquet copy of a spreadsheet in `parquet_dir`, named by its content hash and read options"""
+    options = json.dumps({'dtype': dtype, 'sheet': sheet_name, 'version': PARSER_VERSION}, sort_keys=True, default=str)
+    suffix = hashlib.sha256(options.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(parquet_dir, f"{file_digest(file_path)}-{suffix}.parquet")
+
+def iter_excel_batches(file_path: str, batch_size: int = 50_000, usecols: Optional[Sequence[str]] = None,
+                       dtype: Optional[Dict[str, str]] = None, sheet_name: Optional[str] = None,
+                       parquet_dir: Optional[str] = None, file_format: Optional[str] = None) -> Iterator:
+    """
+    Stream an Excel, CSV or Parquet file as pandas DataFrames of at most `batch_size` rows.
+    CSVs are read in chunks, xlsx sheets row by row with openpyxl in read-only mode, and Parquet by
+    record batch, so memory stays bounded by the batch size rather than the file size.
+    Args:
+        file_path (str): Path to the .csv, .xlsx/.xlsm, .xls or .parquet file.
+        batch_size (int): Rows per batch.
+        usecols (Sequence[str], optional): Only read these columns.
+        dtype (dict, optional): Column dtypes, e.g. {'company': 'string', 'value': 'float64'}. Without
+            them each CSV chunk infers its own types, so a column can differ between batches.
+        sheet_name (str, optional): Worksheet to read (default: the active/first sheet).
+        parquet_dir (str, optional): Keep a Parquet copy of the file here. The first run converts while
+            streaming; later runs with the same file content and dtype read the Parquet copy instead.
+        file_format (str, optional): 'csv', 'xlsx', 'xls' or 'parquet' when the extension does not tell
+            (see data_ingestion.dispatcher.sniff_format).
+    Yields:
+        pandas.DataFrame: The next batch of rows.
+    """
+    if parquet_dir and (file_format or file_path.rsplit('.', 1)[-1].lower()) != 'parquet':
+        parquet_path = parquet_path_for(file_path, parquet_dir, dtype, sheet_name)
+        if os.path.exists(parquet_path):
+            yield from _read_batches(parquet_path, batch_size, usecols, None, None)
+            return
+        os.makedirs(parquet_dir, exist_ok=True)
+        # Convert every column so the copy serves later runs with other usecols too
+        for df in _tee_to_parquet(_read_batches(file_path, batch_size, None, dtype, sheet_name, file_format),
+                                  parquet_path, 'snappy'):
+            yield df[list(usecols)] if usecols else df
+        return
+    yield from _read_batches(file_path, batch_size, usecols, dtype, sheet_name, file_format)
+
+def convert_to_parquet(file_path: str, parquet_path: Optional[str] = None, batch_size: int = 50_000,
+                       dtype: Optional[Dict[str, str]] = None, sheet_name: Optional[str] = None,
+                       compression: str = 'snappy') -> str:
+    """
+    Convert an Excel or CSV file to Parquet batch by batch, without loading it whole.
+    Args:
+        file_path (str): Path to the Excel or CSV file.
+        parquet_path (str, optional): Output path (default: the input path with a .parquet extension).
+        batch_size (int): Rows per batch.
+        dtype (dict, optional): Column dtypes (see iter_excel_batches).
+        sheet_name (str, optional): Worksheet to convert.
+        compression (str): Parquet compression codec.
+    Returns:
+        str: Path of the Parquet file.
     """
-    df = pd.read_excel(file_path) if file_path.endswith(('.xls', '.xlsx')) else pd.read_csv(file_path)
-    return df.to_dict(orient='records')
+    parquet_path = parquet_path or f"{os.path.splitext(file_path)[0]}.parquet"
+    for _ in _tee_to_parquet(_read_batches(file_path, batch_size, None, dtype, sheet_name), parquet_path, compression):
+        pass
+    return parquet_path
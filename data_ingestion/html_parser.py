@@ -1,13 +1,189 @@
-from bs4 import BeautifulSoup
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
 
-def parse_html(file_path: str) -> str:
+from data_ingestion.parse_cache import ParseCache, default_parse_cache, file_digest
+from lazy_imports import lazy_import
+
+bs4 = lazy_import('bs4')
+lxml_html = lazy_import('lxml.html')
+etree = lazy_import('lxml.etree')
+
+PARSER_VERSION = 2  # Bump when the extracted text changes, so cached documents are not reused
+
+# Removed with everything inside them by the fast path (ix:header holds the hidden facts and contexts of iXBRL)
+BOILERPLATE_TAGS = ('script', 'style', 'noscript', 'template', 'nav', 'footer', 'aside', 'iframe', 'svg', 'form',
+                    'ix:header')
+BOILERPLATE_ROLES = ('navigation', 'banner', 'contentinfo', 'complementary', 'search')
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'blockquote', 'body', 'br', 'caption', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'ol', 'p', 'pre', 'section', 'td', 'th',
+    'title', 'tr', 'ul',
+))
+
+def parse_html(file_path: str, cache: Optional[ParseCache] = None, fast: bool = False) -> str:
     """
     Extract all text from an HTML or XML file using BeautifulSoup.
     Args:
         file_path (str): Path to the HTML or XML file.
+        cache (ParseCache, optional): Parse cache; defaults to the one configured through
+            PARSE_CACHE_DIR (see data_ingestion.parse_cache), if any.
+        fast (bool): Use the lxml fast path instead (see extract_html_text): boilerplate removed,
+            one block per paragraph and tables kept as rows.
     Returns:
         str: Extracted text from the file.
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f, 'html.parser')
-    return soup.get_text(separator='\n')
+    cache = cache if cache is not None else default_parse_cache()
+    key = (cache.key('html', PARSER_VERSION, file_digest(file_path), 'lxml' if fast else '')
+           if cache is not None else None)
+    text = cache.get_text(key) if key else None
+    if text is None:
+        if fast:
+            text = extract_html_text(file_path)
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                soup = bs4.BeautifulSoup(f, 'html.parser')
+            text = soup.get_text(separator='\n')
+        if key:
+            cache.set_text(key, text)
+    return text
+
+def _load_html(source: Union[str, bytes], strip_boilerplate: bool):
+    """Root element of an HTML file (path) or document (bytes), with boilerplate removed if asked"""
+    parser = lxml_html.HTMLParser(remove_comments=True, remove_pis=True)
+    root = (lxml_html.document_fromstring(source, parser=parser) if isinstance(source, bytes)
+            else lxml_html.parse(source, parser=parser).getroot())
+    if root is None:
+        return None
+    if strip_boilerplate:
+        etree.strip_elements(root, *BOILERPLATE_TAGS, with_tail=False)
+        roles = ' or '.join(f"@role='{role}'" for role in BOILERPLATE_ROLES)
+        for element in root.xpath(f"//*[{roles}]"):
+            element.drop_tree()
+    else:
+        etree.strip_elements(root, 'script', 'style', with_tail=False)
+    return root
+
+def _table_rows(table) -> List[List[str]]:
+    """Cell texts of a table's own rows (not those of nested tables); colspans padded with empty cells"""
+    rows = []
+    for tr in table.xpath('./tr|./thead/tr|./tbody/tr|./tfoot/tr'):
+        row = []
+        for cell in tr.xpath('./th|./td'):
+            row.append(' '.join(cell.text_content().split()))
+            span = cell.get('colspan', '1')
+            row.extend([''] * (int(span) - 1 if span.isdigit() and int(span) > 1 else 0))
+        if any(row):
+            rows.append(row)
+    return rows
+
+def _blocks(root, keep_tables: bool, tables: Optional[List[Tuple[int, List[List[str]]]]] = None) -> List[str]:
+    """
+    Text of a tree as blocks: one per paragraph-level element, one per table (a line per row).
+    If a `tables` list is given, (block index, rows) of each table block is appended to it.
+    """
+    blocks, current = [], []
+
+    def flush():
+        text = ' '.join(''.join(current).split())
+        if text:
+            blocks.append(text)
+        current.clear()
+
+    def walk(element):
+        tag = element.tag if isinstance(element.tag, str) else ''
+        if keep_tables and tag == 'table':
+            flush()
+            rows = _table_rows(element)
+            if rows:
+                if tables is not None:
+                    tables.append((len(blocks), rows))
+                blocks.append('\n'.join(' | '.join(row) for row in rows))
+            return
+        block = tag in BLOCK_TAGS
+        if block:
+            flush()
+        if element.text:
+            current.append(element.text)
+        for child in element:
+            walk(child)
+            if child.tail:
+                current.append(child.tail)
+        if block:
+            flush()
+
+    walk(root)
+    flush()
+    return blocks
+
+def extract_html_text(source: Union[str, bytes], strip_boilerplate: bool = True, keep_tables: bool = True) -> str:
+    """
+    Fast text extraction with lxml's C parser.
+    Scripts, styles, navigation, footers, asides, forms and elements with a navigation/banner/contentinfo
+    role are dropped, so prompts only carry report content. Paragraph-level blocks are separated by a
+    blank line (the passage boundary used by ai_pipeline.rule_stage) and each table becomes one block
+    with a line per row and cells separated by ' | '.
+    Args:
+        source (str | bytes): Path to the HTML file, or the document itself as bytes.
+        strip_boilerplate (bool): Remove navigation and page furniture (scripts and styles always go).
+        keep_tables (bool): Render tables row by row; otherwise their text flows like other blocks.
+    Returns:
+        str: Extracted text.
+    """
+    root = _load_html(source, strip_boilerplate)
+    return '\n\n'.join(_blocks(root, keep_tables)) if root is not None else ''
+
+def extract_html_blocks(source: Union[str, bytes],
+                        strip_boilerplate: bool = True) -> List[Tuple[str, Optional[List[List[str]]]]]:
+    """
+    The blocks of extract_html_text with their structure: (text, None) for a paragraph-level block,
+    (rendered table, rows of cell strings) for a table.
+    Args:
+        source (str | bytes): Path to the HTML file, or the document itself as bytes.
+        strip_boilerplate (bool): Remove navigation and page furniture (scripts and styles always go).
+    Returns:
+        List[Tuple[str, Optional[List[List[str]]]]]: Blocks in document order.
+    """
+    root = _load_html(source, strip_boilerplate)
+    if root is None:
+        return []
+    tables: List[Tuple[int, List[List[str]]]] = []
+    blocks = _blocks(root, True, tables)
+    rows = dict(tables)
+    return [(block, rows.get(i)) for i, block in enumerate(blocks)]
+
+def extract_html_tables(source: Union[str, bytes], strip_boilerplate: bool = True) -> List[List[List[str]]]:
+    """
+    Tables of an HTML document as rows of cell strings, e.g. for ai_pipeline.rule_stage.extract_table_kpis.
+    Args:
+        source (str | bytes): Path to the HTML file, or the document itself as bytes.
+        strip_boilerplate (bool): Ignore tables inside navigation and page furniture.
+    Returns:
+        List[List[List[str]]]: One list of rows per table, in document order.
+    """
+    root = _load_html(source, strip_boilerplate)
+    if root is None:
+        return []
+    return [rows for rows in (_table_rows(table) for table in root.iter('table')) if rows]
+
+def iter_xml_text(file_path: str, tags: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Stream the text of a large XML file with lxml's iterparse, in bounded memory: every element is
+    cleared once parsed and processed siblings are dropped from the tree.
+    Args:
+        file_path (str): Path to the XML file.
+        tags (Sequence[str], optional): Local names (any namespace) of the elements to report
+            (default: every element with text of its own).
+    Yields:
+        Tuple[str, str]: Local tag name and the element's whitespace-normalized text.
+    """
+    wanted = {tags} if isinstance(tags, str) else set(tags) if tags else None
+    for _, element in etree.iterparse(file_path, events=('end',), huge_tree=True,
+                                      remove_comments=True, remove_pis=True):
+        name = element.tag.rpartition('}')[2]
+        if element.text and (wanted is None or name in wanted):
+            text = ' '.join(element.text.split())
+            if text:
+                yield name, text
+        if len(element):
+            element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del element.getparent()[0]
@@ -0,0 +1,146 @@
+import hashlib
+import mmap
+import os
+import pickle
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+_digests: Dict[Tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+def file_digest(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a file's content, read in chunks. Digests are memoized per process on
+    (path, size, mtime), so a file that has not changed is only hashed once.
+    """
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        digest = _digests.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(chunk_size), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        with _digest_lock:
+            _digests[memo_key] = digest
+    return digest
+
+class ParseCache:
+    """
+    Content-addressed store for parser output, keyed on (parser, parser version, file SHA-256, part),
+    where part names a page or the whole document. Each entry is one file, written through a temp
+    file and rename. Reads refresh an entry's mtime; once the store grows past `max_bytes` the least
+    recently used entries are evicted. Entries of at least `mmap_threshold` bytes are read through a
+    memory map instead of being copied into an intermediate bytes object first.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30, mmap_threshold: int = 1 << 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.mmap_threshold = max(mmap_threshold, 1)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def key(parser: str, version: int, digest: str, part: str = '') -> str:
+        return hashlib.sha256(f"{parser}|{version}|{digest}|{part}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str, kind: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{kind}")
+
+    def _entries(self):
+        """(path, mtime, size) of every entry in the store"""
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith('.tmp'):
+                        stat = entry.stat()
+                        yield entry.path, stat.st_mtime, stat.st_size
+
+    def _read(self, key: str, kind: str) -> Optional[Any]:
+        path = self._path(key, kind)
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size >= self.mmap_threshold:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                        value = str(view, 'utf-8') if kind == 'txt' else pickle.loads(view)
+                else:
+                    data = f.read()
+                    value = data.decode('utf-8') if kind == 'txt' else pickle.loads(data)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def _write(self, key: str, kind: str, data: bytes):
+        path = self._path(key, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the store is back under 90% of max_bytes"""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self._size = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+            self.evicted += 1
+
+    def has_text(self, key: str) -> bool:
+        return os.path.exists(self._path(key, 'txt'))
+
+    def get_text(self, key: str) -> Optional[str]:
+        return self._read(key, 'txt')
+
+    def set_text(self, key: str, text: str):
+        self._write(key, 'txt', text.encode('utf-8'))
+
+    def get_object(self, key: str) -> Optional[Any]:
+        return self._read(key, 'pkl')
+
+    def set_object(self, key: str, value: Any):
+        self._write(key, 'pkl', pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def size_bytes(self) -> int:
+        return self._size
+
+def cache_from_env() -> Optional[ParseCache]:
+    """
+    Parse cache configured through the environment, or None:
+    PARSE_CACHE_DIR (store directory) and PARSE_CACHE_MAX_MB (size limit, default 1024).
+    """
+    directory = os.environ.get('PARSE_CACHE_DIR')
+    if not directory:
+        return None
+    return ParseCache(directory, max_bytes=int(float(os.environ.get('PARSE_CACHE_MAX_MB', '1024')) * (1 << 20)))
+
+_default = None
+_default_loaded = False
+
+def default_parse_cache() -> Optional[ParseCache]:
+    """Process-wide parse cache from cache_from_env(), created on first use"""
+    global _default, _default_loaded
+    if not _default_loaded:
+        _default = cache_from_env()
+        _default_loaded = True
+    return _default
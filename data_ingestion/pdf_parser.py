@@ -1,17 +1,205 @@
-import pdfplumber
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-def parse_pdf(file_path: str) -> str:
+from data_ingestion.parse_cache import ParseCache, default_parse_cache, file_digest
+from lazy_imports import lazy_import
+
+pdfplumber = lazy_import('pdfplumber')
+
+PARSER_VERSION = 1  # Bump when the extracted text changes, so cached pages are not reused
+PageRange = Tuple[int, int]  # (first, last) page, 1-based and inclusive
+
+def page_count(file_path: str) -> int:
+    """Number of pages in a PDF file"""
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+def _page_numbers(total: int, page_range: Optional[PageRange]) -> List[int]:
+    first, last = page_range or (1, total)
+    return list(range(max(first, 1), min(last, total) + 1))
+
+def _ocr_pages(file_path: str, pending: List[Tuple[int, Optional[str]]],
+               ocr_options: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """Fill in the text of the scanned pages (text None) among buffered (page_number, text) pairs"""
+    from ai_pipeline.ocr_stage import ocr_pdf_pages
+    scanned = [number - 1 for number, text in pending if text is None]
+    ocr_text = {r['page'] + 1: r['text'] for r in ocr_pdf_pages(file_path, pages=scanned, **ocr_options)}
+    return [(number, ocr_text.get(number, '') if text is None else text) for number, text in pending]
+
+def _page_tables(page, table_settings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Tables pdfplumber finds on a page, each with its bbox, cell rows and the KPIs read from it"""
+    from ai_pipeline.rule_stage import extract_table_kpis
+    tables = []
+    for table in page.find_tables(table_settings or {}):
+        rows = table.extract()
+        tables.append({'page': page.page_number, 'bbox': table.bbox, 'rows': rows, 'kpis': extract_table_kpis(rows)})
+    return tables
+
+def _iter_serial(file_path: str, numbers: List[int], ocr: bool, ocr_options: Dict[str, Any],
+                 skip_tables: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Parse pages in this process, releasing each page's objects once its text is extracted.
+    `skip_tables` (table settings, or None to keep tables) leaves out tables that yield KPIs.
+    """
+    ocr_options = dict(ocr_options)
+    min_chars = ocr_options.pop('min_chars', 20)
+    ocr_batch = ocr_options.pop('batch_pages', 16)
+    pending: List[Tuple[int, Optional[str]]] = []  # Pages held back until the scanned ones among them are OCRed
+    with pdfplumber.open(file_path, pages=numbers) as pdf:
+        for page in pdf.pages:
+            if ocr and len(page.chars) < min_chars:
+                pending.append((page.page_number, None))
+            else:
+                region = page
+                if skip_tables is not None:
+                    for table in _page_tables(page, skip_tables):
+                        if table['kpis']:
+                            region = region.outside_bbox(table['bbox'])
+                text = region.extract_text() or ''
+                if pending:
+                    pending.append((page.page_number, text))
+                else:
+                    yield page.page_number, text
+            page.close()
+            if len(pending) >= ocr_batch:
+                yield from _ocr_pages(file_path, pending, ocr_options)
+                pending = []
+    if pending:
+        yield from _ocr_pages(file_path, pending, ocr_options)
+
+def _parse_page_chunk(file_path: str, numbers: List[int], ocr: bool, ocr_options: Dict[str, Any],
+                      skip_tables: Optional[Dict[str, Any]] = None) -> List[Tuple[int, str]]:
+    """Worker: parse one chunk of pages (scanned pages are OCRed inside the worker)"""
+    return list(_iter_serial(file_path, numbers, ocr, {**ocr_options, 'max_workers': 1}, skip_tables))
+
+def _iter_parsed(file_path: str, numbers: List[int], workers: int, chunk_size: int, ocr: bool,
+                 ocr_options: Dict[str, Any], skip_tables: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[int, str]]:
+    """Parse the given pages, serially or spread over a process pool, yielding them in page order"""
+    if not numbers:
+        return
+    if workers <= 1 or len(numbers) <= chunk_size:
+        yield from _iter_serial(file_path, numbers, ocr, ocr_options, skip_tables)
+        return
+    chunks = [numbers[i:i + chunk_size] for i in range(0, len(numbers), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded window of chunks in flight so finished pages do not pile up in memory
+        window = workers * 2
+        futures = [pool.submit(_parse_page_chunk, file_path, chunk, ocr, ocr_options, skip_tables)
+                   for chunk in chunks[:window]]
+        for i in range(len(chunks)):
+            if i + window < len(chunks):
+                futures.append(pool.submit(_parse_page_chunk, file_path, chunks[i + window], ocr, ocr_options,
+                                           skip_tables))
+            yield from futures[i].result()
+            futures[i] = None
+
+def iter_pdf_pages(file_path: str, page_range: Optional[PageRange] = None, workers: int = 1,
+                   chunk_size: int = 16, ocr: bool = False, ocr_options: Optional[Dict[str, Any]] = None,
+                   cache: Optional[ParseCache] = None, skip_tables: bool = False,
+                   table_settings: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for each page of a PDF, in page order, as pages are parsed.
+    Args:
+        file_path (str): Path to the PDF file.
+        page_range (Tuple[int, int], optional): First and last page to parse (1-based, inclusive).
+        workers (int): Processes to spread page chunks over; 1 parses in this process.
+        chunk_size (int): Pages per worker task in parallel mode.
+        ocr (bool): OCR pages without a text layer (see parse_pdf).
+        ocr_options (dict, optional): Keyword arguments for ai_pipeline.ocr_stage.ocr_pdf_pages,
+            plus min_chars (text layer threshold) and batch_pages (scanned pages OCRed together).
+        cache (ParseCache, optional): Per-page parse cache; defaults to the one configured through
+            PARSE_CACHE_DIR (see data_ingestion.parse_cache), if any. Only uncached pages are parsed.
+        skip_tables (bool): Leave out the regions of tables that extract_pdf_table_kpis reads KPIs from,
+            so text sent to the model does not repeat them. Unrecognized tables are kept.
+        table_settings (dict, optional): pdfplumber table finder settings used with skip_tables.
+    Yields:
+        Tuple[int, str]: 1-based page number and its text ('' for pages without text).
+    """
+    ocr_options = dict(ocr_options or {})
+    tables = dict(table_settings or {}) if skip_tables else None
+    cache = cache if cache is not None else default_parse_cache()
+    if cache is None:
+        numbers = _page_numbers(page_count(file_path), page_range)
+        yield from _iter_parsed(file_path, numbers, workers, chunk_size, ocr, ocr_options, tables)
+        return
+    digest = file_digest(file_path)
+    count_key = cache.key('pdf', PARSER_VERSION, digest, 'page_count')
+    total = cache.get_text(count_key)
+    if total is None:
+        total = page_count(file_path)
+        cache.set_text(count_key, str(total))
+    # OCR settings change what a scanned page's text is, so they are part of the page key
+    variant = json.dumps(ocr_options, sort_keys=True, default=str) if ocr else ''
+    if tables is not None:
+        variant += f"|tables:{json.dumps(tables, sort_keys=True, default=str)}"
+    keys = {n: cache.key('pdf', PARSER_VERSION, digest, f"page:{n}|ocr:{variant}")
+            for n in _page_numbers(int(total), page_range)}
+    missing = [n for n, key in keys.items() if not cache.has_text(key)]
+    parsed = _iter_parsed(file_path, missing, workers, chunk_size, ocr, ocr_options, tables)
+    missing = set(missing)
+    for number, key in keys.items():
+        text = None if number in missing else cache.get_text(key)
+        if text is None:
+            # Not cached, or evicted since the lookup above
+            number, text = next(parsed) if number in missing else next(_iter_serial(file_path, [number], ocr,
+                                                                                     ocr_options, tables))
+            cache.set_text(key, text)
+        yield number, text
+
+def parse_pdf(file_path: str, ocr: bool = False, ocr_options: Optional[Dict[str, Any]] = None,
+              page_range: Optional[PageRange] = None, workers: int = 1, cache: Optional[ParseCache] = None,
+              skip_tables: bool = False) -> str:
     """
     Extract all text from a PDF file using pdfplumber.
     Args:
         file_path (str): Path to the PDF file.
+        ocr (bool): OCR pages without a text layer (scanned pages) and merge their text in page order.
+        ocr_options (dict, optional): Keyword arguments for ai_pipeline.ocr_stage.ocr_pdf_pages
+            (e.g. cache_dir, max_workers, resolution, min_chars).
+        page_range (Tuple[int, int], optional): First and last page to parse (1-based, inclusive).
+        workers (int): Parse page chunks in this many processes (see iter_pdf_pages).
+        cache (ParseCache, optional): Per-page parse cache (see iter_pdf_pages).
+        skip_tables (bool): Leave out tables that extract_pdf_table_kpis reads KPIs from.
     Returns:
         str: Extracted text from the PDF.
     """
-    text = []
-    with pdfplumber.open(file_path) as pdf:
+    return '\n'.join(text for _, text in iter_pdf_pages(file_path, page_range, workers, ocr=ocr,
+                                                         ocr_options=ocr_options, cache=cache,
+                                                         skip_tables=skip_tables) if text)
+
+def extract_pdf_tables(file_path: str, page_range: Optional[PageRange] = None,
+                       table_settings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Find the tables of a PDF with pdfplumber's table finder and read KPIs from them.
+    Args:
+        file_path (str): Path to the PDF file.
+        page_range (Tuple[int, int], optional): First and last page to search (1-based, inclusive).
+        table_settings (dict, optional): pdfplumber table finder settings (default: ruling lines;
+            {'vertical_strategy': 'text', 'horizontal_strategy': 'text'} for tables without rules).
+    Returns:
+        List[dict]: Per table, in page order: page, bbox, rows (cell strings) and kpis
+        (see ai_pipeline.rule_stage.extract_table_kpis; empty if the table is not KPI data).
+    """
+    tables = []
+    with pdfplumber.open(file_path, pages=_page_numbers(page_count(file_path), page_range)) as pdf:
         for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text.append(page_text)
-    return '\n'.join(text)
+            tables.extend(_page_tables(page, table_settings))
+            page.close()
+    return tables
+
+def extract_pdf_table_kpis(file_path: str, page_range: Optional[PageRange] = None,
+                           table_settings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    KPIs read directly from the data tables of a PDF, without the LLM.
+    Combine with parse_pdf(file_path, skip_tables=True) to send only the remaining text to the model.
+    Args:
+        file_path (str): Path to the PDF file.
+        page_range (Tuple[int, int], optional): First and last page to search (1-based, inclusive).
+        table_settings (dict, optional): pdfplumber table finder settings (see extract_pdf_tables).
+    Returns:
+        List[dict]: KPIs in the extractor schema with extraction_method 'table', plus the table's
+        'metric' label, the canonical 'unit' and the 1-based 'page'.
+    """
+    return [{**kpi, 'page': table['page']} for table in extract_pdf_tables(file_path, page_range, table_settings)
+            for kpi in table['kpis']]
@@ -1,11 +1,451 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from lazy_imports import lazy_import
+
+httpx = lazy_import('httpx')
+lxml_html = lazy_import('lxml.html')
+
+USER_AGENT = 'ESGDisclosureCrawler/1.0'
+# Links to these are reports: PDFs, XBRL instances, inline XBRL (ESEF) documents and report packages
+REPORT_LINK = re.compile(r'\.(?:pdf|xbrl|xhtml|zip)$', re.IGNORECASE)
+REPORT_EXTENSIONS = ('.pdf', '.xbrl', '.xhtml', '.zip')
+# Content types of reports reached through a page link, with the extension they are saved under
+REPORT_TYPES = (('pdf', '.pdf'), ('xbrl', '.xbrl'), ('zip', '.zip'))
+# Generic content types whose first bytes decide whether a page link is a report
+SNIFFED_TYPES = re.compile(r'^$|octet-stream|binary|\bxml\b|text/plain')
+REPORT_MAGIC = ((b'%PDF-', '.pdf'), (b'PK\x03\x04', '.zip'))
+_INLINE_XBRL = re.compile(rb'xmlns:ix\s*=|<ix:header')
+_XBRL_ROOT = re.compile(rb'<(?:\w+:)?xbrl[\s>/]')
+
+class Frontier:
+    """
+    Persistent crawl frontier in SQLite: every URL with its state, validators (ETag / Last-Modified),
+    content hash and the pass it was last fetched in, plus the links between pages and the hashes of
+    all content seen. Each crawl is a numbered pass; a URL is fetched at most once per pass, and an
+    interrupted pass resumes from the URLs still pending.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY, host TEXT, kind TEXT, depth INTEGER, state TEXT, pass INTEGER DEFAULT 0,
+                etag TEXT, last_modified TEXT, content_hash TEXT, status INTEGER, attempts INTEGER DEFAULT 0,
+                error TEXT, path TEXT, fetched_at REAL);
+            CREATE INDEX IF NOT EXISTS urls_state ON urls (state, depth);
+            CREATE TABLE IF NOT EXISTS links (src TEXT, dst TEXT, PRIMARY KEY (src, dst));
+            CREATE TABLE IF NOT EXISTS content (hash TEXT PRIMARY KEY, url TEXT);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    @property
+    def current_pass(self) -> int:
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'pass'").fetchone()
+        return int(row[0]) if row else 0
+
+    def pending_count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM urls WHERE state = 'pending'").fetchone()[0]
+
+    def start_pass(self, resume: bool = False) -> int:
+        """Begin a new pass, or keep the current one if `resume` and it still has pending URLs"""
+        number = self.current_pass
+        if not (resume and number and self.pending_count()):
+            number += 1
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pass', ?)", (str(number),))
+            self.db.commit()
+        return number
+
+    def add(self, urls: Iterable[Tuple[str, str, int]], current_pass: int) -> int:
+        """Queue (url, kind, depth) entries not yet fetched in this pass; returns how many were queued"""
+        queued = 0
+        for url, kind, depth in urls:
+            row = self.db.execute("SELECT state, pass, depth FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                self.db.execute("INSERT INTO urls (url, host, kind, depth, state) VALUES (?, ?, ?, ?, 'pending')",
+                                (url, urlsplit(url).netloc, kind, depth))
+                queued += 1
+            elif row[0] != 'pending' and row[1] < current_pass:
+                self.db.execute("UPDATE urls SET state = 'pending', depth = MIN(depth, ?), attempts = 0 WHERE url = ?",
+                                (depth, url))
+                queued += 1
+        self.db.commit()
+        return queued
+
+    def pending(self, limit: int, exclude: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Next pending URLs, shallowest first"""
+        exclude = set(exclude)
+        rows = self.db.execute(
+            "SELECT url, kind, depth, etag, last_modified, content_hash, attempts FROM urls "
+            "WHERE state = 'pending' ORDER BY depth, rowid LIMIT ?", (limit + len(exclude),)).fetchall()
+        keys = ('url', 'kind', 'depth', 'etag', 'last_modified', 'content_hash', 'attempts')
+        return [dict(zip(keys, row)) for row in rows if row[0] not in exclude][:limit]
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        cursor = self.db.execute("SELECT * FROM urls WHERE url = ?", (url,))
+        row = cursor.fetchone()
+        return dict(zip([c[0] for c in cursor.description], row)) if row else None
+
+    def finish(self, url: str, state: str, current_pass: int, **fields):
+        """Record the outcome of a fetch (fields: etag, last_modified, content_hash, status, error, path)"""
+        columns = {'state': state, 'pass': current_pass, 'fetched_at': time.time(), **fields}
+        assignments = ', '.join(f"{column} = ?" for column in columns)
+        self.db.execute(f"UPDATE urls SET {assignments} WHERE url = ?", (*columns.values(), url))
+        self.db.commit()
+
+    def retry(self, url: str, error: str, max_attempts: int, current_pass: int):
+        """Count a failed attempt; the URL stays pending until it has failed `max_attempts` times"""
+        self.db.execute("UPDATE urls SET attempts = attempts + 1, error = ? WHERE url = ?", (error, url))
+        attempts = self.db.execute("SELECT attempts FROM urls WHERE url = ?", (url,)).fetchone()[0]
+        if attempts >= max_attempts:
+            self.finish(url, 'error', current_pass)
+        self.db.commit()
+
+    def set_links(self, src: str, dsts: Iterable[str]):
+        self.db.execute("DELETE FROM links WHERE src = ?", (src,))
+        self.db.executemany("INSERT OR IGNORE INTO links (src, dst) VALUES (?, ?)", [(src, dst) for dst in dsts])
+        self.db.commit()
+
+    def links(self, src: str) -> List[Tuple[str, str]]:
+        """(url, kind) of the links last seen on a page"""
+        return self.db.execute("SELECT links.dst, urls.kind FROM links JOIN urls ON urls.url = links.dst "
+                               "WHERE links.src = ?", (src,)).fetchall()
+
+    def claim_content(self, content_hash: str, url: str) -> Optional[str]:
+        """Register content for a URL; returns the other URL that already has identical content, if any"""
+        row = self.db.execute("SELECT url FROM content WHERE hash = ?", (content_hash,)).fetchone()
+        if row and row[0] != url:
+            return row[0]
+        self.db.execute("INSERT OR REPLACE INTO content (hash, url) VALUES (?, ?)", (content_hash, url))
+        self.db.commit()
+        return None
+
+def sniff_report(head: bytes) -> Optional[str]:
+    """Extension of the report the first bytes of a response belong to (PDF, zip, XBRL, iXBRL), else None"""
+    for magic, extension in REPORT_MAGIC:
+        if head.startswith(magic):
+            return extension
+    if _INLINE_XBRL.search(head):
+        return '.xhtml'
+    if _XBRL_ROOT.search(head):
+        return '.xbrl'
+    return None
+
+def extract_links(html: bytes, base_url: str) -> List[Tuple[str, str]]:
+    """(absolute url, 'report' or 'page') for every http(s) link of an HTML page, without fragments"""
+    try:
+        root = lxml_html.document_fromstring(html)
+    except Exception:  # Empty or undecodable documents have no links
+        return []
+    base = root.xpath('string(//base/@href)') or base_url
+    links = {}
+    for href in root.xpath('//a/@href|//area/@href|//link[@rel="alternate"]/@href'):
+        url = urldefrag(urljoin(base, href.strip()))[0]
+        if urlsplit(url).scheme in ('http', 'https'):
+            links[url] = 'report' if REPORT_LINK.search(urlsplit(url).path) else 'page'
+    return list(links.items())
+
+class WebCrawler:
+    """
+    Asyncio crawler for company IR pages that discovers and downloads sustainability reports.
+    One pooled httpx.AsyncClient serves every request (keep-alive connections are reused per host),
+    with a global concurrency cap plus a per-host cap and robots.txt Crawl-delay. Pages and reports
+    are fetched with If-None-Match / If-Modified-Since from the previous pass, so unchanged resources
+    cost a 304; identical content at several URLs is stored once.
+    Args:
+        frontier (Frontier): Persistent frontier (resumable across runs).
+        output_dir (str): Where reports are saved, named by content hash.
+        concurrency (int): Requests in flight overall.
+        per_host (int): Requests in flight per host.
+        max_depth (int): Follow page links this many levels below the seeds (same host only).
+        follow (str, optional): Regex a page URL must match to be followed (reports are always kept).
+        timeout (float): Per-request timeout in seconds.
+        max_attempts (int): Attempts per URL for network errors and 5xx responses.
+        max_page_bytes (int): Larger HTML pages are truncated before link extraction.
+        user_agent (str): User-Agent header and robots.txt agent name.
+        recheck_reports (bool): Re-request reports fetched in earlier passes (conditional GET).
+    """
+
+    def __init__(self, frontier: Frontier, output_dir: str, concurrency: int = 32, per_host: int = 2,
+                 max_depth: int = 1, follow: Optional[str] = None, timeout: float = 30.0, max_attempts: int = 3,
+                 max_page_bytes: int = 5 * 1024 * 1024, user_agent: str = USER_AGENT,
+                 recheck_reports: bool = False):
+        self.frontier = frontier
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.max_depth = max_depth
+        self.follow = re.compile(follow, re.IGNORECASE) if follow else None
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.max_page_bytes = max_page_bytes
+        self.user_agent = user_agent
+        self.recheck_reports = recheck_reports
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+        self._robots_locks: Dict[str, asyncio.Lock] = {}
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_next: Dict[str, float] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self.stats: Dict[str, Any] = {}
+
+    async def _robots_for(self, client, url: str) -> Optional[RobotFileParser]:
+        """robots.txt rules of a URL's host, fetched once per crawl (None: everything allowed)"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            if origin not in self._robots:
+                rules = RobotFileParser(f"{origin}/robots.txt")
+                try:
+                    response = await client.get(f"{origin}/robots.txt")
+                    if response.status_code in (401, 403):
+                        rules.disallow_all = True
+                    elif response.status_code >= 400:
+                        rules = None
+                    else:
+                        rules.parse(response.text.splitlines())
+                except httpx.HTTPError:
+                    rules = None
+                self._robots[origin] = rules
+        return self._robots[origin]
+
+    async def _wait_turn(self, host: str, delay: float):
+        """Space out requests to a host by its Crawl-delay"""
+        if not delay:
+            return
+        async with self._host_locks.setdefault(host, asyncio.Lock()):
+            wait = self._host_next.get(host, 0.0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._host_next[host] = time.monotonic() + delay
+
+    def _report_path(self, content_hash: str, url: str, content_type: str, head: bytes) -> str:
+        extension = os.path.splitext(urlsplit(url).path)[1].lower()
+        if extension not in REPORT_EXTENSIONS:
+            extension = sniff_report(head) or next(
+                (extension for kind, extension in REPORT_TYPES if kind in content_type), '.bin')
+        return os.path.join(self.output_dir, f"{content_hash[:32]}{extension}")
+
+    async def _fetch(self, client, entry: Dict[str, Any], current_pass: int):
+        url, host = entry['url'], urlsplit(entry['url']).netloc
+        rules = await self._robots_for(client, url)
+        if rules is not None and not rules.can_fetch(self.user_agent, url):
+            self.frontier.finish(url, 'blocked', current_pass)
+            self.stats['robots_blocked'] += 1
+            return
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        async with self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host)):
+            await self._wait_turn(host, (rules.crawl_delay(self.user_agent) or 0) if rules else 0)
+            self.stats['requests'] += 1
+            try:
+                async with client.stream('GET', url, headers=headers) as response:
+                    await self._handle(response, entry, current_pass)
+            except httpx.HTTPError as e:
+                self.frontier.retry(url, f"{type(e).__name__}: {e}", self.max_attempts, current_pass)
+                self.stats['errors'] += 1
+
+    async def _handle(self, response, entry: Dict[str, Any], current_pass: int):
+        url = entry['url']
+        validators = {'etag': response.headers.get('etag') or entry['etag'],
+                      'last_modified': response.headers.get('last-modified') or entry['last_modified'],
+                      'status': response.status_code}
+        if response.status_code == 304:
+            self.stats['not_modified'] += 1
+            self.frontier.finish(url, 'done', current_pass, **validators)
+            self._requeue_links(url, entry['depth'], current_pass)
+            return
+        if response.status_code >= 500:
+            self.frontier.retry(url, f"HTTP {response.status_code}", self.max_attempts, current_pass)
+            self.stats['errors'] += 1
+            return
+        if response.status_code >= 400:
+            self.frontier.finish(url, 'error', current_pass, status=response.status_code,
+                                 error=f"HTTP {response.status_code}")
+            self.stats['errors'] += 1
+            return
+        content_type = response.headers.get('content-type', '').lower()
+        digest = hashlib.sha256()
+        # Report links (by extension) are reports whatever their type: ESEF .xhtml is served as application/xhtml+xml
+        if entry['kind'] != 'report' and 'html' in content_type:
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                digest.update(chunk)
+                if len(body) < self.max_page_bytes:
+                    body.extend(chunk[:self.max_page_bytes - len(body)])
+            content_hash = digest.hexdigest()
+            self.stats['pages'] += 1
+            if content_hash == entry['content_hash']:
+                # Changed validators but identical content: nothing new below this page either
+                self.stats['unchanged'] += 1
+                self.frontier.finish(url, 'done', current_pass, **validators)
+                self._requeue_links(url, entry['depth'], current_pass)
+                return
+            self.frontier.finish(url, 'done', current_pass, content_hash=content_hash, **validators)
+            self._queue_links(url, extract_links(bytes(body), str(response.url)), entry['depth'], current_pass)
+            return
+        chunks = response.aiter_bytes()
+        head = b''
+        if entry['kind'] != 'report' and not any(kind in content_type for kind, _ in REPORT_TYPES):
+            # A page link to something else than HTML: images, videos and feeds are dropped unread;
+            # a generic type (octet-stream, XML, ...) is kept only if its first bytes are a report
+            if SNIFFED_TYPES.search(content_type):
+                head = await anext(chunks, b'')
+            if sniff_report(head) is None:
+                self.stats['skipped'] += 1
+                self.frontier.finish(url, 'skipped', current_pass, error=f"not a report ({content_type})",
+                                     **validators)
+                return
+        # A report: stream it to disk while hashing, then keep it only if the content is new
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = os.path.join(self.output_dir, f".{hashlib.sha256(url.encode()).hexdigest()[:16]}.part")
+        digest.update(head)
+        size = len(head)
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(head)
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            content_hash = digest.hexdigest()
+            if content_hash == entry['content_hash']:
+                self.stats['unchanged'] += 1
+                self.frontier.finish(url, 'done', current_pass, **validators)
+                return
+            duplicate_of = self.frontier.claim_content(content_hash, url)
+            if duplicate_of:
+                self.stats['duplicates'] += 1
+                self.frontier.finish(url, 'duplicate', current_pass, content_hash=content_hash,
+                                     error=f"same content as {duplicate_of}", **validators)
+                return
+            path = self._report_path(content_hash, url, content_type, head)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.frontier.finish(url, 'done', current_pass, content_hash=content_hash, path=path, **validators)
+        self.stats['new_reports'].append({'url': url, 'path': path, 'hash': content_hash, 'bytes': size,
+                                          'content_type': content_type})
+
+    def _queue_links(self, url: str, links: List[Tuple[str, str]], depth: int, current_pass: int):
+        host = urlsplit(url).netloc
+        keep = []
+        for link, kind in links:
+            if kind == 'page' and (depth + 1 > self.max_depth or urlsplit(link).netloc != host
+                                   or (self.follow and not self.follow.search(link))):
+                continue
+            keep.append((link, kind))
+        self.frontier.set_links(url, [link for link, _ in keep])
+        self._add(keep, depth + 1, current_pass)
+
+    def _requeue_links(self, url: str, depth: int, current_pass: int):
+        """An unchanged page still leads to the pages below it, which may have changed themselves"""
+        self._add(self.frontier.links(url), depth + 1, current_pass)
+
+    def _add(self, links: List[Tuple[str, str]], depth: int, current_pass: int):
+        entries = []
+        for link, kind in links:
+            if kind == 'report' and not self.recheck_reports:
+                known = self.frontier.get(link)
+                if known and known['state'] in ('done', 'duplicate'):
+                    continue
+            entries.append((link, kind, depth))
+        self.stats['discovered'] += self.frontier.add(entries, current_pass)
+
+    async def run(self, seeds: Iterable[str], resume: bool = False, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Crawl from the seeds until the frontier is exhausted (or `limit` fetches were made).
+        Args:
+            seeds (Iterable[str]): Start pages, e.g. company IR / sustainability pages.
+            resume (bool): Continue an interrupted pass instead of starting a new one.
+            limit (int, optional): Stop after this many fetches; the rest stays pending for resume.
+        Returns:
+            dict: pass, requests, pages, not_modified, unchanged, duplicates, skipped (page links that
+            were neither HTML nor a report), errors, robots_blocked, discovered, pending and new_reports
+            ([{url, path, hash, bytes, content_type}]).
+        """
+        self.stats = {'requests': 0, 'pages': 0, 'not_modified': 0, 'unchanged': 0, 'duplicates': 0, 'skipped': 0,
+                      'errors': 0, 'robots_blocked': 0, 'discovered': 0, 'new_reports': []}
+        current_pass = self.frontier.start_pass(resume)
+        self.frontier.add([(urldefrag(seed)[0], 'page', 0) for seed in seeds], current_pass)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        in_flight: Dict[str, asyncio.Task] = {}
+        fetched = 0
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=True,
+                                     headers={'User-Agent': self.user_agent}) as client:
+            while True:
+                room = self.concurrency - len(in_flight)
+                if limit is not None:
+                    room = min(room, limit - fetched)
+                for entry in self.frontier.pending(room, exclude=in_flight) if room > 0 else []:
+                    in_flight[entry['url']] = asyncio.create_task(self._fetch(client, entry, current_pass))
+                    fetched += 1
+                if not in_flight:
+                    break
+                done, _ = await asyncio.wait(in_flight.values(), return_when=asyncio.FIRST_COMPLETED)
+                for url in [url for url, task in in_flight.items() if task in done]:
+                    task = in_flight.pop(url)
+                    if task.exception() is not None:
+                        # Failure isolation: one bad response never stops the crawl
+                        self.frontier.retry(url, repr(task.exception()), self.max_attempts, current_pass)
+                        self.stats['errors'] += 1
+        self.stats['pass'] = current_pass
+        self.stats['pending'] = self.frontier.pending_count()
+        return self.stats
+
+def crawl(seeds: Iterable[str], frontier_path: str, output_dir: str, resume: bool = False,
+          limit: Optional[int] = None, **options) -> Dict[str, Any]:
+    """
+    Run one crawl pass over the seeds (see WebCrawler for the options) and return its statistics.
+    Args:
+        seeds (Iterable[str]): Start pages.
+        frontier_path (str): SQLite file holding the persistent frontier.
+        output_dir (str): Directory for downloaded reports.
+        resume (bool): Continue an interrupted pass.
+        limit (int, optional): Maximum fetches in this run.
+    Returns:
+        dict: Crawl statistics, see WebCrawler.run.
+    """
+    frontier = Frontier(frontier_path)
+    try:
+        return asyncio.run(WebCrawler(frontier, output_dir, **options).run(list(seeds), resume, limit))
+    finally:
+        frontier.close()
+
 def crawl_esg_disclosures(url: str) -> str:
     """
     Crawl a given URL to collect ESG disclosures.
     Args:
         url (str): The URL to crawl.
     Returns:
-        str: Raw HTML or extracted ESG content (stub).
+        str: Raw HTML of the page (empty if robots.txt disallows it).
     Note:
-        For real implementation, use requests, BeautifulSoup, or Selenium.
+        For monitoring many IR pages and downloading the reports they link to, use crawl().
     """
-    raise NotImplementedError("Web crawling requires requests, BeautifulSoup, or Selenium. This is a stub.")
+    async def fetch() -> str:
+        crawler = WebCrawler(Frontier(':memory:'), output_dir='')
+        async with httpx.AsyncClient(timeout=crawler.timeout, follow_redirects=True,
+                                     headers={'User-Agent': crawler.user_agent}) as client:
+            rules = await crawler._robots_for(client, url)
+            if rules is not None and not rules.can_fetch(crawler.user_agent, url):
+                return ''
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.text
+    return asyncio.run(fetch())
@@ -1,11 +1,328 @@
+import math
+import re
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lazy_imports import lazy_import
+
+etree = lazy_import('lxml.etree')
+
+XBRLI = 'http://www.xbrl.org/2003/instance'
+XBRLDI = 'http://xbrl.org/2006/xbrldi'
+IX_NAMESPACES = ('http://www.xbrl.org/2013/inlineXBRL', 'http://www.xbrl.org/2008/inlineXBRL')
+XSI_NIL = '{http://www.w3.org/2001/XMLSchema-instance}nil'
+
+# Concepts whose KPI name cannot be told from METRIC_RULES alone (local name -> KPI name, category)
+CONCEPT_KPIS: Dict[str, Tuple[str, str]] = {
+    'GrossLocationBasedScope2GreenhouseGasEmissions': ("Scope 2 Emissions (location-based)", 'environmental'),
+    'GrossMarketBasedScope2GreenhouseGasEmissions': ("Scope 2 Emissions (market-based)", 'environmental'),
+    'NumberOfEmployeesHeadCount': ("Total Employees", 'social'),
+}
+_CAMEL = re.compile(r'(?<=[a-z])(?=[A-Z0-9])|(?<=[0-9])(?=[A-Za-z])|(?<=[A-Z])(?=[A-Z][a-z])')
+_PERCENT_WORDS = re.compile(r'\b(?:percentage|percent|rate|share|ratio|proportion)\b', re.IGNORECASE)
+
+def _split_tag(tag: str) -> Tuple[str, str]:
+    """('{ns}local') -> (ns, local)"""
+    if tag.startswith('{'):
+        ns, _, local = tag[1:].partition('}')
+        return ns, local
+    return '', tag
+
+def _text(element) -> str:
+    return ' '.join(''.join(element.itertext()).split())
+
+def _context(element) -> Dict[str, Any]:
+    """Entity, period and dimensions of an xbrli:context"""
+    identifier = element.find(f'{{{XBRLI}}}entity/{{{XBRLI}}}identifier')
+    period = element.find(f'{{{XBRLI}}}period')
+    start = end = None
+    if period is not None:
+        instant = period.findtext(f'{{{XBRLI}}}instant')
+        start = period.findtext(f'{{{XBRLI}}}startDate')
+        end = instant or period.findtext(f'{{{XBRLI}}}endDate')
+        start, end = (start or '').strip() or None, (end or '').strip() or None
+    dimensions = {}
+    for member in element.iter(f'{{{XBRLDI}}}explicitMember', f'{{{XBRLDI}}}typedMember'):
+        dimensions[member.get('dimension')] = _text(member)
+    return {
+        'entity': identifier.text.strip() if identifier is not None and identifier.text else None,
+        'scheme': identifier.get('scheme') if identifier is not None else None,
+        'start': start,
+        'end': end,
+        'dimensions': dimensions,
+    }
+
+def _unit(element) -> str:
+    """An xbrli:unit as text: 'iso4217:EUR', 'utr:tCO2e', or 'numerator/denominator' for divides"""
+    numerator = element.find(f'{{{XBRLI}}}divide/{{{XBRLI}}}unitNumerator')
+    if numerator is not None:
+        denominator = element.find(f'{{{XBRLI}}}divide/{{{XBRLI}}}unitDenominator')
+        return '/'.join('*'.join(m.text.strip() for m in part.iter(f'{{{XBRLI}}}measure'))
+                        for part in (numerator, denominator))
+    return '*'.join(m.text.strip() for m in element.iter(f'{{{XBRLI}}}measure') if m.text)
+
+def _decimals(element) -> Optional[int]:
+    decimals = element.get('decimals')
+    return int(decimals) if decimals and decimals.lstrip('-').isdigit() else None
+
+def _ix_number(text: str, fmt: str, scale: str, sign: Optional[str]) -> Optional[float]:
+    """Value of an ix:nonFraction from its displayed text, format (transformation) and scale"""
+    fmt = fmt.rpartition(':')[2].replace('-', '').lower()
+    if 'zerodash' in fmt or 'fixedzero' in fmt:
+        number = Decimal(0)
+    else:
+        digits = text.replace(' ', '').replace('\xa0', '')
+        if 'commadecimal' in fmt:
+            digits = digits.replace('.', '').replace(',', '.')
+        else:
+            digits = digits.replace(',', '')
+        try:
+            number = Decimal(digits)
+        except InvalidOperation:
+            return None
+    # Scaled in decimal, so 0.07 at scale -2 is 0.0007 (not 0.0007000000000000001) and dedups by value
+    number = float(number.scaleb(int(scale or 0)))
+    return -number if sign == '-' else number
+
+def _ix_text(element) -> str:
+    """Text of an ix:nonNumeric without its ix:exclude parts"""
+    parts = []
+
+    def walk(node):
+        if _split_tag(node.tag)[1] == 'exclude' and _split_tag(node.tag)[0] in IX_NAMESPACES:
+            return
+        parts.append(node.text or '')
+        for child in node:
+            walk(child)
+            parts.append(child.tail or '')
+
+    walk(element)
+    return ' '.join(''.join(parts).split())
+
+def _fact(concept: str, element, value: Any, raw: str, numeric: bool) -> Dict[str, Any]:
+    return {
+        'concept': concept,
+        'context': element.get('contextRef'),
+        'unit_ref': element.get('unitRef'),
+        'value': value,
+        'raw_value': raw,
+        'decimals': _decimals(element),
+        'numeric': numeric,
+    }
+
+def iter_xbrl(file_path: str) -> Iterable[Tuple[str, Any]]:
+    """
+    Stream the contexts, units and facts of an XBRL instance or inline XBRL (iXBRL) report in bounded
+    memory: lxml iterparse, with every element cleared once handled (contexts, units and ix:nonNumeric
+    blocks are kept whole until their end tag).
+    Yields:
+        ('context', (id, context)), ('unit', (id, unit text)) or ('fact', fact dict) with concept,
+        context and unit_ref ids, value (float for numeric facts, str otherwise, None if nil), raw_value,
+        decimals and numeric. Facts reference contexts and units by id; see load_xbrl to resolve them.
+    """
+    hold = 0  # Open elements whose children must survive until their end tag
+    for event, element in etree.iterparse(file_path, events=('start', 'end'), huge_tree=True,
+                                          remove_comments=True, remove_pis=True):
+        ns, local = _split_tag(element.tag)
+        keep_whole = (ns == XBRLI and local in ('context', 'unit')) or (ns in IX_NAMESPACES and local == 'nonNumeric')
+        if event == 'start':
+            hold += keep_whole
+            continue
+        if ns == XBRLI and local == 'context':
+            yield 'context', (element.get('id'), _context(element))
+        elif ns == XBRLI and local == 'unit':
+            yield 'unit', (element.get('id'), _unit(element))
+        elif ns in IX_NAMESPACES and local in ('nonFraction', 'nonNumeric'):
+            nil = element.get(XSI_NIL) == 'true'
+            if local == 'nonFraction':
+                raw = _text(element)
+                value = None if nil else _ix_number(raw, element.get('format', ''), element.get('scale'),
+                                                    element.get('sign'))
+                yield 'fact', _fact(element.get('name'), element, value, raw, True)
+            else:
+                raw = _ix_text(element)
+                yield 'fact', _fact(element.get('name'), element, None if nil else raw, raw, False)
+        elif ns not in IX_NAMESPACES and element.get('contextRef') is not None:
+            concept = f"{element.prefix}:{local}" if element.prefix else local
+            raw = (element.text or '').strip()
+            numeric = element.get('unitRef') is not None
+            value = raw
+            if element.get(XSI_NIL) == 'true':
+                value = None
+            elif numeric:
+                try:
+                    value = float(raw)
+                except ValueError:
+                    value = None
+            yield 'fact', _fact(concept, element, value, raw, numeric)
+        hold -= keep_whole
+        if hold == 0:
+            if len(element):
+                element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+class XbrlIndex:
+    """
+    Facts of one XBRL/iXBRL report with their contexts and units resolved, indexed by concept and period.
+    Concepts can be looked up by prefixed name ('esrs:GrossScope1GreenhouseGasEmissions') or local name.
+    Each fact is a dict: concept, value, raw_value, unit, decimals, numeric, entity, period_start
+    (None for instants), period_end, year and dimensions ({dimension: member}).
+    """
+
+    def __init__(self, facts: List[Dict[str, Any]], contexts: Dict[str, Dict[str, Any]], units: Dict[str, str]):
+        self.contexts = contexts
+        self.units = units
+        self.facts: List[Dict[str, Any]] = []
+        self._index: Dict[str, Dict[Tuple[Optional[str], Optional[str]], List[Dict[str, Any]]]] = defaultdict(
+            lambda: defaultdict(list))
+        seen = set()
+        for fact in facts:
+            context = contexts.get(fact['context'], {})
+            end = context.get('end')
+            resolved = {
+                'concept': fact['concept'],
+                'value': fact['value'],
+                'raw_value': fact['raw_value'],
+                'unit': units.get(fact['unit_ref']) if fact['unit_ref'] else None,
+                'decimals': fact['decimals'],
+                'numeric': fact['numeric'],
+                'entity': context.get('entity'),
+                'period_start': context.get('start'),
+                'period_end': end,
+                'year': int(end[:4]) if end and end[:4].isdigit() else None,
+                'dimensions': context.get('dimensions', {}),
+            }
+            # iXBRL reports often tag the same fact in several places
+            key = (fact['concept'], fact['context'], fact['unit_ref'], repr(fact['value']))
+            if key in seen:
+                continue
+            seen.add(key)
+            self.facts.append(resolved)
+            period = (resolved['period_start'], resolved['period_end'])
+            local = fact['concept'].rpartition(':')[2]
+            self._index[fact['concept']][period].append(resolved)
+            if local != fact['concept']:
+                self._index[local][period].append(resolved)
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+    def concepts(self) -> List[str]:
+        """Prefixed concept names with at least one fact"""
+        return sorted({fact['concept'] for fact in self.facts})
+
+    def periods(self, concept: str) -> List[Tuple[Optional[str], Optional[str]]]:
+        """(start, end) periods a concept has facts for; start is None for instants"""
+        return sorted(self._index.get(concept, {}), key=lambda period: (period[1] or '', period[0] or ''))
+
+    def get(self, concept: str, year: Optional[int] = None, period: Optional[Tuple[Optional[str], str]] = None,
+            dimensions: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Facts of a concept, optionally for one year or (start, end) period.
+        Args:
+            concept (str): Prefixed or local concept name.
+            year (int, optional): Year the fact's period ends in.
+            period (Tuple[str, str], optional): Exact (start, end) period; start None for instants.
+            dimensions (dict, optional): Required dimension members; {} selects facts without dimensions.
+        Returns:
+            List[dict]: Matching facts.
+        """
+        by_period = self._index.get(concept, {})
+        facts = by_period.get(period, []) if period is not None else [f for fs in by_period.values() for f in fs]
+        return [f for f in facts if (year is None or f['year'] == year)
+                and (dimensions is None or (f['dimensions'] == dimensions if not dimensions
+                                            else all(f['dimensions'].get(d) == m for d, m in dimensions.items())))]
+
+    def to_kpis(self, include_dimensional: bool = False) -> List[Dict[str, Any]]:
+        """
+        Numeric facts that map onto a KPI, in the extractor schema with extraction_method 'xbrl'.
+        A concept maps through CONCEPT_KPIS, or else through ai_pipeline.rule_stage.METRIC_RULES applied
+        to the words of its local name ('GrossScope1GreenhouseGasEmissions' -> "Scope 1 Emissions") when
+        the fact's unit fits the rule. Pure ratios named as a percentage, rate or share become percentages;
+        unitless counts only map through CONCEPT_KPIS. Other facts stay available through the index only.
+        Args:
+            include_dimensional (bool): Also map facts with dimensions (breakdowns, not totals).
+        Returns:
+            List[dict]: KPIs with the usual fields plus concept, entity, unit (canonical) and dimensions.
+            A fact reported in a multiple of its canonical unit (GWh, ktCO2e) is converted into it.
+        """
+        from ai_pipeline.rule_stage import METRIC_RULES
+        from validation_utils import calculate_confidence_score, enhance_kpi_with_validation, normalize_unit
+        kpis = []
+        for fact in self.facts:
+            if not fact['numeric'] or fact['value'] is None or (fact['dimensions'] and not include_dimensional):
+                continue
+            local = fact['concept'].rpartition(':')[2]
+            words = _CAMEL.sub(' ', local)
+            measure = '/'.join(part.rpartition(':')[2] for part in (fact['unit'] or '').split('/'))
+            pure = measure.lower() in ('pure', '')
+            name = category = None
+            canonical, factor = normalize_unit(measure) if not pure else (None, 1.0)
+            if local in CONCEPT_KPIS:
+                name, category = CONCEPT_KPIS[local]
+                if pure:
+                    canonical = '%' if _PERCENT_WORDS.search(words) else 'count'
+            else:
+                for rule_name, rule_category, keyword, units in METRIC_RULES:
+                    if not keyword.search(words):
+                        continue
+                    # Unitless counts are too ambiguous to map by keyword ("fatalities in own workforce")
+                    if pure:
+                        canonical = '%' if _PERCENT_WORDS.search(words) else None
+                    if canonical in units:
+                        name, category = rule_name, rule_category
+                        break
+            if name is None:
+                continue
+            value = fact['value']
+            if canonical == '%':
+                value, metric_type = f"{value * 100:g}%", 'percentage'
+            else:
+                digits = fact['decimals'] if fact['decimals'] is not None else (0 if value == int(value) else 2)
+                metric_type = 'count' if canonical == 'count' else measure
+                if factor != 1.0:
+                    # Reported in another unit of the same kind (GWh, ktCO2e): convert into the canonical one
+                    value, metric_type = value * factor, canonical
+                    digits -= round(math.log10(factor))
+                value = f"{value:,.{max(digits, 0)}f}"
+            reference = f"{fact['concept']} ({fact['period_end']}): {fact['raw_value']} {fact['unit'] or ''}".strip()
+            kpi = {'name': name, 'value': value, 'metric_type': metric_type, 'year': fact['year'],
+                   'reference': reference, 'category': category, 'concept': fact['concept'],
+                   'entity': fact['entity'], 'unit': canonical, 'dimensions': fact['dimensions']}
+            kpi['confidence_score'], kpi['confidence_reasoning'] = calculate_confidence_score(
+                name, value, metric_type, reference)
+            kpi = enhance_kpi_with_validation(kpi)
+            kpi['extraction_method'] = 'xbrl'
+            kpis.append(kpi)
+        return kpis
+
+def load_xbrl(file_path: str) -> XbrlIndex:
+    """
+    Parse an XBRL instance (.xbrl/.xml) or inline XBRL report (.xhtml/.html) into an XbrlIndex.
+    Args:
+        file_path (str): Path to the filing.
+    Returns:
+        XbrlIndex: Resolved facts indexed by concept and period.
+    """
+    facts, contexts, units = [], {}, {}
+    for kind, item in iter_xbrl(file_path):
+        if kind == 'fact':
+            facts.append(item)
+        elif kind == 'context':
+            contexts[item[0]] = item[1]
+        else:
+            units[item[0]] = item[1]
+    return XbrlIndex(facts, contexts, units)
+
 def parse_xbrl(file_path: str) -> dict:
     """
     Parse an XBRL file and return its content as a dictionary.
     Args:
-        file_path (str): Path to the XBRL file.
+        file_path (str): Path to the XBRL instance or inline XBRL report.
     Returns:
-        dict: Parsed XBRL data (stub).
-    Note:
-        For real implementation, use arelle or a similar XBRL library.
+        dict: 'facts' (resolved, see XbrlIndex), 'contexts', 'units' and 'kpis' (see XbrlIndex.to_kpis).
     """
-    raise NotImplementedError("XBRL parsing requires arelle or a similar library. This is a stub.")
+    index = load_xbrl(file_path)
+    return {'facts': index.facts, 'contexts': index.contexts, 'units': index.units, 'kpis': index.to_kpis()}
@@ -1,17 +1,22 @@
 import os
+import hashlib
 from flask import Flask, request, jsonify
-import google.generativeai as genai
 from flask_cors import CORS
 import json
 import re
 from typing import Dict, List, Any, Optional
 
+from ai_pipeline.llm_cassette import CassetteMiss, default_cassette
+from lazy_imports import lazy_import, warm_up
+from pipeline_profiler import DocumentProfiler
+
 app = Flask(__name__)
 CORS(app)
 
 # Set your Gemini API key here or use an environment variable
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY') or 'YOUR_GEMINI_API_KEY_HERE'
-genai.configure(api_key=GEMINI_API_KEY)
+# The Gemini SDK takes about a second to import, so it is imported and configured on first use
+genai = lazy_import('google.generativeai', on_import=lambda module: module.configure(api_key=GEMINI_API_KEY))
 
 # Enhanced system prompts with advanced prompt engineering techniques
 ESG_PROMPT_SYSTEM_INSTRUCTION = """You are an ESG Data Quality Specialist with 10+ years of experience in sustainability reporting, GRI, SASB, and TCFD standards. Your expertise includes industry-specific ESG metrics, data validation, and quality assurance.
@@ -376,30 +381,40 @@ def validate_response_quality(response_text: str) -> bool:
     except:
         return False
 
+def generate_with_model(model_name: str, prompt: str) -> str:
+    """Call a Gemini model, through the record/replay cassette when LLM_CASSETTE is set"""
+    def call() -> str:
+        return genai.GenerativeModel(model_name).generate_content(prompt).text
+    
+    cassette = default_cassette()
+    return cassette.generate(model_name, prompt, call) if cassette is not None else call()
+
 def robust_ai_generation(prompt: str, max_retries: int = 3) -> str:
     """Enhanced AI generation with retry logic and fallbacks"""
     
     for attempt in range(max_retries):
         try:
             # Try primary model
-            model = genai.GenerativeModel('gemini-1.5-pro')
-            response = model.generate_content(prompt)
+            response_text = generate_with_model('gemini-1.5-pro', prompt)
             
             # Validate response quality
-            if validate_response_quality(response.text):
-                return response.text
+            if validate_response_quality(response_text):
+                return response_text
             else:
                 raise Exception("Low quality response")
                 
+        except CassetteMiss:
+            raise  # A replay run must not pass on the fallback response
         except Exception as e:
             if attempt < max_retries - 1:
                 # Try fallback model
                 try:
-                    model = genai.GenerativeModel('gemini-pro')
-                    response = model.generate_content(prompt)
-                    if validate_response_quality(response.text):
-                        return response.text
-                except:
+                    response_text = generate_with_model('gemini-pro', prompt)
+                    if validate_response_quality(response_text):
+                        return response_text
+                except CassetteMiss:
+                    raise
+                except Exception:
                     continue
             else:
                 # Generate fallback response
@@ -422,6 +437,37 @@ def generate_fallback_response(prompt: str) -> str:
         }
     })
 
+SYSTEM_INSTRUCTIONS = {
+    'standard': ESG_PROMPT_SYSTEM_INSTRUCTION,
+    'levers': ESG_LEVERS_PROMPT_SYSTEM_INSTRUCTION,
+    'banking': BANKING_ESG_PROMPT_SYSTEM_INSTRUCTION,
+    'apparel': APPAREL_ESG_PROMPT_SYSTEM_INSTRUCTION,
+    'waste': WASTE_ESG_PROMPT_SYSTEM_INSTRUCTION
+}
+
+# Set PROFILE_DIR to profile every request and write one JSON report per document there
+PROFILE_DIR = os.environ.get('PROFILE_DIR')
+
+def build_prompt(prompt: str, extractor_type: str = 'standard') -> str:
+    """Combine the system instruction for the extractor type with the report text"""
+    system_instruction = SYSTEM_INSTRUCTIONS.get(extractor_type, ESG_PROMPT_SYSTEM_INSTRUCTION)
+    return f"{system_instruction}\n\nReport Text:\n{prompt}"
+
+def strip_markdown_fences(result_text: str) -> str:
+    """Clean up the response to remove markdown formatting if present"""
+    result_text = result_text.strip()
+    
+    # Remove markdown code blocks if present
+    if result_text.startswith('```json'):
+        result_text = result_text[7:]  # Remove ```json
+    elif result_text.startswith('```'):
+        result_text = result_text[3:]  # Remove ```
+    
+    if result_text.endswith('```'):
+        result_text = result_text[:-3]  # Remove trailing ```
+    
+    return result_text.strip()
+
 @app.route('/generate', methods=['POST'])
 def generate():
     data = request.get_json()
@@ -431,39 +477,39 @@ def generate():
     if not prompt:
         return jsonify({'error': 'Prompt is required'}), 400
     
-    # Select the appropriate system instruction based on extractor type
-    system_instructions = {
-        'standard': ESG_PROMPT_SYSTEM_INSTRUCTION,
-        'levers': ESG_LEVERS_PROMPT_SYSTEM_INSTRUCTION,
-        'banking': BANKING_ESG_PROMPT_SYSTEM_INSTRUCTION,
-        'apparel': APPAREL_ESG_PROMPT_SYSTEM_INSTRUCTION,
-        'waste': WASTE_ESG_PROMPT_SYSTEM_INSTRUCTION
-    }
-    
-    system_instruction = system_instructions.get(extractor_type, ESG_PROMPT_SYSTEM_INSTRUCTION)
-    
-    # Combine system instruction with the prompt
-    full_prompt = f"{system_instruction}\n\nReport Text:\n{prompt}"
-    
     try:
-        # Use robust AI generation with retry logic
-        result_text = robust_ai_generation(full_prompt)
+        # Opt-in profiling: {"profile": true} (or {"profile": {"cprofile": true, "memory": true}})
+        # adds the report to the response; PROFILE_DIR writes it to a file
+        profile_options = data.get('profile')
+        if profile_options is not None and not isinstance(profile_options, (bool, dict)):
+            return jsonify({'error': "'profile' must be a boolean or an object"}), 400
+        if not isinstance(profile_options, dict):
+            profile_options = {}
+        doc_id = str(data.get('document_id') or hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16])
+        profiler = DocumentProfiler(doc_id, enabled=bool(data.get('profile') or PROFILE_DIR),
+                                    cprofile=bool(profile_options.get('cprofile')),
+                                    memory=bool(profile_options.get('memory')))
         
-        # Clean up the response to remove markdown formatting if present
-        result_text = result_text.strip()
+        with profiler.stage('prompt'):
+            full_prompt = build_prompt(prompt, extractor_type)
+        profiler.record_size('prompt_chars', full_prompt)
         
-        # Remove markdown code blocks if present
-        if result_text.startswith('```json'):
-            result_text = result_text[7:]  # Remove ```json
-        elif result_text.startswith('```'):
-            result_text = result_text[3:]  # Remove ```
-        
-        if result_text.endswith('```'):
-            result_text = result_text[:-3]  # Remove trailing ```
+        # Use robust AI generation with retry logic
+        with profiler.stage('model'):
+            result_text = robust_ai_generation(full_prompt)
+        profiler.record_size('response_chars', result_text)
         
-        result_text = result_text.strip()
+        with profiler.stage('postprocess'):
+            result_text = strip_markdown_fences(result_text)
         
-        return jsonify({'result': result_text})
+        response = {'result': result_text}
+        if profiler.enabled:
+            report = profiler.report()
+            if PROFILE_DIR:
+                profiler.save(PROFILE_DIR, report)
+            if data.get('profile'):
+                response['profile'] = report
+        return jsonify(response)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -477,4 +523,7 @@ def list_models():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
+    # Preload components before taking traffic, e.g. WARMUP=google.generativeai,pdfplumber (or WARMUP=all)
+    if os.environ.get('WARMUP'):
+        warm_up(None if os.environ['WARMUP'] == 'all' else os.environ['WARMUP'].split(','))
     app.run(host='0.0.0.0', port=5005, debug=True)
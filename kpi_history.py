@@ -0,0 +1,239 @@
+"""
+Cross-year KPI history index
+Keys reported values on (company, metric, year) so a new report can be checked against prior years
+"""
+
+import bisect
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from kpi_table import parse_numeric_value
+from validation_utils import normalize_unit
+
+# "15% reduction from our 2022 baseline (of 112,000 metric tons)"; the unit runs to the end of the clause
+BASE_YEAR_CLAIM = re.compile(
+    r'(\d+(?:\.\d+)?)\s*%\s*(reduction|decrease|decline|cut|increase|rise)\s+'
+    r'(?:from|compared (?:to|with)|vs\.?|versus|relative to|against|since|below|above|over)\s+'
+    r'(?:our\s+|the\s+|a\s+)?(?:fy\s*)?((?:19|20)\d{2})'
+    r'(?:\s+(?:baseline|base year|base-year|levels?|figure|value))?'
+    r'(?:\s+of\s+([\d,]+(?:\.\d+)?(?:\s*(?:thousand|million|billion))?)(?:\s*([^\d\s.,;:()][^.,;:()]{0,40}))?)?',
+    re.IGNORECASE
+)
+# A base stated in plain tonnes ("112,000 metric tons") is taken to be tonnes of CO2e for an emissions KPI
+_SAME_UNIT = {('t', 'tCO2e')}
+
+MetricKey = Tuple[str, str, str]  # (company, lower-cased metric name, canonical unit)
+
+class KpiHistoryIndex:
+    """
+    Index of reported KPI values keyed on (company, metric, canonical unit) -> {year: entry}.
+    Every check below looks up each KPI of a new report directly, so checking a report costs
+    O(#KPIs) (plus a binary search over that metric's years), independent of the history size.
+    """
+
+    def __init__(self):
+        self._values: Dict[MetricKey, Dict[int, Dict[str, Any]]] = {}
+        self._years: Dict[MetricKey, List[int]] = {}
+
+    @staticmethod
+    def _key(company: str, kpi: Dict[str, Any]) -> Optional[Tuple[MetricKey, int, float]]:
+        """(metric key, year, value in canonical unit), or None if the KPI lacks a year or number"""
+        value = parse_numeric_value(kpi.get('value'))
+        try:
+            year = int(kpi.get('year'))
+        except (TypeError, ValueError):
+            return None
+        if value is None:
+            return None
+        unit, factor = normalize_unit(kpi.get('metric_type', ''))
+        return (company, (kpi.get('name') or '').lower(), unit), year, value * factor
+
+    def __len__(self) -> int:
+        return sum(len(years) for years in self._years.values())
+
+    def add(self, company: str, kpi: Dict[str, Any], source: Optional[str] = None) -> bool:
+        """Record one KPI; a later value for the same (company, metric, year) replaces the earlier one"""
+        parsed = self._key(company, kpi)
+        if parsed is None:
+            return False
+        key, year, value = parsed
+        series = self._values.setdefault(key, {})
+        if year not in series:
+            bisect.insort(self._years.setdefault(key, []), year)
+        series[year] = {'value': value, 'source': source}
+        return True
+
+    def add_report(self, company: str, kpis: Iterable[Dict[str, Any]], source: Optional[str] = None) -> int:
+        """Record all KPIs of a report; returns how many were indexed"""
+        return sum(self.add(company, kpi, source) for kpi in kpis)
+
+    def get(self, company: str, metric: str, year: int, unit: str = '') -> Optional[Dict[str, Any]]:
+        """Indexed entry for (company, metric, year) in the given canonical unit"""
+        return self._values.get((company, metric.lower(), unit), {}).get(year)
+
+    def _previous(self, key: MetricKey, year: int) -> Optional[int]:
+        years = self._years.get(key)
+        if not years:
+            return None
+        i = bisect.bisect_left(years, year)
+        return years[i - 1] if i else None
+
+    def _parsed_report(self, company: str, kpis: Iterable[Dict[str, Any]]):
+        """Parse a report once: [(position, kpi, key, year, value)] plus its own (key -> {year: value})"""
+        parsed, own = [], {}
+        for i, kpi in enumerate(kpis):
+            entry = self._key(company, kpi)
+            if entry is not None:
+                key, year, value = entry
+                parsed.append((i, kpi, key, year, value))
+                own.setdefault(key, {})[year] = value
+        return parsed, own
+
+    def check_year_over_year(self, company: str, kpis: List[Dict[str, Any]],
+                             max_change: float = 0.5) -> List[Dict[str, Any]]:
+        """
+        Flag KPIs whose value moved by more than `max_change` (relative) from the closest earlier year,
+        taken from the history index or from the same report.
+        Returns:
+            List[dict]: index, name, year, value, previous_year, previous_value, change.
+        """
+        parsed, own = self._parsed_report(company, kpis)
+        jumps = []
+        for i, kpi, key, year, value in parsed:
+            options = []
+            earlier = [y for y in own[key] if y < year]
+            if earlier:
+                options.append((max(earlier), own[key][max(earlier)]))
+            history_year = self._previous(key, year)
+            if history_year is not None:
+                options.append((history_year, self._values[key][history_year]['value']))
+            if not options:
+                continue
+            previous_year, previous = max(options, key=lambda option: option[0])
+            if previous == 0:
+                continue
+            change = (value - previous) / abs(previous)
+            if abs(change) > max_change:
+                jumps.append({'index': i, 'name': kpi.get('name'), 'year': year, 'value': value,
+                              'previous_year': previous_year, 'previous_value': previous, 'change': change})
+        return jumps
+
+    def detect_restatements(self, company: str, kpis: List[Dict[str, Any]],
+                            tolerance: float = 0.01) -> List[Dict[str, Any]]:
+        """
+        Flag KPIs that report a different value for a (metric, year) already in the index.
+        Returns:
+            List[dict]: index, name, year, value, indexed_value, indexed_source, change.
+        """
+        parsed, _ = self._parsed_report(company, kpis)
+        restatements = []
+        for i, kpi, key, year, value in parsed:
+            indexed = self._values.get(key, {}).get(year)
+            if indexed is None:
+                continue
+            reference = indexed['value']
+            change = (value - reference) / abs(reference) if reference else (0.0 if value == 0 else float('inf'))
+            if abs(change) > tolerance:
+                restatements.append({'index': i, 'name': kpi.get('name'), 'year': year, 'value': value,
+                                     'indexed_value': reference, 'indexed_source': indexed['source'],
+                                     'change': change})
+        return restatements
+
+    def check_base_year_claims(self, company: str, kpis: List[Dict[str, Any]],
+                               tolerance: float = 0.02) -> List[Dict[str, Any]]:
+        """
+        Verify claims such as "a 15% reduction from our 2022 baseline" in a KPI's reference text.
+        The base value comes from the index (or the same report), falling back to a value stated in
+        the claim itself ("... baseline of 112,000"). Index bases share the KPI's canonical unit; a
+        stated base is used only if its unit, when it names one, is the KPI's. Percentage KPIs are
+        skipped, as is a KPI whose value is the claimed change itself ("15%"): neither is comparable
+        with an absolute base. A claim is consistent if the implied value is within `tolerance`
+        (relative) of the reported one.
+        Returns:
+            List[dict]: One entry per claim with claimed_change, base_year, base_value,
+            implied_value, base_source and is_consistent (None if no base value was found).
+        """
+        parsed, own = self._parsed_report(company, kpis)
+        results = []
+        for i, kpi, key, year, value in parsed:
+            match = BASE_YEAR_CLAIM.search(f"{kpi.get('reference', '')} {kpi.get('value', '')}")
+            if not match:
+                continue
+            pct, direction, base_year = float(match.group(1)), match.group(2).lower(), int(match.group(3))
+            if key[2] == '%' or value == pct:
+                continue
+            sign = 1 if direction in ('increase', 'rise') else -1
+            base_value, base_source = None, None
+            if base_year in own[key] and base_year != year:
+                base_value, base_source = own[key][base_year], 'report'
+            elif base_year in self._values.get(key, {}):
+                base_value, base_source = self._values[key][base_year]['value'], 'history'
+            elif match.group(4):
+                unit, factor = self._claim_unit(match.group(5), kpi)
+                if unit == key[2] or (unit, key[2]) in _SAME_UNIT:
+                    base_value, base_source = parse_numeric_value(match.group(4)) * factor, 'claim'
+            result = {'index': i, 'name': kpi.get('name'), 'year': year, 'value': value,
+                      'claimed_change': sign * pct / 100, 'base_year': base_year, 'base_value': base_value,
+                      'implied_value': None, 'base_source': base_source, 'is_consistent': None}
+            if base_value is not None:
+                implied = base_value * (1 + sign * pct / 100)
+                result['implied_value'] = implied
+                result['is_consistent'] = abs(value - implied) <= tolerance * max(abs(implied), abs(value))
+            results.append(result)
+        return results
+
+    @staticmethod
+    def _claim_unit(text: Optional[str], kpi: Dict[str, Any]) -> Tuple[str, float]:
+        """(canonical unit, factor) of a base value stated in a claim; without a known unit, the KPI's own"""
+        if text:
+            unit, factor = normalize_unit(text)
+            if unit != ' '.join(text.lower().split()):
+                return unit, factor
+        return normalize_unit(kpi.get('metric_type', ''))
+
+    def check_report(self, company: str, kpis: List[Dict[str, Any]], max_change: float = 0.5) -> Dict[str, List]:
+        """Run all history checks for one report"""
+        return {
+            'year_over_year_jumps': self.check_year_over_year(company, kpis, max_change),
+            'restatements': self.detect_restatements(company, kpis),
+            'base_year_claims': self.check_base_year_claims(company, kpis),
+        }
+
+    def temporal_warnings(self, company: str, kpis: List[Dict[str, Any]]) -> List[str]:
+        """Human-readable warnings in the style of validate_temporal_consistency"""
+        report = self.check_report(company, kpis)
+        warnings = [f"{j['name']} changed {j['change']:+.0%} from {j['previous_year']} to {j['year']}"
+                    for j in report['year_over_year_jumps']]
+        warnings += [f"{r['name']} {r['year']} restated from {r['indexed_value']:g} to {r['value']:g}"
+                     for r in report['restatements']]
+        warnings += [f"{c['name']}: claimed {c['claimed_change']:+.0%} vs {c['base_year']} is inconsistent "
+                     f"with base value {c['base_value']:g}"
+                     for c in report['base_year_claims'] if c['is_consistent'] is False]
+        return warnings
+
+    def save(self, path: str):
+        """Write the index as compact JSON rows, atomically"""
+        rows = [[company, metric, unit, year, entry['value'], entry['source']]
+                for (company, metric, unit), series in self._values.items()
+                for year, entry in series.items()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'rows': rows}, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'KpiHistoryIndex':
+        """Load a saved index (empty if the file does not exist yet)"""
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = json.load(f)['rows']
+        for company, metric, unit, year, value, source in rows:
+            key = (company, metric, unit)
+            index._values.setdefault(key, {})[year] = {'value': value, 'source': source}
+        for key, series in index._values.items():
+            index._years[key] = sorted(series)
+        return index
@@ -0,0 +1,365 @@
+"""
+Columnar KPI table for the Python pipeline
+Stores extracted KPIs as typed NumPy columns instead of lists of free-form dicts
+"""
+
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+MISSING = -1
+
+# Dict keys backed by typed columns, in the order they are emitted by to_records()
+STRING_FIELDS = ('name', 'category', 'metric_type', 'validation_status')
+NUMERIC_FIELDS = ('value', 'year', 'confidence_score')
+_KEY_ORDER = ('name', 'value', 'metric_type', 'year', 'confidence_score', 'validation_status', 'category')
+_PRESENT_BIT = {key: 1 << i for i, key in enumerate(_KEY_ORDER)}
+
+_NUMBER_RE = re.compile(
+    r'(-?\d{1,3}(?:,\d{3})+(?:\.\d+)?|-?\d+(?:\.\d+)?|-?\.\d+)\s*(thousand|million|billion)?',
+    re.IGNORECASE
+)
+_SCALE = {'thousand': 1e3, 'million': 1e6, 'billion': 1e9}
+
+
+def parse_numeric_value(value: Any) -> Optional[float]:
+    """Parse the leading number of a KPI value such as '95,000 metric tons' or '8.5%'"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _NUMBER_RE.search(value)
+    if not match:
+        return None
+    number = float(match.group(1).replace(',', ''))
+    scale = match.group(2)
+    return number * _SCALE[scale.lower()] if scale else number
+
+
+def _parse_year(year: Any) -> int:
+    if isinstance(year, bool) or year is None:
+        return MISSING
+    if isinstance(year, int):
+        return year
+    try:
+        return int(str(year).strip())
+    except ValueError:
+        return MISSING
+
+
+class KpiTable:
+    """
+    Compact columnar container for ESG KPIs.
+
+    Typed columns:
+        name, category, metric_type (unit), validation_status: int32 codes into a shared
+            pool of interned strings (-1 when missing)
+        value: float64 parsed from the reported value (NaN when unparseable)
+        year: int32 (-1 when missing)
+        confidence_score: float64 (NaN when missing)
+
+    The original value and any fields without a typed column (reference, reasoning,
+    quality flags, ...) are kept per row so that to_records() reproduces the input exactly.
+    """
+
+    def __init__(self):
+        self._vocab: List[str] = []
+        self._lookup: Dict[str, int] = {}
+        self._codes = {field: np.empty(0, dtype=np.int32) for field in STRING_FIELDS}
+        self._value = np.empty(0, dtype=np.float64)
+        self._year = np.empty(0, dtype=np.int32)
+        self._score = np.empty(0, dtype=np.float64)
+        self._present = np.empty(0, dtype=np.uint8)
+        self._raw_values: List[Any] = []
+        self._extras: List[Optional[Dict[str, Any]]] = []
+        self.sections: List[str] = []
+        self.meta: Dict[str, Any] = {}
+
+    # ------------------------------------------------------------------ building
+
+    def _intern(self, text: str) -> int:
+        code = self._lookup.get(text)
+        if code is None:
+            code = len(self._vocab)
+            self._vocab.append(text)
+            self._lookup[text] = code
+        return code
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], category: Optional[str] = None) -> 'KpiTable':
+        """
+        Build a table from KPI dicts as returned by the extractors.
+        Args:
+            records (Iterable[Dict]): KPI dicts.
+            category (str, optional): Category assigned to rows without a 'category' key.
+        Returns:
+            KpiTable: Columnar copy of the records.
+        """
+        table = cls()
+        table._extend(records, category)
+        return table
+
+    @classmethod
+    def from_response(cls, data: Dict[str, Any]) -> 'KpiTable':
+        """
+        Build a table from an extraction response ({"environmental": [...], ..., "extraction_metadata": {...}}).
+        Every list-valued key is treated as a category; other keys are kept in `meta`.
+        """
+        table = cls()
+        for key, section in data.items():
+            if isinstance(section, list):
+                table.sections.append(key)
+                table._extend(section, key, section=True)
+            else:
+                table.meta[key] = section
+        return table
+
+    def _extend(self, records: Iterable[Dict[str, Any]], category: Optional[str], section: bool = False):
+        codes = {field: [] for field in STRING_FIELDS}
+        values, years, scores, present = [], [], [], []
+        for record in records:
+            mask = 0
+            extras = {}
+            for key in _KEY_ORDER:
+                if key in record:
+                    mask |= _PRESENT_BIT[key]
+            for field in STRING_FIELDS:
+                text = record.get(field)
+                if field == 'category' and (section or 'category' not in record):
+                    if 'category' in record:
+                        extras['category'] = text
+                    text = category
+                if isinstance(text, str):
+                    codes[field].append(self._intern(text))
+                else:
+                    codes[field].append(MISSING)
+                    if text is not None and field not in extras:
+                        extras[field] = text
+            raw = record.get('value')
+            parsed = parse_numeric_value(raw)
+            values.append(np.nan if parsed is None else parsed)
+            self._raw_values.append(raw)
+            year = record.get('year')
+            years.append(_parse_year(year))
+            if year is not None and not (isinstance(year, int) and not isinstance(year, bool)):
+                extras['year'] = year
+            score = record.get('confidence_score')
+            if isinstance(score, (int, float)) and not isinstance(score, bool):
+                scores.append(score)
+                if isinstance(score, float):
+                    extras['confidence_score'] = score  # Kept so that to_records() returns a float
+            else:
+                scores.append(np.nan)
+                if score is not None:
+                    extras['confidence_score'] = score
+            for key, item in record.items():
+                if key not in _PRESENT_BIT:
+                    extras[key] = item
+            present.append(mask)
+            self._extras.append(extras or None)
+        for field in STRING_FIELDS:
+            self._codes[field] = np.concatenate([self._codes[field], np.asarray(codes[field], dtype=np.int32)])
+        self._value = np.concatenate([self._value, np.asarray(values, dtype=np.float64)])
+        self._year = np.concatenate([self._year, np.asarray(years, dtype=np.int32)])
+        self._score = np.concatenate([self._score, np.asarray(scores, dtype=np.float64)])
+        self._present = np.concatenate([self._present, np.asarray(present, dtype=np.uint8)])
+
+    @classmethod
+    def concat(cls, tables: Sequence['KpiTable']) -> 'KpiTable':
+        """Concatenate tables into one, re-mapping string codes onto a single pool"""
+        result = cls()
+        for table in tables:
+            remap = np.fromiter((result._intern(text) for text in table._vocab), dtype=np.int32,
+                                count=len(table._vocab))
+            for field in STRING_FIELDS:
+                src = table._codes[field]
+                mapped = np.where(src >= 0, remap[np.maximum(src, 0)] if len(remap) else src, MISSING)
+                result._codes[field] = np.concatenate([result._codes[field], mapped.astype(np.int32)])
+            result._value = np.concatenate([result._value, table._value])
+            result._year = np.concatenate([result._year, table._year])
+            result._score = np.concatenate([result._score, table._score])
+            result._present = np.concatenate([result._present, table._present])
+            result._raw_values.extend(table._raw_values)
+            result._extras.extend(table._extras)
+            result.sections.extend(s for s in table.sections if s not in result.sections)
+            result.meta.update(table.meta)
+        return result
+
+    def take(self, indices: Sequence[int]) -> 'KpiTable':
+        """Return a new table with the given rows, sharing this table's string pool"""
+        idx = np.asarray(indices, dtype=np.intp)
+        result = KpiTable()
+        result._vocab = list(self._vocab)
+        result._lookup = dict(self._lookup)
+        result._codes = {field: codes[idx] for field, codes in self._codes.items()}
+        result._value = self._value[idx]
+        result._year = self._year[idx]
+        result._score = self._score[idx]
+        result._present = self._present[idx]
+        result._raw_values = [self._raw_values[i] for i in idx]
+        result._extras = [self._extras[i] for i in idx]
+        result.sections = list(self.sections)
+        return result
+
+    # ------------------------------------------------------------------ conversion
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """Return row i in the JSON dict form"""
+        mask = int(self._present[i])
+        extras = self._extras[i] or {}
+        out: Dict[str, Any] = {}
+        for key in _KEY_ORDER:
+            if not mask & _PRESENT_BIT[key]:
+                continue
+            if key in extras:
+                out[key] = extras[key]
+            elif key in self._codes:
+                code = int(self._codes[key][i])
+                out[key] = self._vocab[code] if code >= 0 else None
+            elif key == 'value':
+                out[key] = self._raw_values[i]
+            elif key == 'year':
+                year = int(self._year[i])
+                out[key] = year if year != MISSING else None
+            else:
+                score = self._score[i]
+                out[key] = None if np.isnan(score) else int(score)
+        for key, item in extras.items():
+            if key not in _PRESENT_BIT:
+                out[key] = item
+        return out
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Convert back to a list of KPI dicts (inverse of from_records)"""
+        return [self.record(i) for i in range(len(self))]
+
+    def to_response(self) -> Dict[str, Any]:
+        """Convert back to the extraction response form (inverse of from_response)"""
+        response: Dict[str, Any] = {section: [] for section in self.sections}
+        categories = self._codes['category']
+        for i in range(len(self)):
+            code = int(categories[i])
+            section = self._vocab[code] if code >= 0 else None
+            response.setdefault(section, []).append(self.record(i))
+        response.update(self.meta)
+        return response
+
+    def to_dataframe(self):
+        """Return a pandas DataFrame over the typed columns (string columns as Categoricals)"""
+        import pandas as pd
+        categories = pd.Index(self._vocab, dtype=object)
+        data = {
+            field: pd.Categorical.from_codes(self._codes[field], categories=categories)
+            for field in STRING_FIELDS
+        }
+        data['value'] = self._value
+        data['year'] = self._year
+        data['confidence_score'] = self._score
+        return pd.DataFrame(data, copy=False)
+
+    # ------------------------------------------------------------------ column access
+
+    def __len__(self) -> int:
+        return len(self._value)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def __repr__(self) -> str:
+        return f"KpiTable(rows={len(self)}, strings={len(self._vocab)})"
+
+    @property
+    def vocab(self) -> List[str]:
+        """Shared pool of interned strings that the code columns index into"""
+        return self._vocab
+
+    @staticmethod
+    def _readonly(array: np.ndarray) -> np.ndarray:
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    def codes(self, field: str) -> np.ndarray:
+        """Zero-copy read-only view of a string column's int32 codes"""
+        return self._readonly(self._codes[field])
+
+    def column(self, field: str) -> np.ndarray:
+        """Zero-copy read-only view of a numeric column ('value', 'year' or 'confidence_score')"""
+        if field == 'value':
+            return self._readonly(self._value)
+        if field == 'year':
+            return self._readonly(self._year)
+        if field == 'confidence_score':
+            return self._readonly(self._score)
+        raise KeyError(f"No numeric column named {field!r}")
+
+    def strings(self, field: str) -> List[Optional[str]]:
+        """Decode a string column into a list of Python strings (None when missing)"""
+        vocab = self._vocab
+        return [vocab[code] if code >= 0 else None for code in self._codes[field].tolist()]
+
+    def extra(self, key: str) -> List[Any]:
+        """Values of an untyped field (e.g. 'reference' or 'industry') per row, None when absent"""
+        return [extras.get(key) if extras else None for extras in self._extras]
+
+    def has_extra(self, key: str) -> bool:
+        """Whether any row keeps `key` untyped, e.g. 'year' when some year is the string '2023'"""
+        return any(key in extras for extras in self._extras if extras)
+
+    def raw(self, field: str) -> List[Any]:
+        """Values of a field per row exactly as in the dicts (None when absent), e.g. '95,000 t' or '2023'"""
+        if field == 'value':
+            return list(self._raw_values)
+        if field in self._codes:
+            column = self.strings(field)
+        elif field == 'year':
+            column = [year if year != MISSING else None for year in self._year.tolist()]
+        elif field == 'confidence_score':
+            column = [None if np.isnan(score) else int(score) for score in self._score.tolist()]
+        else:
+            return self.extra(field)
+        return [extras[field] if extras and field in extras else item for item, extras in zip(column, self._extras)]
+
+    def casefold_codes(self, field: str) -> np.ndarray:
+        """
+        Codes of a string column after lower-casing, so that 'Tons' and 'tons' share a code.
+        Missing and empty strings map to -1. Only the pool is lower-cased, not every row.
+        """
+        remap = np.empty(len(self._vocab), dtype=np.int32)
+        first: Dict[str, int] = {}
+        for code, text in enumerate(self._vocab):
+            lowered = text.lower()
+            remap[code] = MISSING if not lowered else first.setdefault(lowered, code)
+        codes = self._codes[field]
+        if not len(remap):
+            return np.full(len(codes), MISSING, dtype=np.int32)
+        return np.where(codes >= 0, remap[np.maximum(codes, 0)], MISSING).astype(np.int32)
+
+    def code_of(self, text: str) -> int:
+        """Code of an interned string, or -1 if it never occurs in the table"""
+        return self._lookup.get(text, MISSING)
+
+    def equals(self, field: str, text: str) -> np.ndarray:
+        """Boolean mask of rows whose string column equals `text` (one integer comparison per row)"""
+        code = self.code_of(text)
+        if code == MISSING:
+            return np.zeros(len(self), dtype=bool)
+        return self._codes[field] == code
+
+    def duplicate_rows(self, name_field: str = 'name') -> np.ndarray:
+        """Rows whose (lower-cased name, year) already occurred earlier in the table"""
+        keys = (self.casefold_codes(name_field).astype(np.int64) << 32) | (self._year.astype(np.int64) & 0xFFFFFFFF)
+        _, first = np.unique(keys, return_index=True)
+        is_duplicate = np.ones(len(self), dtype=bool)
+        is_duplicate[first] = False
+        return np.flatnonzero(is_duplicate)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the typed NumPy columns"""
+        arrays = list(self._codes.values()) + [self._value, self._year, self._score, self._present]
+        return sum(a.nbytes for a in arrays)
@@ -0,0 +1,108 @@
+"""
+Lazy loading of heavy optional dependencies
+Modules are imported on first attribute access, so a worker only pays for the parsers and stages it uses
+"""
+
+import importlib
+import importlib.util
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Every lazy module created so far, by import name
+LAZY_MODULES: Dict[str, 'LazyModule'] = {}
+# Extra warm-up steps beyond importing a module (e.g. loading a spaCy model), by component name
+WARMUPS: Dict[str, Callable[[], Any]] = {}
+
+
+class LazyModule:
+    """
+    Stand-in for a module that imports it on first attribute access (thread-safe) and then
+    forwards every attribute get and set to it, so `pdfplumber.open(...)` works unchanged and tests
+    can still patch attributes. `on_import` runs once on the real module, e.g. to configure an SDK.
+    """
+
+    def __init__(self, name: str, on_import: Optional[Callable[[Any], None]] = None):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_on_import', on_import)
+        object.__setattr__(self, '_module', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    if self._on_import is not None:
+                        self._on_import(module)
+                    object.__setattr__(self, '_module', module)
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str, on_import: Optional[Callable[[Any], None]] = None) -> LazyModule:
+    """Lazy stand-in for a required module (an ImportError surfaces on first use)"""
+    module = LAZY_MODULES.get(name)
+    if module is None or on_import is not None:
+        module = LAZY_MODULES[name] = LazyModule(name, on_import)
+    return module
+
+
+def optional_lazy_import(name: str, on_import: Optional[Callable[[Any], None]] = None) -> Optional[LazyModule]:
+    """
+    Lazy stand-in for an optional module, or None if it is not installed.
+    Only the package metadata is looked up here, so `if not spacy:` checks keep working without
+    importing the package.
+    """
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        spec = None
+    return lazy_import(name, on_import) if spec is not None else None
+
+
+def register_warmup(component: str, fn: Callable[[], Any]):
+    """Register an extra warm-up step, run by warm_up() when the component is selected"""
+    WARMUPS[component] = fn
+
+
+def warm_up(components: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """
+    Preload components before a worker takes traffic (e.g. from a gunicorn post_fork hook).
+    Args:
+        components (Iterable[str], optional): Module names (e.g. 'pdfplumber', 'google.generativeai')
+            or registered warm-up names; defaults to every lazy module and warm-up registered so far.
+    Returns:
+        Dict[str, float]: Seconds spent per component.
+    """
+    if components is None:
+        components = list(LAZY_MODULES) + [name for name in WARMUPS if name not in LAZY_MODULES]
+    timings = {}
+    for component in components:
+        start = time.perf_counter()
+        if component in LAZY_MODULES:
+            LAZY_MODULES[component]._load()
+        elif component not in WARMUPS:
+            importlib.import_module(component)
+        if component in WARMUPS:
+            WARMUPS[component]()
+        timings[component] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,58 @@
+"""
+Benchmark: vectorized compare_to_benchmark_bulk vs. a Python loop over compare_to_benchmark
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarking.benchmarks import INDUSTRY_BENCHMARKS, compare_to_benchmark, compare_to_benchmark_bulk
+
+
+def make_portfolio(companies: int, metrics_per_company: int, seed: int = 7) -> pd.DataFrame:
+    """One row per (company, metric); half of the metric names have a static benchmark"""
+    rng = np.random.default_rng(seed)
+    known = sorted({m for b in INDUSTRY_BENCHMARKS.values() for m in b})
+    names = known + [f"custom_metric_{i}" for i in range(len(known))]
+    rows = companies * metrics_per_company
+    industries = list(INDUSTRY_BENCHMARKS)
+    return pd.DataFrame({
+        'industry': np.repeat(rng.choice(industries, companies), metrics_per_company),
+        'metric_name': rng.choice(names, rows),
+        'value': rng.uniform(0, 800, rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--companies', type=int, default=5_000)
+    parser.add_argument('--metrics', type=int, default=40)
+    args = parser.parse_args()
+
+    portfolio = make_portfolio(args.companies, args.metrics)
+    rows = len(portfolio)
+
+    start = time.perf_counter()
+    scalar = [compare_to_benchmark(m, v, i) for i, m, v in
+              zip(portfolio['industry'], portfolio['metric_name'], portfolio['value'])]
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bulk = compare_to_benchmark_bulk(portfolio)
+    bulk_s = time.perf_counter() - start
+
+    categorical = portfolio.astype({'industry': 'category', 'metric_name': 'category'})
+    start = time.perf_counter()
+    compare_to_benchmark_bulk(categorical)
+    categorical_s = time.perf_counter() - start
+
+    assert bulk['note'].tolist() == [r['note'] for r in scalar]
+    print(f"{rows:,} rows")
+    for label, seconds in (('scalar loop', loop_s), ('bulk', bulk_s), ('bulk, categorical keys', categorical_s)):
+        print(f"  {label:<24} {seconds:>7.3f}s {rows / seconds:>14,.0f} rows/s {loop_s / seconds:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: parse_excel (whole file to records) vs. streaming batches vs. the Parquet copy on a large CSV dump
+Each mode runs in a fresh interpreter so peak RSS is comparable; every mode sums the value column
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from perf.corpus import write_kpi_csv
+
+_PROBE = """
+import json, resource, time
+from data_ingestion.excel_parser import iter_excel_batches, parse_excel
+
+mode, path, parquet_dir = {mode!r}, {path!r}, {parquet_dir!r}
+dtype = {{'company': 'string', 'industry': 'category', 'metric': 'category', 'year': 'int16', 'value': 'float64',
+          'unit': 'category'}}
+start = time.perf_counter()
+if mode == 'parse_excel':
+    rows = parse_excel(path)
+    total, count = sum(row['value'] for row in rows), len(rows)
+else:
+    total = count = 0
+    for batch in iter_excel_batches(path, dtype=dtype, parquet_dir=parquet_dir if mode != 'streaming' else None):
+        total += float(batch['value'].sum())
+        count += len(batch)
+wall_s = time.perf_counter() - start
+print(json.dumps({{'wall_s': wall_s, 'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'rows': count, 'total': round(total, 2)}}))
+"""
+
+
+def measure(path: str, mode: str, parquet_dir: str) -> Dict[str, Any]:
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', _PROBE.format(mode=mode, path=path,
+                                                                                 parquet_dir=parquet_dir)],
+                            capture_output=True, text=True, check=True).stdout
+    return {'mode': mode, **json.loads(output.strip().splitlines()[-1])}
+
+
+def run(rows: int, seed: int = 42) -> List[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'kpi_dump.csv')
+        write_kpi_csv(path, random.Random(seed), rows)
+        parquet_dir = os.path.join(tmp, 'parquet')
+        modes = ['parse_excel', 'streaming', 'parquet (convert)', 'parquet (cached)']
+        return [measure(path, mode, parquet_dir) for mode in modes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rows = run(args.rows)
+    print(f"{'mode':<18} {'wall':>9} {'peak RSS':>11} {'rows':>11}")
+    for row in rows:
+        print(f"{row['mode']:<18} {row['wall_s']:>8.2f}s {row['peak_rss_mb']:>8.1f} MB {row['rows']:>11,}")
+
+
+if __name__ == '__main__':
+    main()
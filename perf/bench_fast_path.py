@@ -0,0 +1,66 @@
+"""
+Benchmark: rule-based fast path + LLM fallback vs. LLM-only extraction
+Reports rule coverage, LLM calls and characters saved, and wall time against the stub model
+"""
+
+import argparse
+import random
+import time
+
+from ai_pipeline import llm_stage
+from ai_pipeline.rule_stage import extract_kpis_hybrid
+from perf.corpus import generate_kpis, generate_report_text
+from perf.stub_llm import stub_genai
+
+
+def run(reports: int, paragraphs: int, kpis: int, latency: float, max_chars: int, seed: int = 42):
+    rng = random.Random(seed)
+    texts = [generate_report_text(rng, paragraphs, generate_kpis(rng, kpis)) for _ in range(reports)]
+    with stub_genai(latency=latency, module=llm_stage):
+        start = time.perf_counter()
+        llm_only_calls = 0
+        for text in texts:
+            for i in range(0, len(text), max_chars):
+                llm_stage.extract_kpis_with_llm(text[i:i + max_chars])
+                llm_only_calls += 1
+        llm_only_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = [extract_kpis_hybrid(text, max_chars=max_chars) for text in texts]
+        hybrid_s = time.perf_counter() - start
+
+    coverage = [r['coverage'] for r in results]
+    passages = sum(c['passages'] for c in coverage)
+    return {
+        'reports': reports,
+        'rule_coverage': sum(c['resolved_by_rules'] for c in coverage) / passages if passages else 1.0,
+        'kpis_rules': sum(c['kpis_by_method']['rules'] for c in coverage),
+        'kpis_llm': sum(c['kpis_by_method']['llm'] for c in coverage),
+        'llm_calls_llm_only': llm_only_calls,
+        'llm_calls_hybrid': sum(c['llm_calls'] for c in coverage),
+        'llm_chars_saved': sum(c['llm_chars_saved'] for c in coverage),
+        'llm_only_s': llm_only_s,
+        'hybrid_s': hybrid_s,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reports', type=int, default=20)
+    parser.add_argument('--paragraphs', type=int, default=60)
+    parser.add_argument('--kpis', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.05, help="Stub model latency per call (s)")
+    parser.add_argument('--max-chars', type=int, default=8_000)
+    args = parser.parse_args()
+
+    row = run(args.reports, args.paragraphs, args.kpis, args.latency, args.max_chars)
+    print(f"rule coverage:  {row['rule_coverage']:.1%} of passages "
+          f"({row['kpis_rules']} KPIs by rules, {row['kpis_llm']} by LLM)")
+    print(f"LLM calls:      {row['llm_calls_hybrid']} hybrid vs {row['llm_calls_llm_only']} LLM-only "
+          f"({row['llm_chars_saved']:,} prompt characters saved)")
+    print(f"wall time:      {row['hybrid_s']:.2f}s hybrid vs {row['llm_only_s']:.2f}s LLM-only "
+          f"({row['llm_only_s'] / max(row['hybrid_s'], 1e-9):.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: BeautifulSoup parse_html vs. the lxml fast path on report pages, and iterparse vs. a full parse on large XML
+HTML is timed in-process (wall time and characters of extracted text); XML runs in fresh interpreters for peak RSS
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from data_ingestion import html_parser
+from data_ingestion.html_parser import extract_html_text
+from perf.corpus import generate_kpis, generate_report_text, write_report_html
+
+_XML_PROBE = """
+import json, resource, time
+from data_ingestion.html_parser import etree, iter_xml_text
+start = time.perf_counter()
+if {mode!r} == 'full parse':
+    chars = sum(len(' '.join(t.split())) for t in etree.parse({path!r}).getroot().itertext())
+else:
+    chars = sum(len(text) for _, text in iter_xml_text({path!r}))
+print(json.dumps({{'wall_s': time.perf_counter() - start, 'chars': chars,
+                  'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def bench_html(pages: int, paragraphs: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(pages):
+            kpis = generate_kpis(rng, 40)
+            path = os.path.join(tmp, f"report_{i}.html")
+            write_report_html(path, generate_report_text(rng, paragraphs, kpis), kpis)
+            paths.append(path)
+        rows = []
+        for mode, parse in (('BeautifulSoup', _bs4_text), ('lxml fast path', extract_html_text)):
+            start = time.perf_counter()
+            chars = sum(len(parse(path)) for path in paths)
+            rows.append({'mode': mode, 'wall_s': time.perf_counter() - start, 'chars': chars})
+        return rows
+
+
+def _bs4_text(path: str) -> str:
+    """parse_html without a parse cache, whatever PARSE_CACHE_DIR says"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return html_parser.bs4.BeautifulSoup(f, 'html.parser').get_text(separator='\n')
+
+
+def bench_xml(items: int) -> List[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'feed.xml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0"?><facts xmlns="urn:esg">')
+            for i in range(items):
+                f.write(f"<fact><company>Company {i % 5000}</company><metric>Energy Consumption</metric>"
+                        f"<year>2023</year><value>{i * 1.5}</value><unit>MWh</unit></fact>")
+            f.write('</facts>')
+        rows = []
+        for mode in ('full parse', 'iterparse'):
+            output = subprocess.run([sys.executable, '-W', 'ignore', '-c', _XML_PROBE.format(mode=mode, path=path)],
+                                    capture_output=True, text=True, check=True).stdout
+            rows.append({'mode': mode, **json.loads(output.strip().splitlines()[-1])})
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--paragraphs', type=int, default=200)
+    parser.add_argument('--xml-items', type=int, default=500_000)
+    args = parser.parse_args()
+
+    print(f"{'HTML':<16} {'wall':>9} {'chars':>12}")
+    for row in bench_html(args.pages, args.paragraphs):
+        print(f"{row['mode']:<16} {row['wall_s']:>8.2f}s {row['chars']:>12,}")
+    print(f"\n{'XML':<16} {'wall':>9} {'peak RSS':>11} {'chars':>12}")
+    for row in bench_xml(args.xml_items):
+        print(f"{row['mode']:<16} {row['wall_s']:>8.2f}s {row['peak_rss_mb']:>8.1f} MB {row['chars']:>12,}")
+
+
+if __name__ == '__main__':
+    main()
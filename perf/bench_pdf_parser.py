@@ -0,0 +1,67 @@
+"""
+Benchmark: whole-document vs. streaming vs. page-parallel vs. parse-cached PDF text extraction
+Each mode runs in a fresh interpreter so peak RSS (including worker processes) is comparable
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from perf.corpus import generate_kpis, generate_report_text, write_report_pdf
+
+_PROBE = """
+import json, resource, tempfile, time
+import pdfplumber
+from data_ingestion.parse_cache import ParseCache
+from data_ingestion.pdf_parser import parse_pdf
+
+def whole_document(path):
+    # The pre-streaming implementation: every page's objects stay cached on the open document
+    with pdfplumber.open(path) as pdf:
+        return '\\n'.join(t for t in (page.extract_text() for page in pdf.pages) if t)
+
+cache = ParseCache(tempfile.mkdtemp()) if {mode!r} == 'cached' else None
+if cache is not None:
+    parse_pdf({path!r}, cache=cache)  # Populate; the timed run below is a re-extraction
+start = time.perf_counter()
+text = whole_document({path!r}) if {mode!r} == 'whole' else parse_pdf({path!r}, workers={workers}, cache=cache)
+wall_s = time.perf_counter() - start
+rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+print(json.dumps({{'wall_s': wall_s, 'peak_rss_mb': rss_kb / 1024, 'chars': len(text)}}))
+"""
+
+
+def measure(path: str, mode: str, workers: int = 1) -> Dict[str, Any]:
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', _PROBE.format(path=path, mode=mode, workers=workers)],
+                            capture_output=True, text=True, check=True).stdout
+    return {'mode': f"{mode} x{workers}" if mode == 'parallel' else mode, **json.loads(output.strip().splitlines()[-1])}
+
+
+def run(pages: int, workers: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'report.pdf')
+        write_report_pdf(path, generate_report_text(rng, pages * 3, generate_kpis(rng, pages)), pages)
+        return [measure(path, 'whole'), measure(path, 'streaming'), measure(path, 'parallel', workers),
+                measure(path, 'cached')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    rows = run(args.pages, args.workers)
+    print(f"{'mode':<14} {'wall':>9} {'peak RSS':>11} {'chars':>10}")
+    for row in rows:
+        print(f"{row['mode']:<14} {row['wall_s']:>8.2f}s {row['peak_rss_mb']:>8.1f} MB {row['chars']:>10,}")
+
+
+if __name__ == '__main__':
+    main()
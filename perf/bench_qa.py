@@ -0,0 +1,87 @@
+"""
+Benchmark: fused single-pass QA runner vs. the individual qa_checks functions
+Shows how runtime scales with the number of metrics (n) and distinct units/years (k)
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from qa.qa_checks import (
+    detect_outliers, check_unit_consistency, check_year_consistency, detect_duplicates, run_qa_checks
+)
+
+
+def make_metrics(n: int, k: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Synthetic metric dicts with k distinct units and k distinct years"""
+    rng = random.Random(seed)
+    return [
+        {
+            'name': f"Metric {rng.randrange(n)}",
+            'value': rng.gauss(1000, 150),
+            'metric_type': f"unit_{rng.randrange(k)}",
+            'year': 2000 + rng.randrange(k),
+        }
+        for _ in range(n)
+    ]
+
+
+def _legacy_mode_checks(metrics: List[Dict[str, Any]]):
+    """The original max(set(x), key=x.count) mode lookups, O(n*k)"""
+    units = [m.get('metric_type', '').lower() for m in metrics]
+    most_common = max(set(units), key=units.count)
+    years = [m.get('year') for m in metrics if m.get('year')]
+    most_common_year = max(set(years), key=years.count)
+    return most_common, most_common_year
+
+
+def _separate_checks(metrics: List[Dict[str, Any]]):
+    return (detect_outliers(metrics), check_unit_consistency(metrics),
+            check_year_consistency(metrics), detect_duplicates(metrics))
+
+
+def _best_of(fn: Callable, arg: Any, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes: List[int], distinct: List[int], repeat: int = 3) -> List[Dict[str, Any]]:
+    """Time each variant for every (n, k) combination"""
+    rows = []
+    for n in sizes:
+        for k in distinct:
+            metrics = make_metrics(n, k)
+            fused = run_qa_checks(metrics)
+            separate = _separate_checks(metrics)
+            assert (fused['outliers'], fused['unit_inconsistencies'], fused['year_inconsistencies'],
+                    fused['duplicates']) == separate
+            rows.append({
+                'n': n,
+                'k': k,
+                'legacy_mode_s': _best_of(_legacy_mode_checks, metrics, repeat),
+                'separate_s': _best_of(_separate_checks, metrics, repeat),
+                'fused_s': _best_of(run_qa_checks, metrics, repeat),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--distinct', type=int, nargs='+', default=[10, 1_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'n':>9} {'k':>6} {'legacy mode':>12} {'4 checks':>10} {'fused':>10} {'speedup':>8}")
+    for row in run(args.sizes, args.distinct, args.repeat):
+        print(f"{row['n']:>9} {row['k']:>6} {row['legacy_mode_s']:>11.3f}s {row['separate_s']:>9.3f}s "
+              f"{row['fused_s']:>9.3f}s {row['separate_s'] / row['fused_s']:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
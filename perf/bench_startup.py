@@ -0,0 +1,71 @@
+"""
+Benchmark: cold-start import time of the service and pipeline modules
+Each measurement runs in a fresh interpreter; warm-up shows what preloading the lazy dependencies costs
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+MODULES = [
+    'gemini_flask_api',
+    'data_ingestion.pdf_parser',
+    'data_ingestion.html_parser',
+    'data_ingestion.excel_parser',
+    'ai_pipeline.llm_stage',
+    'ai_pipeline.nlp_stage',
+    'ai_pipeline.ocr_stage',
+]
+
+_PROBE = """
+import json, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+from lazy_imports import LAZY_MODULES, warm_up
+timings = warm_up(list(LAZY_MODULES))
+print(json.dumps({{'import_s': imported - start, 'warm_up_s': time.perf_counter() - imported, 'components': timings}}))
+"""
+
+
+def measure(module: str, repeat: int = 5) -> Dict[str, Any]:
+    """Median import and warm-up time of a module over `repeat` fresh interpreters"""
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-W', 'ignore', '-c', _PROBE.format(module=module)],
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'module': module,
+        'import_s': statistics.median(s['import_s'] for s in samples),
+        'warm_up_s': statistics.median(s['warm_up_s'] for s in samples),
+        'components': sorted(samples[-1]['components']),
+    }
+
+
+def run(modules: List[str], repeat: int) -> List[Dict[str, Any]]:
+    return [measure(module, repeat) for module in modules]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    rows = run(args.modules, args.repeat)
+    print(f"{'module':<30} {'import':>9} {'warm-up':>9}  lazy components")
+    for row in rows:
+        print(f"{row['module']:<30} {row['import_s']:>8.3f}s {row['warm_up_s']:>8.3f}s  "
+              f"{', '.join(row['components']) or '-'}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Deterministic synthetic ESG report corpus
+Generates report text, KPI lists and PDF/HTML/CSV files of configurable size for benchmarks
+"""
+
+import csv
+import html
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+# (name, unit, category, low, high)
+METRICS = [
+    ("Total GHG Emissions Scope 1 & 2", "metric tons of CO2 equivalent", "environmental", 5_000, 500_000),
+    ("Scope 3 Emissions", "tCO2e", "environmental", 50_000, 5_000_000),
+    ("Renewable Energy Share", "percentage", "environmental", 5, 95),
+    ("Energy Consumption", "MWh", "environmental", 1_000, 900_000),
+    ("Water Withdrawal", "cubic meters", "environmental", 10_000, 9_000_000),
+    ("Waste Diverted from Landfill", "percentage", "environmental", 10, 98),
+    ("Employee Turnover Rate", "percentage", "social", 2, 30),
+    ("Training Hours per Employee", "hours", "social", 5, 80),
+    ("Total Employees", "employees", "social", 100, 250_000),
+    ("Lost Time Injury Rate", "count", "social", 0, 15),
+    ("Board Gender Diversity", "percentage", "governance", 10, 60),
+    ("Independent Directors", "percentage", "governance", 30, 95),
+]
+
+SIZES = {
+    # reports, paragraphs per report, KPIs per report, PDF pages, CSV rows
+    'small': {'reports': 5, 'paragraphs': 20, 'kpis': 30, 'pages': 5, 'csv_rows': 2_000},
+    'medium': {'reports': 20, 'paragraphs': 80, 'kpis': 120, 'pages': 40, 'csv_rows': 50_000},
+    'large': {'reports': 50, 'paragraphs': 300, 'kpis': 400, 'pages': 200, 'csv_rows': 500_000},
+}
+
+_FILLER = [
+    "Our sustainability strategy is aligned with the GRI Standards and the recommendations of the TCFD.",
+    "The Board reviews climate-related risks and opportunities at least twice a year.",
+    "We continued to engage suppliers on decarbonisation targets across our value chain.",
+    "Data in this section has been subject to limited assurance by an independent third party.",
+    "Management approach and policies are described in the governance chapter of this report.",
+]
+
+
+def generate_kpis(rng: random.Random, count: int, years=(2021, 2022, 2023)) -> List[Dict[str, Any]]:
+    """KPI dicts in the extractor schema, each with a reference sentence stating the value"""
+    kpis = []
+    for _ in range(count):
+        name, unit, category, low, high = rng.choice(METRICS)
+        year = rng.choice(years)
+        value = rng.uniform(low, high)
+        value_text = f"{value:.1f}%" if unit == "percentage" else f"{value:,.0f}"
+        reference = f"In {year}, our {name.lower()} was {value_text} {unit}."
+        kpis.append({
+            "name": name,
+            "value": value_text,
+            "metric_type": unit,
+            "year": year,
+            "reference": reference,
+            "category": category,
+        })
+    return kpis
+
+
+def generate_report_text(rng: random.Random, paragraphs: int, kpis: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Report-like text mixing filler sentences with sentences that state the given KPIs"""
+    kpis = list(kpis or [])
+    out = []
+    for i in range(paragraphs):
+        sentences = rng.sample(_FILLER, 3)
+        if kpis and (i % 2 == 0 or i >= paragraphs - len(kpis)):
+            sentences.insert(rng.randrange(len(sentences) + 1), kpis.pop()["reference"])
+        out.append(" ".join(sentences))
+    out.extend(kpi["reference"] for kpi in kpis)
+    return "\n\n".join(out)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _table_stream(rows: List[List[str]], top: float) -> str:
+    """Content stream drawing a ruled table (first column wide) with its top edge at `top`"""
+    widths = [200] + [80] * (max(len(row) for row in rows) - 1)
+    edges = [40]
+    for width in widths:
+        edges.append(edges[-1] + width)
+    height = 16
+    bottom = top - height * len(rows)
+    ops = [f"0.5 w {edges[0]} {top - i * height} m {edges[-1]} {top - i * height} l S" for i in range(len(rows) + 1)]
+    ops += [f"{x} {top} m {x} {bottom} l S" for x in edges]
+    for i, row in enumerate(rows):
+        for x, cell in zip(edges, row):
+            if cell:
+                ops.append(f"BT /F1 9 Tf {x + 3} {top - (i + 1) * height + 5} Td ({_pdf_escape(cell)}) Tj ET")
+    return " ".join(ops)
+
+
+def write_pdf(path: str, pages: List[List[str]], tables: Optional[Dict[int, List[List[str]]]] = None):
+    """
+    Write a minimal text-only PDF (Helvetica, one line per entry) without third-party libraries.
+    `tables` maps a page index to the rows of a ruled table drawn below that page's lines.
+    """
+    objects = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+    for index, lines in enumerate(pages):
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        if tables and index in tables:
+            stream += " " + _table_stream(tables[index], 800 - 11 * len(lines) - 20)
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects.append((content_id, f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream"))
+        objects.append((page_id, f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                                 f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"))
+        page_ids.append(page_id)
+    objects.insert(0, (1, "<< /Type /Catalog /Pages 2 0 R >>"))
+    objects.insert(1, (2, f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] /Count {len(page_ids)} >>"))
+    objects.insert(2, (font_id, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"))
+    objects.sort()
+
+    body = b"%PDF-1.4\n"
+    offsets = {}
+    for obj_id, content in objects:
+        offsets[obj_id] = len(body)
+        body += f"{obj_id} 0 obj\n{content}\nendobj\n".encode('latin-1')
+    xref_offset = len(body)
+    xref = [f"xref\n0 {len(objects) + 1}\n", "0000000000 65535 f \n"]
+    xref += [f"{offsets[obj_id]:010d} 00000 n \n" for obj_id in sorted(offsets)]
+    trailer = f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+    with open(path, 'wb') as f:
+        f.write(body + "".join(xref).encode('latin-1') + trailer.encode('latin-1'))
+
+
+def _wrap(text: str, width: int = 100) -> List[str]:
+    lines = []
+    for paragraph in text.split("\n"):
+        words, line = paragraph.split(), ""
+        for word in words:
+            if len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.append(line)
+    return lines
+
+
+def kpi_data_table(kpis: List[Dict[str, Any]]) -> List[List[str]]:
+    """ESG data table of KPIs: a 'Metric | Unit | <year>...' header and one row per metric"""
+    years = sorted({k['year'] for k in kpis})
+    values: Dict[tuple, Dict[int, str]] = {}
+    for k in kpis:
+        values.setdefault((k['name'], k['metric_type']), {})[k['year']] = k['value']
+    return [["Metric", "Unit"] + [str(year) for year in years]] + [
+        [name, unit] + [by_year.get(year, "") for year in years] for (name, unit), by_year in values.items()]
+
+
+def write_report_pdf(path: str, text: str, pages: int):
+    """Spread report text over a fixed number of PDF pages (repeating it if needed)"""
+    lines = _wrap(text)
+    per_page = 60
+    needed = pages * per_page
+    lines = (lines * (needed // max(len(lines), 1) + 1))[:needed]
+    write_pdf(path, [lines[i:i + per_page] for i in range(0, needed, per_page)])
+
+
+def write_report_html(path: str, text: str, kpis: List[Dict[str, Any]]):
+    """Investor-relations style page: nav/script/footer boilerplate around the report text and a KPI table"""
+    rows = "".join(
+        f"<tr><td>{html.escape(k['name'])}</td><td>{k['year']}</td><td>{html.escape(k['value'])}</td>"
+        f"<td>{html.escape(k['metric_type'])}</td></tr>" for k in kpis)
+    paragraphs = "".join(f"<p>{html.escape(p)}</p>" for p in text.split("\n\n"))
+    nav = "".join(f'<li><a href="/section-{i}">Section {i}</a></li>' for i in range(30))
+    document = (
+        "<!DOCTYPE html><html><head><title>Sustainability Report</title>"
+        "<style>body{font-family:sans-serif}</style><script>window.analytics=[];</script></head><body>"
+        f"<nav><ul>{nav}</ul></nav><main><h1>Sustainability Report</h1>{paragraphs}"
+        f"<table><tr><th>Metric</th><th>Year</th><th>Value</th><th>Unit</th></tr>{rows}</table></main>"
+        "<footer>Copyright. All rights reserved. Imprint. Privacy policy.</footer></body></html>"
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(document)
+
+
+def write_kpi_csv(path: str, rng: random.Random, rows: int):
+    """Data-provider style dump: one KPI per row for many companies"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["company", "industry", "metric", "year", "value", "unit"])
+        for _ in range(rows):
+            name, unit, _, low, high = rng.choice(METRICS)
+            writer.writerow([f"Company {rng.randrange(5_000)}", rng.choice(["banking", "apparel", "waste"]),
+                             name, rng.choice((2021, 2022, 2023)), round(rng.uniform(low, high), 2), unit])
+
+
+def build_corpus(out_dir: str, size: str = 'small', seed: int = 42, **overrides) -> Dict[str, Any]:
+    """
+    Write a synthetic corpus to `out_dir` and return its manifest.
+    Args:
+        out_dir (str): Output directory (created if needed).
+        size (str): Preset from SIZES ('small', 'medium', 'large').
+        seed (int): Random seed; the same seed and size always produce identical files.
+        **overrides: Override any preset count (reports, paragraphs, kpis, pages, csv_rows).
+    Returns:
+        dict: Paths of the generated files, the report texts and the KPI lists.
+    """
+    params = {**SIZES[size], **overrides}
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {'params': params, 'seed': seed, 'reports': []}
+    for i in range(params['reports']):
+        kpis = generate_kpis(rng, params['kpis'])
+        text = generate_report_text(rng, params['paragraphs'], kpis)
+        pdf_path = os.path.join(out_dir, f"report_{i:04d}.pdf")
+        html_path = os.path.join(out_dir, f"report_{i:04d}.html")
+        write_report_pdf(pdf_path, text, params['pages'])
+        write_report_html(html_path, text, kpis)
+        manifest['reports'].append({'text': text, 'kpis': kpis, 'pdf': pdf_path, 'html': html_path})
+    manifest['csv'] = os.path.join(out_dir, "kpi_dump.csv")
+    write_kpi_csv(manifest['csv'], rng, params['csv_rows'])
+    return manifest
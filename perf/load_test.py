@@ -0,0 +1,230 @@
+"""
+Load test for the Flask extraction service
+Drives /generate on a local server (stub model) with configurable concurrency, arrival rate and document mix
+"""
+
+import argparse
+import contextlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import requests
+
+from perf.corpus import generate_kpis, generate_report_text
+from perf.stub_llm import stub_genai
+
+# Paragraphs and KPIs per document for each size class
+DOC_SIZES = {
+    'small': (5, 5),
+    'medium': (40, 30),
+    'large': (200, 120),
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'small=0.7,large=0.3' -> {'small': 0.7, 'large': 0.3} (weights need not sum to 1)"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DOC_SIZES:
+            raise ValueError(f"Unknown document size {name!r}, expected one of {sorted(DOC_SIZES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def make_documents(mix: Dict[str, float], count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Deterministic request bodies drawn from the size mix"""
+    rng = random.Random(seed)
+    templates = {}
+    for size, (paragraphs, kpis) in DOC_SIZES.items():
+        templates[size] = generate_report_text(rng, paragraphs, generate_kpis(rng, kpis))
+    sizes, weights = zip(*mix.items())
+    return [{'size': size, 'prompt': templates[size]} for size in rng.choices(sizes, weights, k=count)]
+
+
+@contextlib.contextmanager
+def local_server(threaded: bool = True, processes: int = 1, latency: float = 0.05,
+                 per_kchar: float = 0.0, error_rate: float = 0.0) -> Iterator[str]:
+    """
+    Serve gemini_flask_api.app with the werkzeug server on a free localhost port, backed by the stub model.
+    Yields:
+        str: Base URL of the server.
+    """
+    import logging
+    from werkzeug.serving import make_server
+    from gemini_flask_api import app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # No access log line per request
+    with stub_genai(latency=latency, per_kchar=per_kchar, error_rate=error_rate):
+        server = make_server('127.0.0.1', 0, app, threaded=threaded, processes=processes)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_port}"
+        finally:
+            server.shutdown()
+            thread.join()
+
+
+def run_load(url: str, documents: List[Dict[str, Any]], concurrency: int = 8, rate: Optional[float] = None,
+             endpoint: str = '/generate', extractor_type: str = 'standard', timeout: float = 60.0,
+             seed: int = 42) -> Dict[str, Any]:
+    """
+    Send every document to the service and collect per-request timings.
+    With `rate` set, requests arrive open-loop as a Poisson process (rate per second) and wait for one of
+    `concurrency` client slots, so the time spent waiting shows up as queueing. Without it, `concurrency`
+    clients send back to back (closed loop).
+    Returns:
+        dict: Summary statistics (see summarize) plus the raw per-request samples.
+    """
+    local = threading.local()
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    scheduled = []
+    t = 0.0
+    for _ in documents:
+        scheduled.append(t)
+        if rate:
+            t += rng.expovariate(rate)
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def send(i: int) -> Dict[str, Any]:
+        nonlocal in_flight, max_in_flight
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        sent = time.perf_counter()
+        arrival = start + scheduled[i] if rate else sent
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        sample = {'size': documents[i]['size'], 'queue_s': sent - arrival, 'status': None,
+                  'error': None, 'fallback': False}
+        try:
+            response = local.session.post(url + endpoint, timeout=timeout,
+                                          json={'prompt': documents[i]['prompt'], 'extractor_type': extractor_type})
+            sample['status'] = response.status_code
+            if response.status_code != 200:
+                sample['error'] = f"HTTP {response.status_code}"
+            else:
+                sample['fallback'] = 'AI processing failed' in response.json().get('result', '')
+        except requests.RequestException as e:
+            sample['error'] = type(e).__name__
+        finished = time.perf_counter()
+        with lock:
+            in_flight -= 1
+        sample['latency_s'] = finished - sent
+        sample['total_s'] = finished - arrival
+        sample['finished_s'] = finished - start
+        return sample
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = []
+        for i in range(len(documents)):
+            delay = start + scheduled[i] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(send, i))
+        samples = [f.result() for f in futures]
+
+    summary = summarize(samples)
+    summary.update(concurrency=concurrency, rate=rate, max_in_flight=max_in_flight)
+    summary['samples'] = samples
+    return summary
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(max(values))}
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Throughput, error/fallback rates and latency/queueing percentiles, overall and per document size"""
+    ok = [s for s in samples if s['error'] is None]
+    duration = max((s['finished_s'] for s in samples), default=0.0)
+    summary = {
+        'requests': len(samples),
+        'errors': len(samples) - len(ok),
+        'error_rate': (len(samples) - len(ok)) / len(samples) if samples else 0.0,
+        'fallbacks': sum(s['fallback'] for s in ok),
+        'duration_s': duration,
+        'throughput_rps': len(ok) / duration if duration else 0.0,
+        'latency_s': _percentiles([s['latency_s'] for s in ok]),
+        'queue_s': _percentiles([max(s['queue_s'], 0.0) for s in samples]),
+        'total_s': _percentiles([s['total_s'] for s in ok]),
+        'by_size': {},
+    }
+    for size in sorted({s['size'] for s in samples}):
+        subset = [s for s in ok if s['size'] == size]
+        summary['by_size'][size] = {'requests': sum(s['size'] == size for s in samples),
+                                    'latency_s': _percentiles([s['latency_s'] for s in subset])}
+    return summary
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value * 1000:.1f}" if value is not None else '-'
+
+
+def print_table(runs: List[Dict[str, Any]]):
+    print(f"{'conc':>5} {'rate':>6} {'reqs':>6} {'rps':>8} {'err%':>6} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'queue p95':>10} {'in-flight':>9}")
+    for run in runs:
+        latency, queue = run['latency_s'], run['queue_s']
+        rate = f"{run['rate']:g}" if run['rate'] else 'max'
+        print(f"{run['concurrency']:>5} {rate:>6} {run['requests']:>6} {run['throughput_rps']:>8.1f} "
+              f"{run['error_rate'] * 100:>5.1f}% {_ms(latency['p50']):>8} {_ms(latency['p95']):>8} "
+              f"{_ms(latency['p99']):>8} {_ms(queue['p95']):>10} {run['max_in_flight']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help="Target an already running service instead of a local stub-backed one")
+    parser.add_argument('--endpoint', default='/generate')
+    parser.add_argument('--extractor-type', default='standard')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help="One run per concurrency level")
+    parser.add_argument('--rate', type=float, help="Open-loop arrival rate (requests/s); default is closed loop")
+    parser.add_argument('--mix', default='small=0.6,medium=0.3,large=0.1')
+    parser.add_argument('--latency', type=float, default=0.05, help="Stub model latency per call (s)")
+    parser.add_argument('--per-kchar', type=float, default=0.0, help="Extra stub latency per 1,000 prompt chars (s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of stub model calls that fail")
+    parser.add_argument('--server', choices=['threaded', 'single'], default='threaded')
+    parser.add_argument('--processes', type=int, default=1, help="Forked server processes (implies --server single)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='load_results.json')
+    parser.add_argument('--keep-samples', action='store_true', help="Include per-request samples in the JSON")
+    args = parser.parse_args()
+
+    documents = make_documents(parse_mix(args.mix), args.requests, args.seed)
+    threaded = args.server == 'threaded' and args.processes == 1
+    if args.url:
+        server = contextlib.nullcontext(args.url)
+    else:
+        server = local_server(threaded, args.processes, args.latency, args.per_kchar, args.error_rate)
+    runs = []
+    with server as url:
+        for concurrency in args.concurrency:
+            run = run_load(url, documents, concurrency, args.rate, args.endpoint, args.extractor_type,
+                           seed=args.seed)
+            if not args.keep_samples:
+                run.pop('samples')
+            runs.append(run)
+
+    print_table(runs)
+    config = {k: v for k, v in vars(args).items() if k not in ('output', 'keep_samples')}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'config': config, 'runs': runs}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
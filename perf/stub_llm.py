@@ -0,0 +1,78 @@
+"""
+Stub Gemini model for benchmarks and load tests
+Answers generate_content() locally with a configurable latency, so the Flask path can be timed offline
+"""
+
+import contextlib
+import json
+import re
+import threading
+import time
+from typing import Optional
+
+# Matches the KPI sentences written by perf.corpus ("In 2023, our energy consumption was 1,234 MWh.")
+_KPI_SENTENCE = re.compile(r'In ((?:19|20)\d{2}), our (.+?) was ([\d.,]+%?) (.+?)\.')
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel. The reply lists the KPI sentences found in the prompt in the
+    extractor's JSON schema, after sleeping `latency` seconds (plus `per_kchar` per 1,000 prompt characters).
+    """
+
+    calls = 0
+    _lock = threading.Lock()
+
+    def __init__(self, model_name: str = 'stub', latency: float = 0.0, per_kchar: float = 0.0,
+                 error_rate: float = 0.0):
+        self.model_name = model_name
+        self.latency = latency
+        self.per_kchar = per_kchar
+        self.error_rate = error_rate
+
+    def generate_content(self, prompt: str) -> StubResponse:
+        with StubGenerativeModel._lock:
+            StubGenerativeModel.calls += 1
+            call = StubGenerativeModel.calls
+        delay = self.latency + self.per_kchar * len(prompt) / 1000
+        if delay > 0:
+            time.sleep(delay)
+        # Deterministic failures: every (1 / error_rate)-th call raises
+        if self.error_rate and call % max(int(round(1 / self.error_rate)), 1) == 0:
+            raise RuntimeError("Stub model error")
+        text = prompt.split("Report Text:", 1)[-1]
+        kpis = [
+            {"name": name.title(), "value": value, "metric_type": unit, "year": int(year),
+             "reference": match.group(0), "confidence_score": 90,
+             "confidence_reasoning": "Clear metric with specific number, units, and year",
+             "quality_flags": [], "validation_status": "valid"}
+            for match in _KPI_SENTENCE.finditer(text)
+            for year, name, value, unit in [match.groups()]
+        ]
+        return StubResponse(json.dumps({"environmental": kpis, "social": [], "governance": []}))
+
+
+@contextlib.contextmanager
+def stub_genai(latency: float = 0.0, per_kchar: float = 0.0, error_rate: float = 0.0,
+               module: Optional[object] = None):
+    """
+    Temporarily replace genai.GenerativeModel in gemini_flask_api (or the given module) with the stub.
+    Usage:
+        with stub_genai(latency=0.05):
+            app.test_client().post('/generate', json={'prompt': text})
+    """
+    if module is None:
+        import gemini_flask_api as module
+    genai = module.genai
+    original = genai.GenerativeModel
+    genai.GenerativeModel = lambda model_name, **kwargs: StubGenerativeModel(
+        model_name, latency=latency, per_kchar=per_kchar, error_rate=error_rate)
+    try:
+        yield
+    finally:
+        genai.GenerativeModel = original
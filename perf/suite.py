@@ -0,0 +1,227 @@
+"""
+Performance benchmark suite for the Python pipeline
+Times the hot paths on a synthetic corpus, writes the results as JSON and flags regressions against a baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from kpi_table import KpiTable, parse_numeric_value
+from perf.corpus import SIZES, build_corpus
+from perf.stub_llm import stub_genai
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# A case prepares its inputs from the corpus manifest and returns (fn, items); fn() is what gets timed
+Case = Callable[[Dict[str, Any]], Tuple[Callable[[], Any], int]]
+
+
+def _all_kpis(manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [dict(kpi) for report in manifest['reports'] for kpi in report['kpis']]
+
+
+def case_parse_pdf(manifest):
+    from data_ingestion.pdf_parser import parse_pdf
+    paths = [r['pdf'] for r in manifest['reports']]
+    return (lambda: [parse_pdf(p) for p in paths]), len(paths) * manifest['params']['pages']
+
+
+def case_parse_html(manifest):
+    from data_ingestion.html_parser import parse_html
+    paths = [r['html'] for r in manifest['reports']]
+    return (lambda: [parse_html(p) for p in paths]), len(paths)
+
+
+def case_parse_csv(manifest):
+    from data_ingestion.excel_parser import parse_excel
+    return (lambda: parse_excel(manifest['csv'])), manifest['params']['csv_rows']
+
+
+def case_validation(manifest):
+    from validation_utils import enhance_kpi_with_validation, generate_extraction_metadata, detect_duplicate_metrics
+    kpis = _all_kpis(manifest)
+
+    def run():
+        enhanced = [enhance_kpi_with_validation(dict(kpi)) for kpi in kpis]
+        return generate_extraction_metadata(enhanced), detect_duplicate_metrics(enhanced)
+    return run, len(kpis)
+
+
+def case_qa_checks(manifest):
+    from qa.qa_checks import run_qa_checks
+    metrics = [{**kpi, 'value': parse_numeric_value(kpi['value'])} for kpi in _all_kpis(manifest)]
+    return (lambda: run_qa_checks(metrics)), len(metrics)
+
+
+def case_kpi_table(manifest):
+    kpis = _all_kpis(manifest)
+    return (lambda: KpiTable.from_records(kpis)), len(kpis)
+
+
+def case_benchmarking(manifest):
+    from benchmarking.benchmark_store import BenchmarkStore
+    from benchmarking.benchmarks import compare_kpis_to_benchmark
+    kpis = _all_kpis(manifest)
+
+    def run():
+        store = BenchmarkStore()
+        store.add_kpis(kpis, 'banking')
+        store.rebuild()
+        return compare_kpis_to_benchmark(kpis, 'banking', store=store)
+    return run, len(kpis)
+
+
+def case_flask_generate(manifest):
+    from gemini_flask_api import app
+    client = app.test_client()
+    texts = [r['text'] for r in manifest['reports']]
+
+    def run():
+        with stub_genai():
+            for text in texts:
+                response = client.post('/generate', json={'prompt': text})
+                if response.status_code != 200:
+                    raise RuntimeError(f"/generate returned {response.status_code}")
+    return run, len(texts)
+
+
+CASES: Dict[str, Case] = {
+    'parse_pdf': case_parse_pdf,
+    'parse_html': case_parse_html,
+    'parse_csv': case_parse_csv,
+    'validation': case_validation,
+    'qa_checks': case_qa_checks,
+    'kpi_table': case_kpi_table,
+    'benchmarking': case_benchmarking,
+    'flask_generate': case_flask_generate,
+}
+
+
+def time_case(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Run fn `warmup` times untimed, then `repeat` times; returns median/min/max wall time in seconds"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {'median_s': statistics.median(timings), 'min_s': min(timings), 'max_s': max(timings)}
+
+
+def run_suite(size: str = 'small', repeat: int = 5, cases: Optional[List[str]] = None,
+              seed: int = 42, corpus_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the corpus and time every selected case.
+    Returns:
+        dict: 'meta' (size, seed, python, platform, timestamp) and 'results' per case
+        (median_s, min_s, max_s, items, items_per_s).
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest = build_corpus(corpus_dir or tmp_dir, size, seed)
+        results = {}
+        for name in cases or list(CASES):
+            fn, items = CASES[name](manifest)
+            timing = time_case(fn, repeat)
+            timing['items'] = items
+            timing['items_per_s'] = items / timing['median_s'] if timing['median_s'] else None
+            results[name] = timing
+    return {
+        'meta': {
+            'size': size,
+            'seed': seed,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare_to_baseline(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2,
+                        min_delta_s: float = 0.001) -> List[Dict[str, Any]]:
+    """
+    Compare median timings case by case.
+    A case regresses when it is more than `tolerance` (relative) slower than the baseline and the
+    absolute slowdown exceeds `min_delta_s`, so sub-millisecond noise is not reported.
+    Returns:
+        List[dict]: case, baseline_s, current_s, ratio, status ('regression', 'improvement', 'ok' or 'new').
+    """
+    if baseline.get('meta', {}).get('size') != current['meta']['size']:
+        raise ValueError(f"Baseline was recorded for size {baseline.get('meta', {}).get('size')!r}, "
+                         f"not {current['meta']['size']!r}")
+    rows = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            rows.append({'case': name, 'baseline_s': None, 'current_s': result['median_s'],
+                         'ratio': None, 'status': 'new'})
+            continue
+        ratio = result['median_s'] / previous['median_s'] if previous['median_s'] else float('inf')
+        delta = result['median_s'] - previous['median_s']
+        if ratio > 1 + tolerance and delta > min_delta_s:
+            status = 'regression'
+        elif ratio < 1 / (1 + tolerance) and -delta > min_delta_s:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append({'case': name, 'baseline_s': previous['median_s'], 'current_s': result['median_s'],
+                     'ratio': ratio, 'status': status})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='perf_results.json', help="Where to write this run's results")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--ci', action='store_true', help="Fail when there is no baseline to compare with")
+    args = parser.parse_args()
+
+    current = run_suite(args.size, args.repeat, args.cases, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}; record one with --save-baseline", file=sys.stderr)
+        if args.ci:
+            sys.exit(2)
+
+    print(f"{'case':<16} {'median':>10} {'items/s':>12} {'baseline':>10} {'ratio':>7}  status")
+    comparison = {row['case']: row for row in compare_to_baseline(current, baseline, args.tolerance)} \
+        if baseline else {}
+    for name, result in current['results'].items():
+        row = comparison.get(name, {})
+        baseline_s = f"{row['baseline_s']:.4f}s" if row.get('baseline_s') is not None else '-'
+        ratio = f"{row['ratio']:.2f}" if row.get('ratio') is not None else '-'
+        rate = f"{result['items_per_s']:.0f}" if result['items_per_s'] else '-'
+        print(f"{name:<16} {result['median_s']:>9.4f}s {rate:>12} {baseline_s:>10} {ratio:>7}  "
+              f"{row.get('status', '')}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if any(row['status'] == 'regression' for row in comparison.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
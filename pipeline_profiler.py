@@ -0,0 +1,191 @@
+"""
+Per-document profiling for the extraction pipeline
+Wall/CPU timers per stage with optional cProfile and tracemalloc, reported as JSON per document
+"""
+
+import argparse
+import contextlib
+import cProfile
+import hashlib
+import io
+import json
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional
+
+# Document ids used as report file names as they are; anything else (e.g. '../x', '/tmp/x') is hashed
+SAFE_DOC_ID = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$')
+
+
+def report_filename(doc_id: str) -> str:
+    """File name of a document's report, never a path outside the report directory"""
+    if SAFE_DOC_ID.match(doc_id):
+        return f"{doc_id}.json"
+    return f"{hashlib.sha256(doc_id.encode('utf-8')).hexdigest()[:32]}.json"
+
+
+class DocumentProfiler:
+    """
+    Collects a profiling report for one document.
+    Wrap each pipeline stage in `with profiler.stage('name'):` to record its wall and CPU time;
+    with cprofile=True the stages also run under one cProfile profiler (top functions in the report),
+    and with memory=True tracemalloc records the peak allocation of every stage. A disabled profiler
+    makes stage() a no-op, so call sites do not need to branch.
+    Note:
+        tracemalloc is process-wide, so peak memory of concurrent requests in a threaded server overlaps.
+    """
+
+    def __init__(self, doc_id: str, enabled: bool = True, cprofile: bool = False, memory: bool = False,
+                 top_n: int = 15):
+        self.doc_id = doc_id
+        self.enabled = enabled
+        self.top_n = top_n
+        self.stages: List[Dict[str, Any]] = []
+        self.sizes: Dict[str, int] = {}
+        self._profile = cProfile.Profile() if enabled and cprofile else None
+        self._memory = enabled and memory
+        self._started_tracing = False
+        self._peak_bytes = 0
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time one stage (stages are not meant to be nested)"""
+        if not self.enabled:
+            yield
+            return
+        if self._memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        if self._profile is not None:
+            self._profile.enable()
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            entry = {'stage': name, 'wall_s': time.perf_counter() - wall, 'cpu_s': time.thread_time() - cpu}
+            if self._profile is not None:
+                self._profile.disable()
+            if self._memory:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                entry['peak_mb'] = round(peak / 2**20, 3)
+                self._peak_bytes = max(self._peak_bytes, peak)
+            self.stages.append(entry)
+
+    def record_size(self, name: str, value: Any):
+        """Record the size of an input or output (len() of strings/lists, or a number as given)"""
+        if self.enabled:
+            self.sizes[name] = value if isinstance(value, int) else len(value)
+
+    def _top_functions(self) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({'function': f"{os.path.basename(filename)}:{line}({function})", 'calls': calls,
+                         'tottime_s': round(tottime, 6), 'cumtime_s': round(cumtime, 6)})
+        rows.sort(key=lambda row: row['cumtime_s'], reverse=True)
+        return rows[:self.top_n]
+
+    def report(self) -> Dict[str, Any]:
+        """Per-document report: stage timings, sizes and, if enabled, top functions and peak memory"""
+        report = {
+            'doc_id': self.doc_id,
+            'total_wall_s': sum(s['wall_s'] for s in self.stages),
+            'total_cpu_s': sum(s['cpu_s'] for s in self.stages),
+            'stages': self.stages,
+            'sizes': self.sizes,
+        }
+        if self._profile is not None:
+            report['top_functions'] = self._top_functions()
+        if self._memory:
+            report['peak_memory_mb'] = round(self._peak_bytes / 2**20, 3)
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        return report
+
+    def save(self, directory: str, report: Optional[Dict[str, Any]] = None) -> str:
+        """Write the report (or an already built one) to <directory>/<report_filename(doc_id)> and return the path"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, report_filename(self.doc_id))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report if report is not None else self.report(), f, indent=2)
+        return path
+
+
+def parse_document(path: str) -> str:
+    """Extract text with the data_ingestion parser matching the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        from data_ingestion.pdf_parser import parse_pdf
+        return parse_pdf(path)
+    if extension in ('.html', '.htm', '.xml', '.xhtml'):
+        from data_ingestion.html_parser import parse_html
+        return parse_html(path)
+    if extension in ('.xls', '.xlsx', '.csv'):
+        from data_ingestion.excel_parser import parse_excel
+        return '\n'.join(' '.join(str(v) for v in row.values()) for row in parse_excel(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def profile_document(path: str, extractor_type: str = 'standard', cprofile: bool = False,
+                     memory: bool = False, top_n: int = 15) -> Dict[str, Any]:
+    """
+    Run one document through parse -> prompt -> model -> validation -> QA and profile every stage.
+    The model call goes through robust_ai_generation, so LLM_CASSETTE replay works here too.
+    Returns:
+        dict: DocumentProfiler report; sizes hold text/prompt/response characters and the KPI count.
+    """
+    import gemini_flask_api as api
+    from qa.qa_checks import run_qa_checks
+    from validation_utils import enhance_kpi_with_validation, generate_extraction_metadata
+
+    profiler = DocumentProfiler(os.path.basename(path), cprofile=cprofile, memory=memory, top_n=top_n)
+    with profiler.stage('parse'):
+        text = parse_document(path)
+    profiler.record_size('text_chars', text)
+    with profiler.stage('prompt'):
+        prompt = api.build_prompt(text, extractor_type)
+    profiler.record_size('prompt_chars', prompt)
+    with profiler.stage('model'):
+        result_text = api.robust_ai_generation(prompt)
+    profiler.record_size('response_chars', result_text)
+    with profiler.stage('validation'):
+        data = json.loads(api.strip_markdown_fences(result_text))
+        kpis = [enhance_kpi_with_validation(kpi) for values in data.values() if isinstance(values, list)
+                for kpi in values if isinstance(kpi, dict)]
+        generate_extraction_metadata(kpis)
+    profiler.record_size('kpis', kpis)
+    with profiler.stage('qa'):
+        run_qa_checks(kpis)
+    return profiler.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='+', help="Report files (PDF, HTML, XLSX/CSV or text)")
+    parser.add_argument('--extractor-type', default='standard')
+    parser.add_argument('--cprofile', action='store_true', help="Collect top functions with cProfile")
+    parser.add_argument('--memory', action='store_true', help="Track peak memory with tracemalloc")
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--output-dir', default='profiles')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        report = profile_document(path, args.extractor_type, args.cprofile, args.memory, args.top)
+        out_path = os.path.join(args.output_dir, report_filename(report['doc_id']))
+        os.makedirs(args.output_dir, exist_ok=True)
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        stages = ', '.join(f"{s['stage']} {s['wall_s']:.3f}s" for s in report['stages'])
+        print(f"{report['doc_id']}: {report['total_wall_s']:.3f}s ({stages}) -> {out_path}")
+
+
+if __name__ == '__main__':
+    main()
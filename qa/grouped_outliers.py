@@ -0,0 +1,117 @@
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from kpi_table import KpiTable, parse_numeric_value
+from validation_utils import normalize_unit
+
+BASELINE_COLUMNS = ['group_size', 'median', 'mad', 'q1', 'q3', 'lower_fence', 'upper_fence', 'robust_z']
+
+def _name_keys(names: pd.Categorical) -> np.ndarray:
+    """Integer key per row for the lower-cased metric name, lower-casing each distinct name only once"""
+    ids, _ = pd.factorize(pd.Index([str(name).lower() for name in names.categories] + [''], dtype=object))
+    return ids[np.where(names.codes >= 0, names.codes, len(names.categories))]
+
+def _canonical_units(units: pd.Categorical):
+    """Integer key, canonical label and conversion factor per row, normalizing each distinct unit only once"""
+    normalized = [normalize_unit(str(unit)) for unit in units.categories] + [('', 1.0)]
+    ids, _ = pd.factorize(pd.Index([canonical for canonical, _ in normalized], dtype=object))
+    labels = np.array([canonical for canonical, _ in normalized], dtype=object)
+    factors = np.array([factor for _, factor in normalized], dtype=np.float64)
+    codes = np.where(units.codes >= 0, units.codes, len(units.categories))
+    return ids[codes], labels[codes], factors[codes]
+
+def _numeric_values(values: pd.Series) -> np.ndarray:
+    """Float per row; strings such as '95,000 tCO2e' or '12%' are parsed like KpiTable does, each distinct one once"""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+    codes, uniques = pd.factorize(values.astype(object))
+    parsed = [parse_numeric_value(value) for value in uniques]
+    table = np.array([np.nan if value is None else value for value in parsed] + [np.nan], dtype=np.float64)
+    return table[np.where(codes >= 0, codes, len(uniques))]
+
+def _to_frame(metrics: Union[List[Dict[str, Any]], KpiTable, pd.DataFrame],
+              industry: Optional[Union[str, Sequence[Any]]]) -> pd.DataFrame:
+    """Columns name / metric_type / value (+ industry) for any supported input"""
+    if isinstance(metrics, pd.DataFrame):
+        frame = pd.DataFrame({
+            'name': metrics['name'].astype('category'),
+            'metric_type': metrics['metric_type'].astype('category'),
+            'value': _numeric_values(metrics['value']),
+        })
+        if isinstance(industry, str):
+            frame['industry'] = metrics[industry].to_numpy()
+    else:
+        table = metrics if isinstance(metrics, KpiTable) else KpiTable.from_records(metrics)
+        frame = table.to_dataframe()[['name', 'metric_type', 'value']]
+        if isinstance(industry, str):
+            frame['industry'] = table.extra(industry)
+    if industry is not None and not isinstance(industry, str):
+        frame['industry'] = list(industry)
+    return frame
+
+def detect_grouped_outliers(metrics: Union[List[Dict[str, Any]], KpiTable, pd.DataFrame],
+                            industry: Optional[Union[str, Sequence[Any]]] = None,
+                            method: str = 'mad', threshold: float = 3.5, iqr_factor: float = 1.5,
+                            min_group_size: int = 4) -> pd.DataFrame:
+    """
+    Detect outliers within groups of comparable metrics using robust statistics.
+    Metrics are grouped by (lower-cased name, canonical unit[, industry]) and values are converted
+    to the canonical unit first, so '95,000 tCO2e' and '95,000,000 kgCO2e' land in the same group.
+    Args:
+        metrics (List[Dict] | KpiTable | DataFrame): Metrics with name, value and metric_type.
+        industry (str | Sequence, optional): Key/column holding the industry, or one industry per row.
+        method (str): 'mad' (robust z-score), 'iqr' (Tukey fences) or 'both' (flagged by either).
+        threshold (float): Robust z-score threshold for the MAD method.
+        iqr_factor (float): Fence multiplier for the IQR method.
+        min_group_size (int): Groups smaller than this are not tested.
+    Returns:
+        DataFrame: One row per flagged metric, indexed by its position in `metrics`, with the
+        canonical value and the group baseline (size, median, MAD, quartiles, fences, robust z).
+        Metrics without a parseable number are never flagged.
+    """
+    if method not in ('mad', 'iqr', 'both'):
+        raise ValueError("method must be 'mad', 'iqr' or 'both'")
+    frame = _to_frame(metrics, industry)
+    unit_key, unit, factor = _canonical_units(frame['metric_type'].array)
+    keys = pd.DataFrame({'name': _name_keys(frame['name'].array), 'unit': unit_key})
+    if 'industry' in frame:
+        keys['industry'] = pd.factorize(frame['industry'])[0]
+    position = np.flatnonzero(~np.isnan(frame['value'].to_numpy()))
+    values = pd.Series(frame['value'].to_numpy(dtype=np.float64)[position] * factor[position])
+
+    group_id = keys.iloc[position].groupby(list(keys.columns), sort=False).ngroup().to_numpy()
+    by_group = values.groupby(group_id)
+    size = by_group.size().to_numpy()[group_id]
+    median = by_group.median().to_numpy()[group_id]
+    abs_dev = (values - median).abs().groupby(group_id)
+    mad = abs_dev.median().to_numpy()[group_id]
+    mean_abs_dev = abs_dev.mean().to_numpy()[group_id]
+    q1 = by_group.quantile(0.25).to_numpy()[group_id]
+    q3 = by_group.quantile(0.75).to_numpy()[group_id]
+    values = values.to_numpy()
+
+    # 1.4826 * MAD estimates the standard deviation; fall back to the mean absolute deviation
+    # when more than half of a group shares one value and the MAD collapses to zero
+    scale = np.where(mad > 0, 1.4826 * mad, 1.2533 * mean_abs_dev)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        robust_z = np.where(scale > 0, (values - median) / scale, 0.0)
+    lower = q1 - iqr_factor * (q3 - q1)
+    upper = q3 + iqr_factor * (q3 - q1)
+
+    flag_mad = np.abs(robust_z) > threshold
+    flag_iqr = (values < lower) | (values > upper)
+    flagged = {'mad': flag_mad, 'iqr': flag_iqr, 'both': flag_mad | flag_iqr}[method] & (size >= min_group_size)
+
+    rows = position[flagged]
+    result = pd.DataFrame({
+        'name': np.asarray(frame['name'].array.take(rows), dtype=object),
+        'unit': unit[rows],
+        'value': values[flagged],
+    }, index=rows)
+    if 'industry' in frame:
+        result['industry'] = frame['industry'].to_numpy()[rows]
+    for column, array in zip(BASELINE_COLUMNS, (size, median, mad, q1, q3, lower, upper, robust_z)):
+        result[column] = array[flagged]
+    return result
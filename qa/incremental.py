@@ -0,0 +1,248 @@
+import json
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from kpi_table import parse_numeric_value
+from validation_utils import normalize_unit
+
+STATE_VERSION = 1
+
+class WelfordAccumulator:
+    """Running count, mean and variance updated in O(1) per value (Welford's algorithm)"""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Population variance (matches numpy.std used by detect_outliers)"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WelfordAccumulator':
+        return cls(data['count'], data['mean'], data['m2'])
+
+class P2Quantile:
+    """
+    Streaming estimate of one quantile in constant memory (the P-square algorithm of Jain & Chlamtac).
+    Keeps five markers whose heights are adjusted with a piecewise-parabolic fit on every update.
+    """
+
+    __slots__ = ('p', 'heights', 'positions', 'desired')
+
+    def __init__(self, p: float):
+        self.p = p
+        self.heights: List[float] = []
+        self.positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = [1.0, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.0]
+
+    def update(self, x: float):
+        h = self.heights
+        if len(h) < 5:
+            h.append(x)
+            h.sort()
+            return
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(1, 5) if x < h[i]) - 1
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        p = self.p
+        for i, increment in enumerate((0.0, p / 2, p, (1 + p) / 2, 1.0)):
+            self.desired[i] += increment
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1.0 if d > 0 else -1.0
+                candidate = h[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not h[i - 1] < candidate < h[i + 1]:
+                    j = i + int(d)
+                    candidate = h[i] + d * (h[j] - h[i]) / (n[j] - n[i])
+                h[i] = candidate
+                n[i] += d
+
+    def value(self) -> Optional[float]:
+        h = self.heights
+        if not h:
+            return None
+        if len(h) < 5 or self.positions[4] == 5.0:
+            return h[min(len(h) - 1, int(round(self.p * (len(h) - 1))))]
+        return h[2]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'p': self.p, 'heights': self.heights, 'positions': self.positions, 'desired': self.desired}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'P2Quantile':
+        sketch = cls(data['p'])
+        sketch.heights = list(data['heights'])
+        sketch.positions = list(data['positions'])
+        sketch.desired = list(data['desired'])
+        return sketch
+
+class GroupStats:
+    """Welford moments plus quantile sketches for one (scope, metric, unit) group"""
+
+    __slots__ = ('moments', 'quantiles')
+
+    def __init__(self, quantiles: Sequence[float] = (0.25, 0.5, 0.75)):
+        self.moments = WelfordAccumulator()
+        self.quantiles = {q: P2Quantile(q) for q in quantiles}
+
+    def update(self, x: float):
+        self.moments.update(x)
+        for sketch in self.quantiles.values():
+            sketch.update(x)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'moments': self.moments.to_dict(), 'quantiles': [s.to_dict() for s in self.quantiles.values()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'GroupStats':
+        stats = cls(())
+        stats.moments = WelfordAccumulator.from_dict(data['moments'])
+        stats.quantiles = {q['p']: P2Quantile.from_dict(q) for q in data['quantiles']}
+        return stats
+
+class QAStateStore:
+    """
+    Incremental QA statistics per (scope, metric, canonical unit), where scope is a company or
+    industry identifier such as 'company:acme' or 'industry:banking'.
+    New KPIs are scored against the stored state in O(1) and then folded into it, so ingestion-time
+    QA never rescans history. The state is persisted as a JSON file between runs.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = 2.5, min_count: int = 5,
+                 quantiles: Sequence[float] = (0.25, 0.5, 0.75)):
+        self.path = path
+        self.threshold = threshold
+        self.min_count = min_count
+        self.quantiles = tuple(quantiles)
+        self.groups: Dict[Tuple[str, str, str], GroupStats] = {}
+
+    @staticmethod
+    def _observation(kpi: Dict[str, Any]) -> Optional[Tuple[str, str, float]]:
+        """(metric, canonical unit, value in canonical unit), or None if the KPI has no number"""
+        value = parse_numeric_value(kpi.get('value'))
+        if value is None or math.isnan(value):
+            return None
+        unit, factor = normalize_unit(kpi.get('metric_type', ''))
+        return (kpi.get('name') or '').lower(), unit, value * factor
+
+    def score(self, kpi: Dict[str, Any], scope: str) -> Dict[str, Any]:
+        """
+        Score a KPI against the current state of its group without updating it.
+        Returns:
+            dict: count, mean, std, z_score, quantiles, is_outlier (z-score beyond threshold)
+            and outside_iqr (beyond the 1.5 * IQR fences of the quantile sketches).
+        """
+        result = {'scope': scope, 'count': 0, 'mean': None, 'std': None, 'z_score': None,
+                  'quantiles': {}, 'is_outlier': False, 'outside_iqr': False}
+        observation = self._observation(kpi)
+        if observation is None:
+            result['note'] = 'No numeric value'
+            return result
+        metric, unit, value = observation
+        stats = self.groups.get((scope, metric, unit))
+        if stats is None:
+            result['note'] = 'No history for this metric'
+            return result
+        moments = stats.moments
+        result.update(count=moments.count, mean=moments.mean, std=moments.std,
+                      quantiles={q: s.value() for q, s in stats.quantiles.items()})
+        if moments.count < self.min_count:
+            result['note'] = 'Not enough history'
+            return result
+        if moments.std > 0:
+            result['z_score'] = (value - moments.mean) / moments.std
+            result['is_outlier'] = abs(result['z_score']) > self.threshold
+        q1, q3 = result['quantiles'].get(0.25), result['quantiles'].get(0.75)
+        if q1 is not None and q3 is not None:
+            result['outside_iqr'] = not (q1 - 1.5 * (q3 - q1) <= value <= q3 + 1.5 * (q3 - q1))
+        return result
+
+    def update(self, kpi: Dict[str, Any], scope: str) -> bool:
+        """Fold a KPI into its group's state; returns False if the KPI has no number"""
+        observation = self._observation(kpi)
+        if observation is None:
+            return False
+        metric, unit, value = observation
+        key = (scope, metric, unit)
+        stats = self.groups.get(key)
+        if stats is None:
+            stats = self.groups[key] = GroupStats(self.quantiles)
+        stats.update(value)
+        return True
+
+    def ingest(self, kpis: Iterable[Dict[str, Any]], scopes: Sequence[str]) -> List[Dict[str, Dict[str, Any]]]:
+        """
+        Score each KPI against every scope (e.g. its company and its industry), then update the state.
+        Returns:
+            List[dict]: Per KPI, a mapping of scope to its score() result.
+        """
+        results = []
+        for kpi in kpis:
+            results.append({scope: self.score(kpi, scope) for scope in scopes})
+            for scope in scopes:
+                self.update(kpi, scope)
+        return results
+
+    def save(self, path: Optional[str] = None):
+        """Write the state atomically (temp file + rename) so an interrupted run never corrupts it"""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for the QA state store")
+        payload = {
+            'version': STATE_VERSION,
+            'quantiles': list(self.quantiles),
+            'groups': [
+                {'scope': scope, 'metric': metric, 'unit': unit, **stats.to_dict()}
+                for (scope, metric, unit), stats in self.groups.items()
+            ]
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'QAStateStore':
+        """Load a saved state, or start an empty one if the file does not exist yet"""
+        store = cls(path, **kwargs)
+        if not os.path.exists(path):
+            return store
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported QA state version: {payload.get('version')}")
+        store.quantiles = tuple(payload['quantiles'])
+        for group in payload['groups']:
+            store.groups[(group['scope'], group['metric'], group['unit'])] = GroupStats.from_dict(group)
+        return store
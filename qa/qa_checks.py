@@ -1,67 +1,137 @@
-from typing import List, Dict, Any
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Union
 import numpy as np
 
-def detect_outliers(metrics: List[Dict[str, Any]], key: str = 'value', threshold: float = 2.5) -> List[int]:
+from kpi_table import KpiTable, MISSING, STRING_FIELDS
+
+Metrics = Union[List[Dict[str, Any]], KpiTable]
+
+def _mode_and_mismatches(keys: np.ndarray, decode: Optional[Callable[[int], Any]] = None):
+    """
+    Most common integer key and the positions whose key differs from it. A tie is broken as
+    _most_common breaks it on the decoded items, so the result matches the list path.
+    """
+    if not len(keys):
+        return None, []
+    uniques, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    tied = uniques[counts == counts.max()]
+    if len(tied) == 1:
+        mode = int(tied[0])
+    else:
+        decode = decode or (lambda key: key)
+        items = [decode(key) for key in keys.tolist()]
+        mode = int(tied[[decode(int(key)) for key in tied].index(_most_common(items))])
+    return mode, np.flatnonzero(keys != mode).tolist()
+
+def _mismatch_with_mode(keys: np.ndarray, decode: Optional[Callable[[int], Any]] = None) -> List[int]:
+    """Positions whose integer key differs from the most common key"""
+    return _mode_and_mismatches(keys, decode)[1]
+
+def _most_common(items: List[Any]) -> Any:
+    """
+    Most frequent item in one hashed pass. Ties are broken exactly as max(set(items), key=items.count)
+    breaks them, i.e. by the set's iteration order.
+    """
+    counts = Counter(items)
+    return max(set(items), key=counts.__getitem__)
+
+def _unit_decoder(metrics: KpiTable) -> Callable[[int], str]:
+    """Lower-cased unit of a casefold code, '' when missing (as m.get(unit_key, '').lower())"""
+    vocab = metrics.vocab
+    return lambda code: vocab[code].lower() if code != MISSING else ''
+
+def _as_float(value: Any) -> float:
+    """float(value), or 0 when it is not a plain number (e.g. '95,000 t')"""
+    try:
+        return float(value)
+    except Exception:
+        return 0
+
+def _list_mode_and_mismatches(items: List[Any]):
+    """Most common item and the positions whose item differs from it"""
+    if not items:
+        return None, []
+    most_common = _most_common(items)
+    return most_common, [i for i, item in enumerate(items) if item != most_common]
+
+def _year_mode_and_mismatches(metrics: KpiTable, year_key: str):
+    """
+    Most common year of a table and the positions, among rows with a year, whose year differs from it.
+    The int column is used unless some year is not an int ('2023' and 2023 differ in a list of dicts).
+    """
+    if year_key == 'year' and not metrics.has_extra('year'):
+        years = metrics.column('year')
+        return _mode_and_mismatches(years[(years != MISSING) & (years != 0)])
+    return _list_mode_and_mismatches([year for year in metrics.raw(year_key) if year])
+
+def detect_outliers(metrics: Metrics, key: str = 'value', threshold: float = 2.5) -> List[int]:
     """
     Detect outliers in a list of metrics using z-score method.
     Args:
-        metrics (List[Dict]): List of metric dicts.
+        metrics (List[Dict] | KpiTable): List of metric dicts or a KpiTable.
         key (str): Key to check for outliers (default: 'value').
         threshold (float): Z-score threshold for outlier detection.
     Returns:
         List[int]: Indices of outlier metrics.
+    Note:
+        A value that float() cannot convert (e.g. '95,000 t') counts as 0, for a KpiTable as well.
     """
-    values = []
-    for m in metrics:
-        try:
-            values.append(float(m.get(key, 0)))
-        except Exception:
-            values.append(0)
+    if isinstance(metrics, KpiTable):
+        values = [_as_float(value) for value in metrics.raw(key)]
+    else:
+        values = [_as_float(m.get(key, 0)) for m in metrics]
     if not values:
         return []
     z_scores = np.abs((values - np.mean(values)) / (np.std(values) if np.std(values) else 1))
     return [i for i, z in enumerate(z_scores) if z > threshold]
 
-def check_unit_consistency(metrics: List[Dict[str, Any]], unit_key: str = 'metric_type') -> List[int]:
+def check_unit_consistency(metrics: Metrics, unit_key: str = 'metric_type') -> List[int]:
     """
     Check for inconsistent units in a list of metrics.
     Args:
-        metrics (List[Dict]): List of metric dicts.
+        metrics (List[Dict] | KpiTable): List of metric dicts or a KpiTable.
         unit_key (str): Key for unit type.
     Returns:
         List[int]: Indices of metrics with inconsistent units.
     """
+    if isinstance(metrics, KpiTable) and unit_key in STRING_FIELDS:
+        return _mismatch_with_mode(metrics.casefold_codes(unit_key), _unit_decoder(metrics))
     units = [m.get(unit_key, '').lower() for m in metrics]
     if not units:
         return []
-    most_common = max(set(units), key=units.count)
+    most_common = _most_common(units)
     return [i for i, u in enumerate(units) if u != most_common]
 
-def check_year_consistency(metrics: List[Dict[str, Any]], year_key: str = 'year') -> List[int]:
+def check_year_consistency(metrics: Metrics, year_key: str = 'year') -> List[int]:
     """
     Check for inconsistent years in a list of metrics.
     Args:
-        metrics (List[Dict]): List of metric dicts.
+        metrics (List[Dict] | KpiTable): List of metric dicts or a KpiTable.
         year_key (str): Key for year.
     Returns:
         List[int]: Indices of metrics with inconsistent years.
     """
+    if isinstance(metrics, KpiTable):
+        return _year_mode_and_mismatches(metrics, year_key)[1]
     years = [m.get(year_key) for m in metrics if m.get(year_key)]
     if not years:
         return []
-    most_common = max(set(years), key=years.count)
+    most_common = _most_common(years)
     return [i for i, y in enumerate(years) if y != most_common]
 
-def detect_duplicates(metrics: List[Dict[str, Any]], name_key: str = 'name', year_key: str = 'year') -> List[int]:
+def detect_duplicates(metrics: Metrics, name_key: str = 'name', year_key: str = 'year') -> List[int]:
     """
     Detect duplicate metrics by name and year.
     Args:
-        metrics (List[Dict]): List of metric dicts.
+        metrics (List[Dict] | KpiTable): List of metric dicts or a KpiTable.
         name_key (str): Key for metric name.
         year_key (str): Key for year.
     Returns:
         List[int]: Indices of duplicate metrics.
     """
+    if (isinstance(metrics, KpiTable) and name_key in STRING_FIELDS and year_key == 'year'
+            and not metrics.has_extra('year')):
+        return metrics.duplicate_rows(name_key).tolist()
     seen = set()
     duplicates = []
     for i, m in enumerate(metrics):
@@ -71,3 +141,76 @@ def detect_duplicates(metrics: List[Dict[str, Any]], name_key: str = 'name', yea
         else:
             seen.add(key)
     return duplicates
+
+def run_qa_checks(metrics: Metrics, value_key: str = 'value', unit_key: str = 'metric_type',
+                  year_key: str = 'year', name_key: str = 'name', threshold: float = 2.5) -> Dict[str, Any]:
+    """
+    Run outlier, unit, year and duplicate checks in a single pass over the metrics.
+    Args:
+        metrics (List[Dict] | KpiTable): List of metric dicts or a KpiTable.
+        value_key (str): Key checked for outliers.
+        unit_key (str): Key for unit type.
+        year_key (str): Key for year.
+        name_key (str): Key for metric name.
+        threshold (float): Z-score threshold for outlier detection.
+    Returns:
+        dict: Report with the indices flagged by each check ('outliers', 'unit_inconsistencies',
+        'year_inconsistencies', 'duplicates'), the most common unit and year, and the metric count.
+        Each index list equals the result of the corresponding single check; like
+        check_year_consistency, year indices count only metrics that have a year.
+    """
+    if isinstance(metrics, KpiTable) and unit_key in STRING_FIELDS and year_key == 'year':
+        # Columns are already typed, so each check is a vectorized pass over one array
+        decode_unit = _unit_decoder(metrics)
+        unit_code, unit_inconsistencies = _mode_and_mismatches(metrics.casefold_codes(unit_key), decode_unit)
+        most_common_year, year_inconsistencies = _year_mode_and_mismatches(metrics, year_key)
+        most_common_unit = decode_unit(unit_code) if unit_code is not None else None
+        return {
+            'total_metrics': len(metrics),
+            'outliers': detect_outliers(metrics, value_key, threshold),
+            'unit_inconsistencies': unit_inconsistencies,
+            'year_inconsistencies': year_inconsistencies,
+            'duplicates': detect_duplicates(metrics, name_key, year_key),
+            'most_common_unit': most_common_unit,
+            'most_common_year': most_common_year
+        }
+
+    values = []
+    units = []
+    years = []
+    seen = set()
+    duplicates = []
+    for i, m in enumerate(metrics):
+        get = m.get
+        values.append(_as_float(get(value_key, 0)))
+        units.append(get(unit_key, '').lower())
+        year = get(year_key)
+        if year:
+            years.append(year)
+        key = (get(name_key, '').lower(), year)
+        if key in seen:
+            duplicates.append(i)
+        else:
+            seen.add(key)
+
+    report: Dict[str, Any] = {
+        'total_metrics': len(values),
+        'outliers': [],
+        'unit_inconsistencies': [],
+        'year_inconsistencies': [],
+        'duplicates': duplicates,
+        'most_common_unit': None,
+        'most_common_year': None
+    }
+    if values:
+        array = np.asarray(values, dtype=np.float64)
+        std = np.std(array)
+        report['outliers'] = np.flatnonzero(np.abs((array - np.mean(array)) / (std if std else 1)) > threshold).tolist()
+        most_common_unit = _most_common(units)
+        report['most_common_unit'] = most_common_unit
+        report['unit_inconsistencies'] = [i for i, u in enumerate(units) if u != most_common_unit]
+    if years:
+        most_common_year = _most_common(years)
+        report['most_common_year'] = most_common_year
+        report['year_inconsistencies'] = [i for i, y in enumerate(years) if y != most_common_year]
+    return report
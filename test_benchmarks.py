@@ -0,0 +1,91 @@
+"""
+Tests for industry benchmarking
+"""
+
+import math
+import random
+
+import pandas as pd
+
+from benchmarking.benchmark_store import BenchmarkStore
+from benchmarking.benchmarks import (
+    INDUSTRY_BENCHMARKS, compare_to_benchmark, compare_kpis_to_benchmark, compare_to_benchmark_bulk
+)
+
+
+def corpus(n=100, year=2023):
+    return [{"name": "Scope 1 Emissions", "value": f"{1_000 + 10 * i:,} tCO2e", "metric_type": "tCO2e",
+             "year": year} for i in range(n)]
+
+
+def test_store_percentiles_and_rank(tmp_path):
+    store = BenchmarkStore(str(tmp_path / "benchmarks.npz"))
+    assert store.add_kpis(corpus(), "banking") == 100
+    store.rebuild()
+    stats = store.lookup("banking", "scope 1 emissions", "tCO2e", 2023)
+    assert stats['count'] == 100 and stats['p50'] == 1_495.0 and stats['p0'] == 1_000.0
+    assert store.lookup("banking", "Scope 1 Emissions")['year'] is None  # all years pooled, unit inferred
+    assert store.percentile_rank("banking", "Scope 1 Emissions", 1_495.0, "tCO2e", 2023) == 50.0
+    assert store.percentile_rank("banking", "Scope 1 Emissions", 1_990_000, "kgCO2e") == 100.0
+    assert store.lookup("apparel", "Scope 1 Emissions") is None
+
+
+def test_store_incremental_rebuild_and_persistence(tmp_path):
+    path = str(tmp_path / "benchmarks.npz")
+    store = BenchmarkStore(path)
+    store.add_kpis(corpus(year=2022), "banking")
+    store.add_kpis(corpus(), "banking")
+    store.save()
+
+    reloaded = BenchmarkStore.load(path)
+    assert reloaded.lookup("banking", "Scope 1 Emissions", "tCO2e")['count'] == 200
+    reloaded.add_kpis(corpus(10, year=2024), "banking")
+    assert reloaded.rebuild() == 2  # only the 2024 group and the pooled group are recomputed
+    assert reloaded.lookup("banking", "Scope 1 Emissions", "tCO2e", 2024)['p100'] == 1_090.0
+    assert reloaded.lookup("banking", "Scope 1 Emissions", "tCO2e", 2022)['count'] == 100
+
+
+def test_compare_to_benchmark_with_store():
+    store = BenchmarkStore()
+    store.add_kpis(corpus(), "banking")
+    store.rebuild()
+    result = compare_to_benchmark("Scope 1 Emissions", 1_950.0, "banking", store, "tCO2e", 2023)
+    assert result['benchmark'] == 1_495.0 and result['is_outlier']
+    assert 90 < result['percentile_rank'] <= 100
+    # Without store coverage the static benchmarks apply
+    assert compare_to_benchmark("renewable_energy", 45, "banking", store)['percentile_rank'] is None
+    results = compare_kpis_to_benchmark(corpus(3), "banking", store=store)
+    assert [round(r['percentile_rank']) for r in results] == [0, 1, 2]
+
+
+def test_compare_to_benchmark_converts_to_the_store_unit():
+    store = BenchmarkStore()
+    store.add_kpis(corpus(), "banking")
+    store.rebuild()
+    in_kg = compare_to_benchmark("Scope 1 Emissions", 1_950_000.0, "banking", store, "kgCO2e", 2023)
+    in_t = compare_to_benchmark("Scope 1 Emissions", 1_950.0, "banking", store, "tCO2e", 2023)
+    assert in_kg['difference'] == in_t['difference'] == 455.0
+    assert in_kg['percentile_rank'] == in_t['percentile_rank'] and in_kg['is_outlier']
+
+
+def test_bulk_compare_matches_scalar():
+    rng = random.Random(3)
+    industries = list(INDUSTRY_BENCHMARKS) + ['mining']
+    metrics = sorted({m for b in INDUSTRY_BENCHMARKS.values() for m in b}) + ['unknown_metric']
+    frame = pd.DataFrame({
+        'industry': [rng.choice(industries) for _ in range(500)],
+        'metric_name': [rng.choice(metrics) for _ in range(500)],
+        'value': [rng.uniform(0, 800) for _ in range(500)],
+    })
+    frame.loc[7, 'value'] = float('nan')
+    bulk = compare_to_benchmark_bulk(frame)
+    for row, result in zip(frame.itertuples(), bulk.itertuples()):
+        expected = compare_to_benchmark(row.metric_name, row.value, row.industry)
+        assert result.note == expected['note'] and result.is_outlier == expected['is_outlier']
+        for key in ('benchmark', 'difference'):
+            got = getattr(result, key)
+            assert (expected[key] is None and math.isnan(got)) or got == expected[key] or \
+                (math.isnan(got) and math.isnan(expected[key]))
+    arrays = compare_to_benchmark_bulk(industry=frame['industry'].to_numpy(),
+                                       metric_name=frame['metric_name'].to_numpy(), value=frame['value'].to_numpy())
+    assert arrays['note'].tolist() == bulk['note'].tolist()
@@ -0,0 +1,120 @@
+"""
+Tests for the resumable bulk ingestion run
+"""
+
+import io
+import json
+import os
+import time
+
+import pytest
+
+from bulk_ingest import RESULTS_FILE, discover, ingest, load_results
+from perf.corpus import write_pdf
+
+LLM_SENTENCE = "Our supplier audits covered 37 sites in 2023."
+
+
+def audit_llm(text):
+    """Module-level stand-in for the LLM, so pool workers can unpickle it; logs each call's interval"""
+    started = time.time()
+    if "CRASH" in text:
+        os._exit(1)
+    time.sleep(0.05)
+    with open(os.environ['BULK_LLM_LOG'], 'a') as f:
+        f.write(f"{started} {time.time()}\n")
+    return [{'name': "Audited Sites", 'value': "37", 'metric_type': 'count', 'year': 2023,
+             'reference': LLM_SENTENCE, 'category': 'governance'}]
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    monkeypatch.setenv('BULK_LLM_LOG', str(tmp_path / "llm.log"))
+    root = tmp_path / "reports"
+    (root / "html").mkdir(parents=True)
+    write_pdf(str(root / "annual.pdf"), [["In 2023, our energy consumption was 4,800 MWh."]], tables={
+        0: [["Metric", "Unit", "2022", "2023"], ["Scope 1 emissions", "tCO2e", "12,345", "11,000"]]})
+    (root / "html" / "esg.html").write_text(
+        f"<html><body><p>In 2023, our water withdrawal was 120 m3.</p><p>{LLM_SENTENCE}</p></body></html>")
+    (root / "kpis.csv").write_text("Metric,Unit,2023\nEnergy consumption,MWh,5100\n")
+    (root / "broken.pdf").write_bytes(b"%PDF-1.4 this is not really a PDF")
+    (root / ".hidden.pdf").write_bytes(b"%PDF-1.4")
+    (root / "notes.docx").write_bytes(b"ignored extension")
+    return root
+
+
+def test_discover_skips_hidden_files_and_other_extensions(reports):
+    assert [os.path.relpath(path, reports) for path in discover([str(reports)])] == [
+        "annual.pdf", "broken.pdf", os.path.join("html", "esg.html"), "kpis.csv"]
+    (reports / "kpis.parquet").write_bytes(b"PAR1")
+    (reports / "scan.PNG").write_bytes(b"\x89PNG\r\n\x1a\n")
+    (reports / "esef.zip").write_bytes(b"PK\x03\x04")
+    assert {"esef.zip", "kpis.parquet", "scan.PNG"} <= {os.path.basename(path) for path in discover([str(reports)])}
+
+
+def test_ingest_isolates_failures_and_resumes(reports, tmp_path):
+    out = str(tmp_path / "out")
+    summary = ingest([str(reports)], out, workers=1, llm=audit_llm, progress=None)
+    assert (summary['discovered'], summary['processed'], summary['failed'], summary['skipped']) == (4, 4, 1, 0)
+    assert summary['failures'][0]['path'].endswith("broken.pdf") and summary['failures'][0]['stage'] == 'parse'
+    results = load_results(out)
+    pdf = results[str(reports / "annual.pdf")]
+    assert pdf['status'] == 'ok' and pdf['format'] == 'pdf' and set(pdf['stages']) == {
+        'parse', 'extract', 'validation', 'qa'}
+    assert sorted((k['name'], k['year'], k.get('page')) for k in pdf['kpis']) == [
+        ("Energy Consumption", 2023, None), ("Scope 1 Emissions", 2022, 1), ("Scope 1 Emissions", 2023, 1)]
+    html = results[str(reports / "html" / "esg.html")]
+    assert {k['extraction_method'] for k in html['kpis']} == {'rules', 'llm'}
+    assert html['coverage']['llm_calls'] == 1 and html['metadata']['total_metrics_found'] == 2
+    assert [k['value'] for k in results[str(reports / "kpis.csv")]['kpis']] == ["5100"]
+
+    # An interrupted run leaves a cut-off line: that document is processed again, finished ones are not
+    path = os.path.join(out, RESULTS_FILE)
+    with open(path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(path, 'wb') as f:
+        f.writelines(lines[:-1] + [lines[-1][:20]])
+    (reports / "late.txt").write_text("In 2023, our energy consumption was 900 MWh.")
+    summary = ingest([str(reports)], out, workers=1, llm=audit_llm, progress=None)
+    assert (summary['processed'], summary['skipped'], summary['failed']) == (2, 3, 0)
+    assert len(load_results(out)) == 5
+
+    summary = ingest([str(reports)], out, workers=1, llm=audit_llm, progress=None, retry_failed=True)
+    assert (summary['processed'], summary['failed']) == (1, 1)
+
+
+def test_process_pool_caps_llm_calls_and_survives_worker_crash(tmp_path, monkeypatch):
+    monkeypatch.setenv('BULK_LLM_LOG', str(tmp_path / "llm.log"))
+    root = tmp_path / "reports"
+    root.mkdir()
+    for i in range(6):
+        (root / f"r{i}.txt").write_text(f"{LLM_SENTENCE}\n\nPage {i}: 1{i} suppliers.")
+    (root / "crash.txt").write_text(f"CRASH {LLM_SENTENCE}")
+    progress = io.StringIO()
+    summary = ingest([str(root)], str(tmp_path / "out"), workers=2, llm=audit_llm, llm_concurrency=1,
+                     progress=progress, progress_interval=0)
+    assert (summary['processed'], summary['failed']) == (7, 1)
+    failure = summary['failures'][0]
+    assert failure['path'].endswith("crash.txt") and "BrokenProcessPool" in failure['error']
+    with open(tmp_path / "llm.log") as f:
+        calls = sorted(tuple(map(float, line.split())) for line in f)
+    assert len(calls) >= 6
+    assert all(end <= next_start + 1e-3 for (_, end), (next_start, _) in zip(calls, calls[1:]))
+    assert "[7/7]" in progress.getvalue() and "docs/s" in progress.getvalue()
+    with open(tmp_path / "out" / "summary.json") as f:
+        assert json.load(f)['processed'] == 7
+
+
+def test_recycled_workers_share_the_llm_cap(tmp_path, monkeypatch):
+    monkeypatch.setenv('BULK_LLM_LOG', str(tmp_path / "llm.log"))
+    root = tmp_path / "reports"
+    root.mkdir()
+    for i in range(4):
+        (root / f"r{i}.txt").write_text(f"{LLM_SENTENCE}\n\nPage {i}: 1{i} suppliers.")
+    summary = ingest([str(root)], str(tmp_path / "out"), workers=2, llm=audit_llm, llm_concurrency=1,
+                     max_tasks_per_child=1, progress=None)
+    assert (summary['processed'], summary['failed']) == (4, 0)
+    with open(tmp_path / "llm.log") as f:
+        calls = sorted(tuple(map(float, line.split())) for line in f)
+    assert len(calls) == 4
+    assert all(end <= next_start + 1e-3 for (_, end), (next_start, _) in zip(calls, calls[1:]))
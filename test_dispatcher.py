@@ -0,0 +1,133 @@
+"""
+Tests for format sniffing, the ingestion dispatcher and the normalized document model
+"""
+
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai_pipeline.rule_stage import extract_table_kpis, split_passages
+from data_ingestion.dispatcher import load_document, sniff_format
+from data_ingestion.document import DocumentBuilder
+from perf.corpus import write_pdf
+
+HTML = b"""<!DOCTYPE html><html><body><nav>Home</nav><h1>Climate</h1><p>Scope 1 emissions fell in 2023.</p>
+<table><tr><th>Metric</th><th>Unit</th><th>2023</th></tr><tr><td>Energy consumption</td><td>MWh</td><td>4,800</td></tr>
+</table><p>Outlook.</p></body></html>"""
+INLINE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"
+      xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:utr="http://www.xbrl.org/2009/utr"
+      xmlns:esrs="https://xbrl.efrag.org/taxonomy/esrs/2023-12-22"><body>
+<div style="display:none"><ix:header><ix:resources>
+  <xbrli:context id="c"><xbrli:entity><xbrli:identifier scheme="lei">LEI1</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:startDate>2023-01-01</xbrli:startDate><xbrli:endDate>2023-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+  <xbrli:unit id="t"><xbrli:measure>utr:tCO2e</xbrli:measure></xbrli:unit>
+</ix:resources></ix:header></div>
+<p>Scope 1: <ix:nonFraction name="esrs:GrossScope1GreenhouseGasEmissions" contextRef="c" unitRef="t" decimals="0">1200</ix:nonFraction> t</p>
+</body></html>"""
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_sniffing_ignores_misleading_extensions(tmp_path):
+    pdf = str(tmp_path / "report.html")
+    write_pdf(pdf, [["Hello"]])
+    xlsx = str(tmp_path / "data.xlsx")
+    pd.DataFrame({'a': [1]}).to_excel(xlsx, index=False)
+    xlsx = str((tmp_path / "data.xlsx").rename(tmp_path / "data.bin"))
+    assert sniff_format(pdf) == 'pdf'
+    assert sniff_format(xlsx) == 'xlsx' and load_document(xlsx).table_rows(0) == [["a"], ["1"]]
+    assert sniff_format(write(tmp_path / "a.txt", HTML)) == 'html'
+    assert sniff_format(write(tmp_path / "b.html", INLINE)) == 'ixbrl'
+    assert sniff_format(write(tmp_path / "c.xml", b'<?xml version="1.0"?><xbrli:xbrl xmlns:xbrli="x"/>')) == 'xbrl'
+    assert sniff_format(write(tmp_path / "d.xml", b'<?xml version="1.0"?><feed><item/></feed>')) == 'xml'
+    csv_data = b'\xef\xbb\xbfcompany,year,value\nA,2023,"1,200"\nB,2023,7\n'
+    assert sniff_format(write(tmp_path / "e.dat", csv_data)) == 'csv'
+    assert sniff_format(write(tmp_path / "f.csv", b"Our report, in short.\nNothing tabular here\n")) == 'text'
+    assert sniff_format(write(tmp_path / "g.png", b'\x89PNG\r\n\x1a\n\x00\x00')) == 'image'
+    assert sniff_format(write(tmp_path / "h", b'\x00\x01\x02binary')) == 'binary'
+    with pytest.raises(ValueError, match="Unsupported format 'binary'"):
+        load_document(str(tmp_path / "h"))
+
+
+def test_pdf_document_has_pages_blocks_and_kpi_tables(tmp_path):
+    path = str(tmp_path / "report.pdf")
+    write_pdf(path, [["Our ESG performance is summarised below."], []], tables={
+        0: [["Metric", "Unit", "2022", "2023"], ["Scope 1 emissions", "tCO2e", "12,345", "11,000"]]})
+    doc = load_document(path)
+    assert doc.format == 'pdf' and doc.page_number.tolist() == [1, 2] and doc.page_text(2) == ''
+    assert [doc.block_text(i) for i in range(len(doc))] == [
+        "Our ESG performance is summarised below.",
+        "Metric | Unit | 2022 | 2023\nScope 1 emissions | tCO2e | 12,345 | 11,000"]
+    assert doc.table_rows(0)[1] == ["Scope 1 emissions", "tCO2e", "12,345", "11,000"]
+    assert [k['value'] for k in extract_table_kpis(doc.table_rows(0))] == ["12,345", "11,000"]
+    location = doc.locate(doc.text.index("11,000"))
+    assert location['kind'] == 'table' and location['page'] == 1 and location['table'] == 0
+    assert location['bbox'] is not None and len(location['bbox']) == 4
+
+
+def test_html_and_inline_xbrl_documents(tmp_path):
+    doc = load_document(write(tmp_path / "page.htm", HTML))
+    assert split_passages(doc.text) == ["Climate", "Scope 1 emissions fell in 2023.",
+                                        "Metric | Unit | 2023\nEnergy consumption | MWh | 4,800", "Outlook."]
+    assert doc.block_kind.tolist() == [0, 0, 1, 0] and doc.table_block.tolist() == [2]
+    assert [i for i, _ in doc.iter_blocks(kind='table')] == [2]
+
+    ixbrl = load_document(write(tmp_path / "esef.xhtml", INLINE))
+    assert ixbrl.format == 'ixbrl' and ixbrl.meta['facts'] == 1
+    assert ixbrl.block_text(0) == "Scope 1: 1200 t"
+    assert ixbrl.table_rows(0)[1][:5] == ["esrs:GrossScope1GreenhouseGasEmissions", "2023-01-01", "2023-12-31", "1200",
+                                          "utr:tCO2e"]
+    assert ixbrl.locate(len(ixbrl.text) - 1)['locator'] == 'xbrl:facts'
+
+
+def test_report_package_loads_its_inline_xbrl_report(tmp_path):
+    package = str(tmp_path / "esef.zip")
+    with zipfile.ZipFile(package, 'w') as archive:
+        archive.writestr("lei-2023/META-INF/reportPackage.json", '{"documentInfo": {}}')
+        archive.writestr("lei-2023/reports/lei-2023.xhtml", INLINE)
+    doc = load_document(package)
+    assert sniff_format(package) == 'zip' and doc.format == 'zip'
+    assert doc.meta['package_report'] == "lei-2023/reports/lei-2023.xhtml" and doc.meta['facts'] == 1
+    assert doc.block_text(0) == "Scope 1: 1200 t" and doc.table_rows(0)[1][3] == "1200"
+
+    with zipfile.ZipFile(str(tmp_path / "other.zip"), 'w') as archive:
+        archive.writestr("notes.txt", "not a report package")
+    with pytest.raises(ValueError, match="not an XBRL report package"):
+        load_document(str(tmp_path / "other.zip"))
+
+
+def test_spreadsheets_become_tables_per_batch_and_sheet(tmp_path):
+    csv_path = write(tmp_path / "kpis.txt", b"company,year,value\n" + b"".join(
+        b"C%d,2023,%d\n" % (i, i) for i in range(25)))
+    doc = load_document(csv_path, batch_size=10)
+    assert doc.format == 'csv' and len(doc.table_block) == 3
+    assert doc.table_rows(2) == [["company", "year", "value"]] + [[f"C{i}", "2023", str(i)] for i in range(20, 25)]
+    assert doc.locate(doc.text.rindex("C24"))['locator'] == '22:26'
+
+    xlsx = str(tmp_path / "book.xlsx")
+    with pd.ExcelWriter(xlsx, engine='openpyxl') as writer:
+        pd.DataFrame({'metric': ['Water'], 'value': [5.5]}).to_excel(writer, sheet_name='Env', index=False)
+        pd.DataFrame({'metric': ['Employees'], 'value': [None]}).to_excel(writer, sheet_name='Social', index=False)
+    book = load_document(xlsx)
+    assert book.page_number.tolist() == [1, 2]
+    assert book.table_rows(1) == [["metric", "value"], ["Employees", ""]]
+    assert book.locate(book.text.index("Employees"))['locator'] == 'Social!2:2'
+
+
+def test_builder_packs_compact_columns():
+    builder = DocumentBuilder('memo.txt', 'text')
+    builder.add_text("First paragraph.\n\nSecond\nparagraph.", page=1)
+    builder.add_table([["a", None], ["a", 1]], page=3, locator='t1')
+    doc = builder.build()
+    assert doc.text == "First paragraph.\n\nSecond\nparagraph.\n\na | \na | 1"
+    assert doc.block_start.dtype == np.int64 and doc.cell_code.dtype == np.int32
+    assert doc.page_number.tolist() == [1, 3] and doc.block_page.tolist() == [1, 1, 3]
+    assert doc.strings == ['a', '', '1', 't1'] and doc.cell_code.tolist() == [0, 1, 0, 2]
+    assert doc.locate(0)['block'] == 0 and doc.locate(len(doc.text) - 1)['locator'] == 't1'
+    assert doc.nbytes > 0 and "blocks=3" in repr(doc)
@@ -0,0 +1,55 @@
+"""
+Tests for the streaming Excel/CSV reader and its Parquet conversion path
+"""
+
+import os
+import random
+
+import pandas as pd
+import pytest
+
+from data_ingestion.excel_parser import convert_to_parquet, iter_excel_batches, parse_excel
+from perf.corpus import write_kpi_csv
+
+
+@pytest.fixture
+def kpi_csv(tmp_path):
+    path = str(tmp_path / "dump.csv")
+    write_kpi_csv(path, random.Random(7), 1_000)
+    return path
+
+
+def test_csv_batches_respect_size_columns_and_dtypes(kpi_csv):
+    batches = list(iter_excel_batches(kpi_csv, batch_size=300, usecols=['metric', 'value'],
+                                      dtype={'metric': 'string', 'value': 'float64'}))
+    assert [len(b) for b in batches] == [300, 300, 300, 100]
+    assert list(batches[0].columns) == ['metric', 'value']
+    assert str(batches[0]['metric'].dtype) == 'string' and batches[-1]['value'].dtype == 'float64'
+
+
+def test_xlsx_batches_match_parse_excel(kpi_csv, tmp_path):
+    xlsx = str(tmp_path / "dump.xlsx")
+    pd.read_csv(kpi_csv, nrows=250).to_excel(xlsx, index=False)
+    batches = list(iter_excel_batches(xlsx, batch_size=100))
+    assert [len(b) for b in batches] == [100, 100, 50]
+    assert pd.concat(batches).to_dict(orient='records') == parse_excel(xlsx)
+
+
+def test_parquet_copy_serves_later_runs(kpi_csv, tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    converted = convert_to_parquet(kpi_csv, str(tmp_path / "dump.parquet"), dtype={'value': 'float64'})
+    assert pd.read_parquet(converted).to_dict(orient='records') == parse_excel(kpi_csv)
+
+    parquet_dir = str(tmp_path / "parquet")
+    dtype = {'value': 'float64'}
+    first = pd.concat(iter_excel_batches(kpi_csv, batch_size=400, dtype=dtype, parquet_dir=parquet_dir))
+    assert len(os.listdir(parquet_dir)) == 1
+
+    def no_csv(*args, **kwargs):
+        raise AssertionError("CSV was read again instead of the Parquet copy")
+    monkeypatch.setattr(pd, 'read_csv', no_csv)
+    second = list(iter_excel_batches(kpi_csv, batch_size=400, usecols=['company', 'value'], dtype=dtype,
+                                     parquet_dir=parquet_dir))
+    assert [len(b) for b in second] == [400, 400, 200] and list(second[0].columns) == ['company', 'value']
+    pd.testing.assert_frame_equal(pd.concat(second, ignore_index=True),
+                                  first[['company', 'value']].reset_index(drop=True))
@@ -0,0 +1,43 @@
+"""
+Tests for the lxml fast path of HTML text extraction and streaming XML text
+"""
+
+from ai_pipeline.rule_stage import extract_table_kpis
+from data_ingestion.html_parser import extract_html_tables, extract_html_text, iter_xml_text, parse_html
+
+PAGE = b"""<!DOCTYPE html><html><head><title>Report</title><style>p{color:red}</style>
+<script>var tracking = 1;</script></head><body>
+<nav><a href="/">Home</a><a href="/ir">Investors</a></nav>
+<div role="banner">Cookie settings</div>
+<main><h1>Sustainability</h1><p>In 2023 our emissions were <b>95,000</b> tCO<sub>2</sub>e.</p><!-- note -->
+<table><thead><tr><th>Metric</th><th>Unit</th><th>2022</th><th>2023</th></tr></thead>
+<tbody><tr><td>Energy consumption</td><td>MWh</td><td>5,100</td><td>4,800</td></tr>
+<tr><td colspan="2">Women on the board (%)</td><td>40</td><td>45</td></tr></tbody></table></main>
+<footer>Copyright 2024. Imprint.</footer></body></html>"""
+
+
+def test_fast_path_strips_boilerplate_and_keeps_table_rows():
+    assert extract_html_text(PAGE) == (
+        "Report\n\nSustainability\n\nIn 2023 our emissions were 95,000 tCO2e.\n\n"
+        "Metric | Unit | 2022 | 2023\nEnergy consumption | MWh | 5,100 | 4,800\nWomen on the board (%) |  | 40 | 45")
+    assert "Investors" in extract_html_text(PAGE, strip_boilerplate=False)
+
+
+def test_html_tables_feed_table_kpis(tmp_path):
+    path = tmp_path / "report.html"
+    path.write_bytes(PAGE)
+    tables = extract_html_tables(str(path))
+    assert tables == [[["Metric", "Unit", "2022", "2023"], ["Energy consumption", "MWh", "5,100", "4,800"],
+                       ["Women on the board (%)", "", "40", "45"]]]
+    assert [(k['name'], k['year'], k['value']) for k in extract_table_kpis(tables[0])][-1] == (
+        "Board Gender Diversity", 2023, "45%")
+    assert parse_html(str(path), fast=True) == extract_html_text(PAGE)
+
+
+def test_iter_xml_text_streams_elements(tmp_path):
+    path = tmp_path / "feed.xml"
+    items = "".join(f"<item><name>Site {i}</name><value> {i * 10} </value></item>" for i in range(1000))
+    path.write_text(f'<?xml version="1.0"?><feed xmlns="urn:esg">{items}</feed>', encoding='utf-8')
+    texts = list(iter_xml_text(str(path)))
+    assert len(texts) == 2000 and texts[:2] == [('name', 'Site 0'), ('value', '0')]
+    assert list(iter_xml_text(str(path), tags=['value']))[-1] == ('value', '9990')
@@ -0,0 +1,86 @@
+"""
+Tests for the cross-year KPI history index
+"""
+
+from kpi_history import KpiHistoryIndex
+from validation_utils import validate_temporal_consistency
+
+REPORT_2023 = [
+    {"name": "Total GHG Emissions", "value": "95,000", "metric_type": "metric tons of CO2 equivalent",
+     "year": 2023, "reference": "Our total greenhouse gas emissions were 95,000 metric tons of CO2 equivalent, "
+                                "representing a 15% reduction from our 2022 baseline of 112,000 metric tons."},
+    {"name": "Board Gender Diversity", "value": "45%", "metric_type": "percentage", "year": 2023,
+     "reference": "Our board of directors now includes 45% women, up from 30% in 2022."},
+    {"name": "Renewable Energy", "value": "40%", "metric_type": "percentage", "year": 2023},
+]
+
+HISTORY = {
+    2021: [{"name": "Total GHG Emissions", "value": "118,000 tCO2e", "metric_type": "tCO2e", "year": 2021},
+           {"name": "Board Gender Diversity", "value": "28%", "metric_type": "%", "year": 2021}],
+    2022: [{"name": "Total GHG Emissions", "value": "112,000,000", "metric_type": "kgCO2e", "year": 2022},
+           {"name": "Board Gender Diversity", "value": "30%", "metric_type": "%", "year": 2022},
+           {"name": "Renewable Energy", "value": "38%", "metric_type": "%", "year": 2022}],
+}
+
+
+def build_index():
+    index = KpiHistoryIndex()
+    for year, kpis in HISTORY.items():
+        index.add_report("acme", kpis, source=f"acme-{year}.pdf")
+    return index
+
+
+def test_year_over_year_jumps():
+    index = build_index()
+    jumps = index.check_year_over_year("acme", REPORT_2023, max_change=0.3)
+    assert [(j['name'], j['previous_year']) for j in jumps] == [("Board Gender Diversity", 2022)]
+    assert round(jumps[0]['change'], 2) == 0.5
+    assert index.check_year_over_year("other", REPORT_2023) == []
+
+
+def test_restatements():
+    index = build_index()
+    restated = [{"name": "total ghg emissions", "value": "110,000", "metric_type": "tCO2e", "year": 2022}]
+    result = index.detect_restatements("acme", restated + REPORT_2023)
+    assert len(result) == 1
+    assert result[0]['indexed_value'] == 112_000 and result[0]['indexed_source'] == "acme-2022.pdf"
+
+
+def test_base_year_claims():
+    claims = build_index().check_base_year_claims("acme", REPORT_2023)
+    assert len(claims) == 1
+    claim = claims[0]
+    assert claim['base_year'] == 2022 and claim['base_source'] == 'history'
+    assert claim['implied_value'] == 112_000 * 0.85 and claim['is_consistent']
+
+    # Without history the value stated in the claim itself is used
+    claim = KpiHistoryIndex().check_base_year_claims("acme", REPORT_2023)[0]
+    assert claim['base_source'] == 'claim' and claim['is_consistent']
+
+    wrong = [dict(REPORT_2023[0], value="105,000")]
+    assert build_index().check_base_year_claims("acme", wrong)[0]['is_consistent'] is False
+
+    # A percentage KPI states the reduction, not the emissions, so there is nothing to check
+    claim = "a 15% reduction from our 2022 baseline of 112,000 tCO2e"
+    reductions = [{"name": "GHG Reduction", "value": "15%", "metric_type": "%", "year": 2023, "reference": claim},
+                  {"name": "GHG Reduction", "value": "15%", "metric_type": "tCO2e", "year": 2023, "reference": claim}]
+    assert KpiHistoryIndex().check_base_year_claims("acme", reductions) == []
+    assert validate_temporal_consistency(reductions, company="acme", history=build_index()) == []
+
+    # A stated base is converted from its own unit, and ignored when it is in another unit than the KPI
+    ktonnes = [dict(REPORT_2023[0], reference="a 15% reduction from our 2022 baseline of 112 ktCO2e")]
+    assert KpiHistoryIndex().check_base_year_claims("acme", ktonnes)[0]['is_consistent']
+    energy = [{"name": "Energy", "value": "95,200", "metric_type": "MWh", "year": 2023, "reference": claim}]
+    assert KpiHistoryIndex().check_base_year_claims("acme", energy)[0]['is_consistent'] is None
+
+
+def test_persistence_and_temporal_warnings(tmp_path):
+    path = str(tmp_path / "history.json")
+    build_index().save(path)
+    index = KpiHistoryIndex.load(path)
+    assert len(index) == 5
+    assert index.get("acme", "Total GHG Emissions", 2022, unit="tCO2e")['value'] == 112_000
+    assert validate_temporal_consistency(REPORT_2023, company="acme", history=index) == []
+    wrong = [dict(REPORT_2023[0], value="105,000")]
+    assert validate_temporal_consistency(wrong, company="acme", history=index) == [
+        "Total GHG Emissions: claimed -15% vs 2022 is inconsistent with base value 112000"]
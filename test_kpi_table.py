@@ -0,0 +1,105 @@
+"""
+Tests for the columnar KPI table and the validation/QA/benchmark functions that accept it
+"""
+
+import numpy as np
+
+from kpi_table import KpiTable, parse_numeric_value
+from validation_utils import detect_duplicate_metrics, validate_temporal_consistency, generate_extraction_metadata
+from qa.qa_checks import (detect_outliers, check_unit_consistency, check_year_consistency, detect_duplicates,
+                          run_qa_checks)
+from benchmarking.benchmarks import compare_kpis_to_benchmark
+
+RESPONSE = {
+    "environmental": [
+        {"name": "Total GHG Emissions", "value": "95,000 metric tons", "metric_type": "metric tons",
+         "year": 2023, "reference": "Our total GHG emissions were 95,000 metric tons in 2023.",
+         "confidence_score": 95, "quality_flags": [], "validation_status": "valid"},
+        {"name": "total ghg emissions", "value": "112,000", "metric_type": "Metric Tons", "year": 2023,
+         "confidence_score": 80, "validation_status": "warning"},
+        {"name": "Renewable Energy", "value": 40, "metric_type": "percentage", "year": "2022"},
+    ],
+    "social": [],
+    "governance": [
+        {"name": "Board Gender Diversity", "value": "45%", "metric_type": "percentage", "year": None,
+         "confidence_score": 40.5, "validation_status": "error", "category": "board"},
+    ],
+    "extraction_metadata": {"total_metrics_found": 4},
+}
+
+
+def test_parse_numeric_value():
+    assert parse_numeric_value("95,000 metric tons of CO2 equivalent") == 95000.0
+    assert parse_numeric_value("8.5%") == 8.5
+    assert parse_numeric_value("1.2 million tCO2e") == 1.2e6
+    assert parse_numeric_value("significant") is None
+    assert parse_numeric_value(None) is None
+
+
+def test_round_trip_is_lossless():
+    table = KpiTable.from_response(RESPONSE)
+    assert len(table) == 4
+    assert table.to_response() == RESPONSE
+    records = RESPONSE["environmental"]
+    assert KpiTable.from_records(records).to_records() == records
+
+
+def test_columns_are_typed_read_only_views():
+    table = KpiTable.from_response(RESPONSE)
+    values = table.column('value')
+    assert values.dtype == np.float64 and not values.flags.writeable
+    assert values.tolist() == [95000.0, 112000.0, 40.0, 45.0]
+    assert table.column('year').tolist() == [2023, 2023, 2022, -1]
+    scores = table.column('confidence_score')
+    assert scores.dtype == np.float64 and scores[[0, 1, 3]].tolist() == [95.0, 80.0, 40.5] and np.isnan(scores[2])
+    assert table.strings('category') == ['environmental', 'environmental', 'environmental', 'governance']
+    assert table.vocab.count('percentage') == 1
+
+
+def test_concat_and_take():
+    first = KpiTable.from_records(RESPONSE["environmental"], category="environmental")
+    second = KpiTable.from_records(RESPONSE["governance"], category="governance")
+    merged = KpiTable.concat([first, second])
+    assert merged.to_records() == first.to_records() + second.to_records()
+    assert merged.take([3, 0]).to_records() == [second.record(0), first.record(0)]
+
+
+def test_functions_match_list_results():
+    records = [kpi for key in ("environmental", "governance") for kpi in RESPONSE[key]]
+    table = KpiTable.from_records(records)
+    assert check_unit_consistency(table) == check_unit_consistency(records)
+    assert detect_duplicates(table) == detect_duplicates(records) == [1]
+    assert check_year_consistency(table) == check_year_consistency(records) == [2]
+    assert detect_outliers(table, threshold=1.0) == detect_outliers(records, threshold=1.0) == [2]
+    assert detect_duplicate_metrics(table).to_records() == detect_duplicate_metrics(records)
+    assert validate_temporal_consistency(table) == validate_temporal_consistency(records)
+    metadata = generate_extraction_metadata(table)
+    assert metadata["validation_errors"] == 1 and metadata["warnings"] == 1
+    assert metadata == generate_extraction_metadata(records)
+    assert metadata["average_confidence"] == round((95 + 80 + 40.5) / 4, 1)
+
+
+def test_table_checks_keep_list_semantics_for_strings():
+    # float() cannot read '95,000 t', so the list path counts it as 0; '2023' is not the year 2023
+    records = [{"name": "Scope 1", "value": "95,000 t", "metric_type": "t", "year": 2023},
+               {"name": "Scope 2", "value": 1, "metric_type": "t", "year": "2023"},
+               {"name": "Water", "value": "2", "metric_type": "m3", "year": 2022},
+               {"name": "scope 1", "value": 3.5, "metric_type": "T", "year": 2023},
+               {"name": "scope 2", "value": None, "metric_type": "t", "year": 2023}]
+    table = KpiTable.from_records(records)
+    assert detect_outliers(table, threshold=1.0) == detect_outliers(records, threshold=1.0) == [3]
+    assert check_year_consistency(table) == check_year_consistency(records) == [1, 2]
+    assert detect_duplicates(table) == detect_duplicates(records) == [3]
+    assert run_qa_checks(table, threshold=1.0) == run_qa_checks(records, threshold=1.0)
+    years = [2020, "2021", 2021, 2022]
+    assert validate_temporal_consistency(KpiTable.from_records([{"year": y} for y in years])) == \
+        validate_temporal_consistency([{"year": y} for y in years])
+
+
+def test_compare_kpis_to_benchmark_accepts_table():
+    kpis = [{"name": "renewable_energy", "value": "90%"}, {"name": "board_diversity", "value": "36"},
+            {"name": "unknown", "value": 1}, {"name": "board_diversity", "value": "n/a"}]
+    expected = compare_kpis_to_benchmark(kpis, 'banking')
+    assert compare_kpis_to_benchmark(KpiTable.from_records(kpis), 'banking') == expected
+    assert [r['note'] for r in expected] == ['Outlier', 'Within expected range', 'No benchmark available',
+                                             'No numeric value']
@@ -0,0 +1,37 @@
+"""
+Tests for lazy loading of heavy dependencies
+"""
+
+import subprocess
+import sys
+
+from lazy_imports import LazyModule, optional_lazy_import, register_warmup, warm_up
+
+
+def test_lazy_module_imports_on_first_use():
+    calls = []
+    module = LazyModule('json', on_import=calls.append)
+    assert not module.loaded
+    assert module.loads('[1]') == [1]
+    assert module.dumps([]) == '[]'
+    assert module.loaded and len(calls) == 1
+
+
+def test_optional_lazy_import_of_missing_module():
+    assert optional_lazy_import('surely_not_an_installed_module') is None
+    assert optional_lazy_import('csv') is not None
+
+
+def test_warm_up_runs_registered_steps():
+    steps = []
+    register_warmup('test-component', lambda: steps.append('done'))
+    timings = warm_up(['test-component', 'decimal'])
+    assert steps == ['done'] and set(timings) == {'test-component', 'decimal'}
+
+
+def test_service_and_parsers_start_without_heavy_imports():
+    probe = ("import sys, gemini_flask_api, data_ingestion.pdf_parser, data_ingestion.excel_parser, "
+             "data_ingestion.html_parser, ai_pipeline.llm_stage\n"
+             "print(sorted(m for m in ('google.generativeai', 'pandas', 'pdfplumber', 'bs4') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
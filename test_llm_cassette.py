@@ -0,0 +1,78 @@
+"""
+Tests for the LLM record/replay cassette
+"""
+
+import json
+
+import pytest
+
+from ai_pipeline.llm_cassette import CassetteMiss, LLMCassette, prompt_key
+from ai_pipeline.llm_stage import KPI_EXTRACTION_PROMPT, extract_kpis_with_llm
+
+RESPONSE = json.dumps({"environmental": [{"name": "CO2 Emissions", "value": "50,000",
+                                          "metric_type": "metric tons", "year": 2023}],
+                       "social": [], "governance": []})
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "calls.jsonl")
+    recorder = LLMCassette(path, mode='record')
+    assert recorder.generate('gemini-1.5-pro', 'prompt', lambda: RESPONSE) == RESPONSE
+    assert recorder.recorded == 1
+
+    def live_call():
+        raise AssertionError("replay must not call the model")
+
+    player = LLMCassette(path, mode='replay')
+    assert player.generate('gemini-1.5-pro', 'prompt', live_call) == RESPONSE
+    with pytest.raises(CassetteMiss):
+        player.generate('gemini-pro', 'prompt', live_call)
+    assert (player.hits, player.misses) == (1, 1)
+
+
+def test_truncated_recording_and_compact(tmp_path):
+    path = tmp_path / "calls.jsonl"
+    cassette = LLMCassette(str(path), mode='record')
+    cassette.generate('m', 'a', lambda: 'first')
+    cassette.generate('m', 'a', lambda: 'second')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"k": "trunc')
+    reloaded = LLMCassette(str(path), mode='replay')
+    assert reloaded.generate('m', 'a', lambda: None) == 'second'
+    reloaded.compact()
+    assert len(path.read_text().splitlines()) == 1
+    assert prompt_key('m', 'a') in LLMCassette(str(path))
+
+
+def test_llm_stage_replays_offline(tmp_path):
+    cassette = LLMCassette(str(tmp_path / "calls.jsonl"), mode='record')
+    text = "Our CO2 emissions were 50,000 metric tons in 2023"
+    cassette.record(prompt_key('gemini-1.5-pro', f"{KPI_EXTRACTION_PROMPT}\n\nReport Text:\n{text}"),
+                    f"```json\n{RESPONSE}\n```", 1.5)
+    cassette.mode = 'replay'
+    kpis = extract_kpis_with_llm(text, cassette=cassette)
+    assert kpis == [{"name": "CO2 Emissions", "value": "50,000", "metric_type": "metric tons", "year": 2023,
+                     "category": "environmental"}]
+
+
+def test_flask_generate_replays_offline(tmp_path, monkeypatch):
+    import gemini_flask_api
+    cassette = LLMCassette(str(tmp_path / "calls.jsonl"), mode='record')
+    full_prompt = f"{gemini_flask_api.ESG_PROMPT_SYSTEM_INSTRUCTION}\n\nReport Text:\nsome report"
+    cassette.record(prompt_key('gemini-1.5-pro', full_prompt), RESPONSE, 0.0)
+    cassette.mode = 'replay'
+    monkeypatch.setattr(gemini_flask_api, 'default_cassette', lambda: cassette)
+    response = gemini_flask_api.app.test_client().post('/generate', json={'prompt': 'some report'})
+    assert json.loads(response.get_json()['result']) == json.loads(RESPONSE)
+    assert cassette.hits == 1
+
+
+def test_flask_generate_fails_on_replay_miss(tmp_path, monkeypatch):
+    import gemini_flask_api
+    cassette = LLMCassette(str(tmp_path / "calls.jsonl"), mode='replay')
+    monkeypatch.setattr(gemini_flask_api, 'default_cassette', lambda: cassette)
+    with pytest.raises(CassetteMiss):
+        gemini_flask_api.robust_ai_generation("never recorded")
+    response = gemini_flask_api.app.test_client().post('/generate', json={'prompt': 'never recorded'})
+    assert response.status_code == 500 and 'result' not in response.get_json()
+    assert cassette.hits == 0
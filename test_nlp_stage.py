@@ -0,0 +1,37 @@
+"""
+Tests for the cached, batched spaCy stage (uses a small rule-based pipeline instead of a trained model)
+"""
+
+import pytest
+
+spacy = pytest.importorskip('spacy')
+
+from ai_pipeline import nlp_stage
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    nlp = spacy.blank('en')
+    ruler = nlp.add_pipe('entity_ruler')
+    ruler.add_patterns([{"label": "ORG", "pattern": "Acme Bank"},
+                        {"label": "DATE", "pattern": [{"TEXT": {"REGEX": r"^20\d{2}$"}}]}])
+    nlp.to_disk(tmp_path / "model")
+    nlp_stage.clear_model_cache()
+    yield str(tmp_path / "model")
+    nlp_stage.clear_model_cache()
+
+
+def test_model_is_loaded_once(model_path):
+    assert nlp_stage.get_nlp(model_path) is nlp_stage.get_nlp(model_path)
+    assert nlp_stage.extract_entities("Acme Bank in 2023", model=model_path) == [
+        {"text": "Acme Bank", "label": "ORG"}, {"text": "2023", "label": "DATE"}]
+
+
+def test_batch_and_streaming_modes(model_path):
+    texts = ["Acme Bank reported in 2022.", "No entities here.", "In 2023 emissions fell."]
+    batch = nlp_stage.extract_entities_batch(texts, batch_size=2, model=model_path, labels=['DATE'])
+    assert batch == [[{"text": "2022", "label": "DATE"}], [], [{"text": "2023", "label": "DATE"}]]
+    streamed = list(nlp_stage.iter_entities(((t, i) for i, t in enumerate(texts)), model=model_path,
+                                            as_tuples=True))
+    assert [context for _, context in streamed] == [0, 1, 2]
+    assert streamed[0][0][0] == {"text": "Acme Bank", "label": "ORG"}
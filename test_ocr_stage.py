@@ -0,0 +1,50 @@
+"""
+Tests for page-batch OCR of scanned PDF pages (Tesseract itself is only needed on a cache miss)
+"""
+
+import pytest
+
+from ai_pipeline import ocr_stage
+from data_ingestion.pdf_parser import parse_pdf
+from perf.corpus import write_pdf
+
+
+@pytest.fixture
+def mixed_pdf(tmp_path):
+    path = str(tmp_path / "mixed.pdf")
+    write_pdf(path, [["In 2023, our energy consumption was 1,234 MWh across all sites and offices."], [],
+                     ["Board Gender Diversity was 45% in 2023 according to the governance report."]])
+    return path
+
+
+def _seed_cache(pdf_path, page, cache_dir, text, resolution=100, config=''):
+    with ocr_stage.pdfplumber.open(pdf_path) as pdf:
+        image = ocr_stage.render_page(pdf.pages[page], resolution)
+    ocr_stage.OcrCache(cache_dir).set(ocr_stage.image_key(image, 'eng', config), text)
+
+
+def test_pages_without_text(mixed_pdf):
+    assert ocr_stage.pages_without_text(mixed_pdf) == [1]
+
+
+def test_ocr_pages_served_from_cache(mixed_pdf, tmp_path):
+    cache_dir = str(tmp_path / "ocr")
+    _seed_cache(mixed_pdf, 1, cache_dir, "Scanned page: 12,000 tCO2e in 2022\n")
+    results = ocr_stage.ocr_pdf_pages(mixed_pdf, resolution=100, cache_dir=cache_dir, max_workers=1)
+    assert [(r['page'], r['text'], r['cached']) for r in results] == [(1, "Scanned page: 12,000 tCO2e in 2022", True)]
+    assert results[0]['ocr_s'] == 0.0 and results[0]['render_s'] > 0
+
+
+def test_parse_pdf_merges_ocr_text_in_page_order(mixed_pdf, tmp_path):
+    cache_dir = str(tmp_path / "ocr")
+    _seed_cache(mixed_pdf, 1, cache_dir, "SCANNED")
+    text = parse_pdf(mixed_pdf, ocr=True, ocr_options={'cache_dir': cache_dir, 'resolution': 100, 'max_workers': 1})
+    lines = text.split('\n')
+    assert lines[0].startswith("In 2023") and lines[1] == "SCANNED" and lines[2].startswith("Board")
+    assert "SCANNED" not in parse_pdf(mixed_pdf)
+
+
+def test_ocr_with_tesseract(mixed_pdf):
+    pytest.importorskip('pytesseract')
+    results = ocr_stage.ocr_pdf_pages(mixed_pdf, pages=[0], resolution=150, max_workers=1)
+    assert "energy" in results[0]['text'].lower()
@@ -0,0 +1,129 @@
+"""
+Tests for the streaming stage-DAG pipeline orchestrator
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from ai_pipeline.orchestrator import Pipeline, Stage, esg_stages
+from perf.corpus import write_pdf
+
+LLM_SENTENCE = "Our supplier audits covered 37 sites in 2023."
+
+
+def square(x):
+    if x == 3:
+        raise ValueError("three")
+    return x * x
+
+
+def pid_and_value(x):
+    return os.getpid(), x
+
+
+def exit_on_zero(x):
+    if x == 0:
+        os._exit(1)
+    return x
+
+
+def audit_llm(text):
+    return [{'name': "Audited Sites", 'value': "37", 'metric_type': 'count', 'year': 2023,
+             'reference': LLM_SENTENCE, 'category': 'governance'}]
+
+
+def test_dag_runs_branches_across_pools_and_isolates_failures():
+    pipeline = Pipeline([
+        Stage('square', square, pool='process', workers=2, keep=False),
+        Stage('where', pid_and_value, after=['square'], pool='process'),
+        Stage('half', lambda sq: sq / 2, after=['square']),
+        Stage('join', lambda where, half: (where[1], half), after=['where', 'half'], workers=2),
+    ])
+    assert [stage.name for stage in pipeline.order] == ['square', 'where', 'half', 'join']
+    results = list(pipeline.run(range(6), ordered=True))
+    assert [r['index'] for r in results] == list(range(6))
+    assert [r['outputs']['join'] for r in results if r['error'] is None] == [
+        (0, 0), (1, 0.5), (4, 2), (16, 8), (25, 12.5)]
+    assert 'square' not in results[0]['outputs'] and results[0]['outputs']['where'][0] != os.getpid()
+    failed = results[3]
+    assert failed['error']['stage'] == 'square' and failed['error']['type'] == 'ValueError'
+    assert failed['outputs'] == {} and set(failed['seconds']) == {'square'}
+
+    stats = pipeline.stats()
+    assert (stats['items'], stats['failed']) == (6, 1)
+    assert [(name, s['pool'], s['done'], s['failed']) for name, s in stats['stages'].items()] == [
+        ('square', 'process', 5, 1), ('where', 'process', 5, 0), ('half', 'thread', 5, 0), ('join', 'thread', 5, 0)]
+    assert all(s['items_per_s'] > 0 for s in stats['stages'].values())
+    assert "square" in pipeline.format_stats() and "items/s" in pipeline.format_stats()
+
+
+def test_bounded_queues_apply_backpressure():
+    pulled, lock = [], threading.Lock()
+
+    def inputs():
+        for i in range(50):
+            with lock:
+                pulled.append(i)
+            yield i
+
+    def slow(x):
+        time.sleep(0.01)
+        return x
+
+    pipeline = Pipeline([Stage('fast', lambda x: x, workers=2), Stage('slow', slow, after=['fast'])],
+                        queue_size=1, max_in_flight=4)
+    results = pipeline.run(inputs())
+    first = next(results)
+    time.sleep(0.1)
+    assert len(pulled) <= 4 + 1  # In flight plus the one just handed out
+    assert sorted([first['outputs']['slow']] + [r['outputs']['slow'] for r in results]) == list(range(50))
+    stats = pipeline.stats()['stages']
+    assert stats['slow']['max_queue'] <= 1 and stats['slow']['blocked_s'] > 0
+
+
+def test_process_stage_gets_a_new_pool_after_a_worker_dies():
+    pipeline = Pipeline([Stage('risky', exit_on_zero, pool='process')])
+    results = list(pipeline.run([0, 1, 2], ordered=True))
+    assert results[0]['error']['type'] == 'BrokenProcessPool'
+    assert [r['outputs']['risky'] for r in results[1:]] == [1, 2]
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([Stage('a', abs, after=['b']), Stage('b', abs, after=['a'])])
+    with pytest.raises(ValueError, match="unknown stage"):
+        Pipeline([Stage('a', abs, after=['missing'])])
+    with pytest.raises(ValueError, match="Duplicate"):
+        Pipeline([Stage('a', abs), Stage('a', abs)])
+    with pytest.raises(ValueError, match="Unknown pool"):
+        Stage('a', abs, pool='gpu')
+
+
+def test_esg_pipeline_streams_documents_to_validated_kpis(tmp_path):
+    pdf = str(tmp_path / "annual.pdf")
+    write_pdf(pdf, [["In 2023, our energy consumption was 4,800 MWh."]], tables={
+        0: [["Metric", "Unit", "2022", "2023"], ["Scope 1 emissions", "tCO2e", "12,345", "11,000"]]})
+    html = tmp_path / "esg.html"
+    html.write_text(f"<html><body><p>In 2023, our water withdrawal was 120 m3.</p><p>{LLM_SENTENCE}</p></body></html>")
+    (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.4 this is not really a PDF")
+
+    pipeline = Pipeline(esg_stages(llm=audit_llm, workers=2, industry='banking'))
+    assert [(stage.name, stage.pool) for stage in pipeline.order] == [
+        ('parse', 'process'), ('extract', 'thread'), ('validate', 'process'), ('qa', 'process'),
+        ('benchmark', 'process')]
+    results = {os.path.basename(r['input']): r for r in pipeline.run([pdf, str(html), str(tmp_path / "broken.pdf")])}
+
+    assert results['broken.pdf']['error']['stage'] == 'parse'
+    annual = results['annual.pdf']
+    assert annual['error'] is None and set(annual['outputs']) == {'extract', 'validate', 'qa', 'benchmark'}
+    assert sorted((k['name'], k['year'], k.get('page')) for k in annual['outputs']['validate']['kpis']) == [
+        ("Energy Consumption", 2023, None), ("Scope 1 Emissions", 2022, 1), ("Scope 1 Emissions", 2023, 1)]
+    assert all('validation_status' in k for k in annual['outputs']['validate']['kpis'])
+    assert len(annual['outputs']['benchmark']) == 3
+    esg = results['esg.html']['outputs']
+    assert {k['extraction_method'] for k in esg['extract']['kpis']} == {'rules', 'llm'}
+    assert esg['extract']['coverage']['llm_calls'] == 1 and esg['validate']['metadata']['total_metrics_found'] == 2
+    assert pipeline.stats()['stages']['parse']['failed'] == 1
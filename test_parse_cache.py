@@ -0,0 +1,95 @@
+"""
+Tests for the content-addressed parse cache and its use by the PDF, HTML and Excel parsers
+"""
+
+import os
+import shutil
+
+import pytest
+
+from data_ingestion import excel_parser, html_parser, pdf_parser
+from data_ingestion.parse_cache import ParseCache, file_digest
+from perf.corpus import write_pdf
+
+
+@pytest.fixture
+def report_pdf(tmp_path):
+    path = str(tmp_path / "report.pdf")
+    write_pdf(path, [[f"Page {n}: in 2023, our energy consumption was {n * 10} MWh."] for n in range(1, 6)])
+    return path
+
+
+def _no_parsing(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("page was parsed instead of served from the cache")
+        yield
+    monkeypatch.setattr(pdf_parser, '_iter_serial', fail)
+
+
+def test_pdf_pages_served_from_cache(report_pdf, tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / "cache"))
+    expected = pdf_parser.parse_pdf(report_pdf)
+    assert pdf_parser.parse_pdf(report_pdf, cache=cache) == expected
+    _no_parsing(monkeypatch)
+    # Content-addressed: a copy of the file under another name hits the same entries
+    copy = str(tmp_path / "copy.pdf")
+    shutil.copy(report_pdf, copy)
+    assert pdf_parser.parse_pdf(copy, cache=cache) == expected
+    assert list(pdf_parser.iter_pdf_pages(copy, page_range=(2, 3), cache=cache)) == [
+        (2, "Page 2: in 2023, our energy consumption was 20 MWh."),
+        (3, "Page 3: in 2023, our energy consumption was 30 MWh.")]
+
+
+def test_only_uncached_pages_are_parsed(report_pdf, tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / "cache"))
+    list(pdf_parser.iter_pdf_pages(report_pdf, page_range=(2, 3), cache=cache))
+    parsed = []
+    serial = pdf_parser._iter_serial
+    monkeypatch.setattr(pdf_parser, '_iter_serial', lambda path, numbers, *args: parsed.extend(numbers) or serial(
+        path, numbers, *args))
+    assert [n for n, _ in pdf_parser.iter_pdf_pages(report_pdf, cache=cache)] == [1, 2, 3, 4, 5]
+    assert parsed == [1, 4, 5]
+
+
+def test_html_and_excel_cached(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / "cache"))
+    html = tmp_path / "report.html"
+    html.write_text("<html><body><p>Scope 1 emissions: 1,200 tCO2e</p></body></html>", encoding='utf-8')
+    csv = tmp_path / "kpis.csv"
+    csv.write_text("metric,value\nEnergy,10.5\nWater,\n", encoding='utf-8')
+    text = html_parser.parse_html(str(html), cache=cache)
+    rows = excel_parser.parse_excel(str(csv), cache=cache)
+    monkeypatch.setattr(html_parser, 'bs4', None)
+    monkeypatch.setattr(excel_parser, 'pd', None)
+    assert html_parser.parse_html(str(html), cache=cache) == text
+    cached_rows = excel_parser.parse_excel(str(csv), cache=cache)
+    assert cached_rows[0] == rows[0] == {'metric': 'Energy', 'value': 10.5}
+    assert cached_rows[1]['metric'] == 'Water' and cached_rows[1]['value'] != cached_rows[1]['value']  # NaN
+
+
+def test_changed_file_misses(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    html = tmp_path / "report.html"
+    html.write_text("<p>old</p>", encoding='utf-8')
+    assert html_parser.parse_html(str(html), cache=cache) == "old"
+    html.write_text("<p>new text</p>", encoding='utf-8')
+    assert html_parser.parse_html(str(html), cache=cache) == "new text"
+
+
+def test_mmap_read_path_and_lru_eviction(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"), max_bytes=3500, mmap_threshold=1)
+    for i in range(3):
+        cache.set_text(f"k{i}", f"{i}" * 1000)
+    assert cache.get_text("k0") == "0" * 1000  # Read through mmap; also marks k0 as recently used
+    os.utime(cache._path("k1", 'txt'), (0, 0))
+    cache.set_text("k3", "3" * 1000)
+    assert cache.evicted >= 1 and cache.size_bytes() <= 3500
+    assert not cache.has_text("k1") and cache.has_text("k3")
+    assert cache.get_text("k1") is None and cache.misses == 1
+
+
+def test_file_digest_is_content_hash(tmp_path):
+    a, b = tmp_path / "a.bin", tmp_path / "b.bin"
+    a.write_bytes(b"x" * 3_000_000)
+    b.write_bytes(b"x" * 3_000_000)
+    assert file_digest(str(a)) == file_digest(str(b)) == file_digest(str(a), chunk_size=4096)
@@ -0,0 +1,60 @@
+"""
+Tests for streaming and page-parallel PDF text extraction
+"""
+
+import pytest
+
+from data_ingestion.pdf_parser import extract_pdf_table_kpis, extract_pdf_tables, iter_pdf_pages, page_count, parse_pdf
+from perf.corpus import write_pdf
+
+
+@pytest.fixture
+def report_pdf(tmp_path):
+    path = str(tmp_path / "report.pdf")
+    write_pdf(path, [[f"Page {n}: in 2023, our water withdrawal was {n * 100} m3."] for n in range(1, 8)])
+    return path
+
+
+def test_iter_pdf_pages_yields_pages_in_order(report_pdf):
+    pages = list(iter_pdf_pages(report_pdf))
+    assert [n for n, _ in pages] == list(range(1, 8))
+    assert pages[2][1] == "Page 3: in 2023, our water withdrawal was 300 m3."
+    assert page_count(report_pdf) == 7
+
+
+def test_page_range_is_inclusive_and_clamped(report_pdf):
+    assert [n for n, _ in iter_pdf_pages(report_pdf, page_range=(3, 5))] == [3, 4, 5]
+    assert [n for n, _ in iter_pdf_pages(report_pdf, page_range=(6, 99))] == [6, 7]
+    assert parse_pdf(report_pdf, page_range=(2, 2)) == "Page 2: in 2023, our water withdrawal was 200 m3."
+
+
+def test_parallel_matches_serial(report_pdf):
+    serial = list(iter_pdf_pages(report_pdf, page_range=(2, 7)))
+    assert list(iter_pdf_pages(report_pdf, page_range=(2, 7), workers=2, chunk_size=2)) == serial
+    assert parse_pdf(report_pdf, workers=2) == parse_pdf(report_pdf)
+
+
+@pytest.fixture
+def table_pdf(tmp_path):
+    path = str(tmp_path / "tables.pdf")
+    write_pdf(path, [["Our ESG performance is summarised below."], ["Sites covered by this report:"]], tables={
+        0: [["Metric", "Unit", "2022", "2023"], ["Scope 1 emissions", "tCO2e", "12,345", "11,000"],
+            ["Renewable energy share", "percentage", "38%", "45%"]],
+        1: [["Site", "Country"], ["Plant A", "Germany"]],
+    })
+    return path
+
+
+def test_table_kpis_come_with_page_numbers(table_pdf):
+    kpis = extract_pdf_table_kpis(table_pdf)
+    assert [(k['page'], k['name'], k['year'], k['value'], k['unit']) for k in kpis] == [
+        (1, "Scope 1 Emissions", 2022, "12,345", 'tCO2e'), (1, "Scope 1 Emissions", 2023, "11,000", 'tCO2e'),
+        (1, "Renewable Energy Share", 2022, "38%", '%'), (1, "Renewable Energy Share", 2023, "45%", '%')]
+    tables = extract_pdf_tables(table_pdf)
+    assert [(t['page'], len(t['rows']), len(t['kpis'])) for t in tables] == [(1, 3, 4), (2, 2, 0)]
+
+
+def test_skip_tables_keeps_prose_and_unrecognized_tables(table_pdf):
+    assert "12,345" in parse_pdf(table_pdf)
+    assert parse_pdf(table_pdf, skip_tables=True) == (
+        "Our ESG performance is summarised below.\nSites covered by this report:\nSite Country\nPlant A Germany")
@@ -0,0 +1,46 @@
+"""
+Tests for the synthetic corpus generator and the benchmark suite's baseline comparison
+"""
+
+import filecmp
+
+from perf.corpus import build_corpus
+from perf.suite import compare_to_baseline
+
+
+def test_corpus_is_deterministic(tmp_path):
+    first = build_corpus(str(tmp_path / "a"), 'small', seed=3, reports=2, pages=1, csv_rows=50)
+    second = build_corpus(str(tmp_path / "b"), 'small', seed=3, reports=2, pages=1, csv_rows=50)
+    assert [r['kpis'] for r in first['reports']] == [r['kpis'] for r in second['reports']]
+    for a, b in zip(first['reports'], second['reports']):
+        assert filecmp.cmp(a['pdf'], b['pdf'], shallow=False)
+        assert filecmp.cmp(a['html'], b['html'], shallow=False)
+    assert filecmp.cmp(first['csv'], second['csv'], shallow=False)
+
+
+def test_corpus_pdf_is_parseable(tmp_path):
+    from data_ingestion.pdf_parser import parse_pdf
+    manifest = build_corpus(str(tmp_path), 'small', reports=1, pages=2, csv_rows=10)
+    text = parse_pdf(manifest['reports'][0]['pdf'])
+    assert manifest['reports'][0]['kpis'][-1]['reference'][:40] in text.replace('\n', ' ')
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {'meta': {'size': 'small'}, 'results': {'a': {'median_s': 0.10}, 'b': {'median_s': 0.10},
+                                                       'c': {'median_s': 0.0001}}}
+    current = {'meta': {'size': 'small'}, 'results': {'a': {'median_s': 0.15}, 'b': {'median_s': 0.05},
+                                                      'c': {'median_s': 0.0005}, 'd': {'median_s': 1.0}}}
+    status = {row['case']: row['status'] for row in compare_to_baseline(current, baseline, tolerance=0.2)}
+    # 'c' is 5x slower but only by 0.4 ms, below the noise floor
+    assert status == {'a': 'regression', 'b': 'improvement', 'c': 'ok', 'd': 'new'}
+
+
+def test_load_test_against_local_server():
+    from perf.load_test import local_server, make_documents, parse_mix, run_load
+    documents = make_documents(parse_mix('small=3,medium=1'), 12)
+    with local_server(latency=0.01) as url:
+        result = run_load(url, documents, concurrency=4)
+    assert result['requests'] == 12 and result['errors'] == 0
+    assert result['max_in_flight'] <= 4
+    assert result['latency_s']['p50'] >= 0.01
+    assert set(result['by_size']) == {'small', 'medium'}
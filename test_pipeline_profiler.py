@@ -0,0 +1,69 @@
+"""
+Tests for per-document profiling
+"""
+
+import json
+import os
+
+from perf.stub_llm import stub_genai
+from pipeline_profiler import DocumentProfiler, profile_document, report_filename
+
+
+def test_profiler_records_stages_functions_and_memory(tmp_path):
+    profiler = DocumentProfiler('doc-1', cprofile=True, memory=True, top_n=5)
+    with profiler.stage('allocate'):
+        data = [str(i) * 10 for i in range(20_000)]
+    profiler.record_size('items', data)
+    path = profiler.save(str(tmp_path))
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    assert [s['stage'] for s in report['stages']] == ['allocate']
+    assert report['sizes'] == {'items': 20_000}
+    assert report['peak_memory_mb'] > 0.5
+    assert 0 < len(report['top_functions']) <= 5
+
+
+def test_disabled_profiler_is_noop():
+    profiler = DocumentProfiler('doc-2', enabled=False, cprofile=True, memory=True)
+    with profiler.stage('parse'):
+        pass
+    profiler.record_size('text_chars', 'abc')
+    assert profiler.stages == [] and profiler.sizes == {}
+
+
+def test_profile_document_and_api_response(tmp_path):
+    import gemini_flask_api
+    report_path = tmp_path / "report.txt"
+    report_path.write_text("In 2023, our energy consumption was 1,234 MWh.", encoding='utf-8')
+    client = gemini_flask_api.app.test_client()
+    with stub_genai():
+        report = profile_document(str(report_path))
+        response = client.post('/generate', json={'prompt': report_path.read_text(), 'profile': True,
+                                                  'document_id': 'r1'})
+        plain = client.post('/generate', json={'prompt': report_path.read_text()})
+    assert [s['stage'] for s in report['stages']] == ['parse', 'prompt', 'model', 'validation', 'qa']
+    assert report['sizes']['kpis'] == 1
+    profile = response.get_json()['profile']
+    assert profile['doc_id'] == 'r1'
+    assert [s['stage'] for s in profile['stages']] == ['prompt', 'model', 'postprocess']
+    assert 'profile' not in plain.get_json()
+
+
+def test_document_ids_cannot_escape_the_profile_dir(tmp_path, monkeypatch):
+    import gemini_flask_api
+    assert report_filename('annual-2023.pdf') == 'annual-2023.pdf.json'
+    for doc_id in ('../../etc/x', '/tmp/x', '..', 'a/b', 'x' * 65):
+        name = report_filename(doc_id)
+        assert os.sep not in name and not name.startswith('.') and len(name) == 37
+    profile_dir = tmp_path / "profiles"
+    monkeypatch.setattr(gemini_flask_api, 'PROFILE_DIR', str(profile_dir))
+    client = gemini_flask_api.app.test_client()
+    with stub_genai():
+        response = client.post('/generate', json={'prompt': "Energy use fell.", 'document_id': '../../escaped',
+                                                  'profile': {'memory': True}})
+        rejected = [client.post('/generate', json={'prompt': "Energy use fell.", 'profile': value})
+                    for value in (1, "yes", [True])]
+    assert response.status_code == 200 and response.get_json()['profile']['doc_id'] == '../../escaped'
+    assert os.listdir(profile_dir) == [report_filename('../../escaped')]
+    assert not (tmp_path / "escaped.json").exists()
+    assert [r.status_code for r in rejected] == [400, 400, 400]
@@ -0,0 +1,112 @@
+"""
+Tests for the automated QA checks
+"""
+
+import numpy as np
+import pandas as pd
+
+from kpi_table import KpiTable, parse_numeric_value
+from perf.bench_qa import make_metrics
+from qa.grouped_outliers import detect_grouped_outliers
+from qa.incremental import QAStateStore
+from qa.qa_checks import (
+    detect_outliers, check_unit_consistency, check_year_consistency, detect_duplicates, run_qa_checks
+)
+from validation_utils import normalize_unit
+
+
+def test_fused_runner_matches_individual_checks():
+    metrics = make_metrics(2_000, 5)
+    metrics[10]['value'] = 1e9
+    metrics[20]['year'] = None
+    report = run_qa_checks(metrics)
+    assert report['outliers'] == detect_outliers(metrics) == [10]
+    assert report['unit_inconsistencies'] == check_unit_consistency(metrics)
+    assert report['year_inconsistencies'] == check_year_consistency(metrics)
+    assert report['duplicates'] == detect_duplicates(metrics)
+    assert report['total_metrics'] == 2_000
+
+
+def test_fused_runner_on_table():
+    metrics = [
+        {'name': 'Emissions', 'value': 10, 'metric_type': 'tCO2e', 'year': 2023},
+        {'name': 'emissions', 'value': 11, 'metric_type': 'TCO2E', 'year': 2023},
+        {'name': 'Water', 'value': 12, 'metric_type': 'liters', 'year': 2022},
+    ]
+    report = run_qa_checks(KpiTable.from_records(metrics))
+    assert report == run_qa_checks(metrics)
+    assert report['unit_inconsistencies'] == [2]
+    assert report['year_inconsistencies'] == [2]
+    assert report['duplicates'] == [1]
+    assert report['most_common_year'] == 2023
+
+
+def test_ties_break_like_the_original_checks():
+    years, units = [2023, 2022, 2021, 2022, 2023, 2021], ['t', 'mwh', 'MWh', 't', '%', '%']
+    metrics = [{'name': f'm{i}', 'value': i, 'metric_type': unit, 'year': year}
+               for i, (year, unit) in enumerate(zip(years, units))]
+    # The checks before the fused runner: max(set(x), key=x.count)
+    year_mode = max(set(years), key=years.count)
+    unit_mode = max(set(u.lower() for u in units), key=[u.lower() for u in units].count)
+    expected_years = [i for i, year in enumerate(years) if year != year_mode]
+    expected_units = [i for i, unit in enumerate(units) if unit.lower() != unit_mode]
+    table = KpiTable.from_records(metrics)
+    assert check_year_consistency(metrics) == check_year_consistency(table) == expected_years
+    assert check_unit_consistency(metrics) == check_unit_consistency(table) == expected_units
+    for report in (run_qa_checks(metrics), run_qa_checks(table)):
+        assert (report['most_common_year'], report['most_common_unit']) == (year_mode, unit_mode)
+        assert (report['year_inconsistencies'], report['unit_inconsistencies']) == (expected_years, expected_units)
+    pair = [{'year': 2023}, {'year': 2022}]
+    assert check_year_consistency(pair) == check_year_consistency(KpiTable.from_records(pair)) == [0]
+
+
+def test_empty_metrics():
+    report = run_qa_checks([])
+    assert report['outliers'] == report['duplicates'] == []
+    assert report['most_common_unit'] is None
+
+
+def test_grouped_outliers_use_canonical_units_and_groups():
+    metrics = [{'name': 'GHG Emissions', 'value': f"{100_000 + 500 * i:,} tCO2e", 'metric_type': 'tCO2e'}
+               for i in range(20)]
+    metrics.append({'name': 'ghg emissions', 'value': '104,000,000', 'metric_type': 'kgCO2e'})
+    metrics.append({'name': 'GHG Emissions', 'value': '950,000 tCO2e', 'metric_type': 'metric tons of CO2e'})
+    metrics += [{'name': 'Renewable Energy', 'value': f"{40 + i % 3}%", 'metric_type': 'percentage'}
+                for i in range(10)]
+    metrics.append({'name': 'Renewable Energy', 'value': 'not disclosed', 'metric_type': '%'})
+
+    flagged = detect_grouped_outliers(metrics)
+    assert flagged.index.tolist() == [21]
+    row = flagged.loc[21]
+    assert row['unit'] == 'tCO2e' and row['group_size'] == 22
+    assert row['median'] == 104_750.0 and row['robust_z'] > 3.5
+    assert detect_grouped_outliers(KpiTable.from_records(metrics), method='iqr').index.tolist() == [21]
+    by_industry = detect_grouped_outliers(metrics, industry=['a'] * 11 + ['b'] * 22, min_group_size=4)
+    assert 21 in by_industry.index and by_industry.loc[21, 'industry'] == 'b'
+    # A DataFrame with the same unit-bearing strings gives the same outliers as the list
+    frame = pd.DataFrame(metrics)
+    assert not pd.api.types.is_numeric_dtype(frame['value'])
+    assert detect_grouped_outliers(frame).index.tolist() == [21]
+    assert detect_grouped_outliers(frame.assign(value=frame['value'].map(parse_numeric_value))).index.tolist() == [21]
+    # 'MtCO2e' is million tonnes (0.1043 Mt is in range); lower-case 'mt' stays metric tonnes
+    assert normalize_unit('MtCO2e') == normalize_unit('megatonnes of CO2') == ('tCO2e', 1e6)
+    assert normalize_unit('mt CO2e') == ('tCO2e', 1.0)
+    in_mt = metrics + [{'name': 'GHG Emissions', 'value': '0.1043', 'metric_type': 'MtCO2e'}]
+    assert detect_grouped_outliers(in_mt).index.tolist() == [21]
+
+
+def test_incremental_store_scores_and_persists(tmp_path):
+    path = str(tmp_path / 'qa_state.json')
+    store = QAStateStore.load(path)
+    history = [{'name': 'Water Use', 'value': f"{1_000 + 10 * (i % 7)} m3", 'metric_type': 'cubic meters'}
+               for i in range(50)]
+    store.ingest(history, scopes=['company:acme', 'industry:apparel'])
+    store.save()
+
+    reloaded = QAStateStore.load(path)
+    normal = reloaded.score({'name': 'water use', 'value': '1,020,000', 'metric_type': 'liters'}, 'company:acme')
+    assert normal['count'] == 50 and not normal['is_outlier']
+    spike = reloaded.score({'name': 'Water Use', 'value': '5,000', 'metric_type': 'm3'}, 'industry:apparel')
+    assert spike['is_outlier'] and spike['outside_iqr']
+    assert abs(spike['mean'] - np.mean([1_000 + 10 * (i % 7) for i in range(50)])) < 1e-9
+    assert reloaded.score(history[0], 'company:other')['note'] == 'No history for this metric'
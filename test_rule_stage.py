@@ -0,0 +1,78 @@
+"""
+Tests for the rule-based fast-path KPI extractor
+"""
+
+from ai_pipeline.rule_stage import extract_kpis_hybrid, extract_kpis_with_rules, extract_table_kpis
+
+REPORT = """In 2023, our company achieved significant sustainability milestones.
+Our total greenhouse gas emissions were 95,000 metric tons of CO2 equivalent, representing a 15% reduction from our 2022 baseline of 112,000 metric tons.
+We increased our renewable energy usage to 40% of total energy consumption.
+Our board of directors now includes 45% women, up from 30% in 2022.
+
+Our lost time injury rate was 0.45 per 200,000 hours worked."""
+
+
+def test_rules_extract_plain_kpis_in_extractor_schema():
+    kpis = extract_kpis_with_rules(REPORT)
+    assert [(k['name'], k['value'], k['metric_type'], k['year'], k['category']) for k in kpis] == [
+        ("Total GHG Emissions", "95,000", "metric tons of CO2 equivalent", 2023, 'environmental'),
+        ("Renewable Energy Share", "40%", "percentage", 2023, 'environmental'),
+        ("Board Gender Diversity", "45%", "percentage", 2023, 'governance'),
+    ]
+    assert kpis[0]['confidence_score'] == 100 and kpis[0]['validation_status'] == 'valid'
+    assert kpis[0]['reference'].startswith("Our total greenhouse gas emissions")
+
+
+def test_hybrid_only_sends_unresolved_passages_to_llm():
+    prompts = []
+
+    def llm(text):
+        prompts.append(text)
+        return [{"name": "Lost Time Injury Rate", "value": "0.45", "category": "social"}]
+
+    result = extract_kpis_hybrid(REPORT, llm=llm)
+    assert prompts == ["Our lost time injury rate was 0.45 per 200,000 hours worked."]
+    assert [k['extraction_method'] for k in result['kpis']] == ['rules', 'rules', 'rules', 'llm']
+    assert [k['name'] for k in result['social']] == ["Lost Time Injury Rate"]
+    coverage = result['coverage']
+    assert (coverage['passages'], coverage['resolved_by_rules'], coverage['llm_calls']) == (2, 1, 1)
+    assert coverage['llm_chars_saved'] == len(REPORT) - len(prompts[0])
+
+
+def test_hybrid_calls_llm_for_missing_required_category():
+    text = "We increased our renewable energy usage to 40% in 2023."
+    calls = []
+
+    def llm(chunk):
+        calls.append(chunk)
+        return [{"name": "Independent Directors", "value": "60%", "category": "governance"},
+                {"name": "Renewable Energy", "value": "40%", "category": "environmental"}]
+
+    result = extract_kpis_hybrid(text, llm=llm, required_categories=['governance'])
+    assert calls == [text]
+    assert [k['name'] for k in result['environmental']] == ["Renewable Energy Share"]
+    assert [k['name'] for k in result['governance']] == ["Independent Directors"]
+    assert extract_kpis_hybrid(text, llm=llm)['coverage']['llm_calls'] == 0
+
+
+def test_table_kpis_from_wide_and_long_layouts():
+    wide = [["ESG data", None, None, None], ["Metric", "Unit", "FY2022", "FY2023"],
+            ["Environmental", "", "", ""],
+            ["Scope 1 emissions", "tCO2e", "12,345", "11,000"],
+            ["Water withdrawal (m3)", "", "1,200,000", "n/a"],
+            ["Lost time injury rate", "", "0.5", "0.4"]]
+    kpis = extract_table_kpis(wide)
+    assert [(k['name'], k['year'], k['value'], k['unit'], k['category']) for k in kpis] == [
+        ("Scope 1 Emissions", 2022, "12,345", 'tCO2e', 'environmental'),
+        ("Scope 1 Emissions", 2023, "11,000", 'tCO2e', 'environmental'),
+        ("Water Withdrawal", 2022, "1,200,000", 'm3', 'environmental'),
+        ("Lost time injury rate", 2022, "0.5", '', None),
+        ("Lost time injury rate", 2023, "0.4", '', None),
+    ]
+    assert kpis[0]['extraction_method'] == 'table' and kpis[0]['reference'] == "Scope 1 emissions (2022): 12,345 tCO2e"
+
+    long = [["Indicator", "Year", "Value", "Unit"], ["Women on the board", "2023", "45", "%"],
+            ["Energy consumption", "2023", "5,400", "MWh"]]
+    assert [(k['name'], k['year'], k['value'], k['metric_type']) for k in extract_table_kpis(long)] == [
+        ("Board Gender Diversity", 2023, "45%", 'percentage'), ("Energy Consumption", 2023, "5,400", 'MWh')]
+    assert extract_table_kpis([["Site", "Country"], ["Plant A", "DE"]]) == []
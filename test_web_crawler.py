@@ -0,0 +1,181 @@
+"""
+Tests for the async ESG disclosure crawler against a local HTTP server
+"""
+
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from data_ingestion.web_crawler import Frontier, crawl, crawl_esg_disclosures, extract_links
+
+REPORT = b"%PDF-1.4 sustainability report 2023"
+XBRL = b"<xbrli:xbrl xmlns:xbrli='http://www.xbrl.org/2003/instance'/>"
+SITE = {
+    '/robots.txt': ('text/plain', b"User-agent: *\nDisallow: /private/\n"),
+    '/ir': ('text/html', b"""<html><body><a href="/ir/reports">Reports</a> <a href="/private/draft.pdf">Draft</a>
+        <a href="/about#team">About</a> <a href="mailto:ir@example.com">Mail</a></body></html>"""),
+    '/ir/reports': ('text/html', b"""<html><body><a href="/files/esg-2023.pdf">2023</a>
+        <a href="/mirror/esg-2023.pdf">Mirror</a> <a href="/files/esef.xbrl">ESEF</a>
+        <a href="/files/missing.pdf">Missing</a></body></html>"""),
+    '/about': ('text/html', b"<html><body><a href='/ir'>IR</a></body></html>"),
+    '/private/draft.pdf': ('application/pdf', b"%PDF draft"),
+    '/files/esg-2023.pdf': ('application/pdf', REPORT),
+    '/mirror/esg-2023.pdf': ('application/pdf', REPORT),
+    '/files/esef.xbrl': ('application/xml', XBRL),
+}
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get('If-None-Match')))
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            time.sleep(server.delay)
+            if self.path not in server.site:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            content_type, body = server.site[self.path]
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    server.site, server.requests, server.lock = dict(SITE), [], threading.Lock()
+    server.active = server.peak = 0
+    server.delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def paths(server):
+    return [path for path, _ in server.requests]
+
+
+def test_extract_links_classifies_reports():
+    html = b"""<a href="report.PDF#page=3">R</a><a href="/ir/">IR</a><a href="https://cdn.example/esef.xhtml">E</a>
+        <a href="javascript:void(0)">x</a>"""
+    assert sorted(extract_links(html, 'https://example.com/docs/')) == [
+        ('https://cdn.example/esef.xhtml', 'report'), ('https://example.com/docs/report.PDF', 'report'),
+        ('https://example.com/ir/', 'page')]
+
+
+def test_crawl_discovers_reports_respects_robots_and_dedups(site, tmp_path):
+    stats = crawl([f"{site.base}/ir"], str(tmp_path / "frontier.db"), str(tmp_path / "reports"))
+    # The same PDF is linked twice; whichever URL is fetched first keeps it
+    assert sorted(r['hash'] for r in stats['new_reports']) == sorted(
+        hashlib.sha256(body).hexdigest() for body in (REPORT, XBRL))
+    assert stats['duplicates'] == 1 and stats['robots_blocked'] == 1 and stats['errors'] == 1
+    assert '/private/draft.pdf' not in paths(site)
+    assert sorted(p.name.rsplit('.', 1)[1] for p in (tmp_path / "reports").iterdir()) == ['pdf', 'xbrl']
+    saved = next(p for p in (tmp_path / "reports").iterdir() if p.suffix == '.pdf')
+    assert saved.read_bytes() == REPORT
+    assert paths(site).count('/robots.txt') == 1 and stats['pending'] == 0
+
+
+def test_inline_xbrl_report_served_as_xhtml_is_saved(site, tmp_path):
+    esef = b"<html xmlns='http://www.w3.org/1999/xhtml'><body><a href='/ir/other'>x</a></body></html>"
+    site.site['/files/esef.xhtml'] = ('application/xhtml+xml', esef)
+    site.site['/ir/reports'] = ('text/html', b'<html><body><a href="/files/esef.xhtml">ESEF</a></body></html>')
+    stats = crawl([f"{site.base}/ir"], str(tmp_path / "frontier.db"), str(tmp_path / "reports"))
+    assert [(r['url'], r['content_type']) for r in stats['new_reports']] == [
+        (f"{site.base}/files/esef.xhtml", 'application/xhtml+xml')]
+    assert (tmp_path / "reports" / os.path.basename(stats['new_reports'][0]['path'])).read_bytes() == esef
+    assert '/ir/other' not in paths(site)  # A report is not scanned for links
+
+
+def test_page_links_to_media_are_not_saved_as_reports(site, tmp_path):
+    site.site['/ir'] = ('text/html', b"""<html><body><a href="/webcast.mp4">Webcast</a> <a href="/logo.png">Logo</a>
+        <a href="/feed">News</a> <a href="/download?id=7">Report</a></body></html>""")
+    site.site['/webcast.mp4'] = ('video/mp4', b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 1_000_000)
+    site.site['/logo.png'] = ('image/png', b"\x89PNG\r\n\x1a\n")
+    site.site['/feed'] = ('application/rss+xml', b"<?xml version='1.0'?><rss><channel/></rss>")
+    site.site['/download?id=7'] = ('application/octet-stream', REPORT)
+    stats = crawl([f"{site.base}/ir"], str(tmp_path / "frontier.db"), str(tmp_path / "reports"))
+    assert [(r['url'], os.path.splitext(r['path'])[1]) for r in stats['new_reports']] == [
+        (f"{site.base}/download?id=7", '.pdf')]
+    assert open(stats['new_reports'][0]['path'], 'rb').read() == REPORT
+    assert stats['skipped'] == 3 and sorted(p.name for p in (tmp_path / "reports").iterdir()) == [
+        os.path.basename(stats['new_reports'][0]['path'])]
+    frontier = Frontier(str(tmp_path / "frontier.db"))
+    assert frontier.get(f"{site.base}/webcast.mp4")['state'] == 'skipped'
+    frontier.close()
+
+
+def test_second_pass_uses_conditional_requests(site, tmp_path):
+    db, out = str(tmp_path / "frontier.db"), str(tmp_path / "reports")
+    crawl([f"{site.base}/ir"], db, out)
+    site.requests.clear()
+    stats = crawl([f"{site.base}/ir"], db, out)
+    assert stats['pass'] == 2 and stats['new_reports'] == []
+    # Pages are revalidated with their ETag; downloaded reports are not requested again
+    assert all(etag for path, etag in site.requests if path in ('/ir', '/ir/reports', '/about'))
+    assert stats['not_modified'] == 3
+    assert not {'/files/esg-2023.pdf', '/files/esef.xbrl'} & set(paths(site))
+
+    site.site['/files/esg-2024.pdf'] = ('application/pdf', b"%PDF-1.4 sustainability report 2024")
+    site.site['/ir/reports'] = ('text/html', SITE['/ir/reports'][1].replace(
+        b'</body>', b'<a href="/files/esg-2024.pdf">2024</a></body>'))
+    stats = crawl([f"{site.base}/ir"], db, out)
+    assert [r['url'] for r in stats['new_reports']] == [f"{site.base}/files/esg-2024.pdf"]
+
+
+def test_interrupted_crawl_resumes_from_frontier(site, tmp_path):
+    db, out = str(tmp_path / "frontier.db"), str(tmp_path / "reports")
+    first = crawl([f"{site.base}/ir"], db, out, limit=2)
+    assert first['pending'] > 0
+    second = crawl([f"{site.base}/ir"], db, out, resume=True)
+    assert second['pass'] == first['pass'] and second['pending'] == 0
+    assert len(first['new_reports']) + len(second['new_reports']) == 2
+    # Nothing fetched in the first run is fetched again
+    fetched = [path for path in paths(site) if path != '/robots.txt']
+    assert len(fetched) == len(set(fetched))
+    frontier = Frontier(db)
+    assert frontier.get(f"{site.base}/private/draft.pdf")['state'] == 'blocked'
+    assert frontier.get(f"{site.base}/files/missing.pdf")['status'] == 404
+    frontier.close()
+
+
+def test_per_host_concurrency_limit(site, tmp_path):
+    site.delay = 0.05
+    for i in range(12):
+        site.site[f'/files/r{i}.pdf'] = ('application/pdf', b"%%PDF %d" % i)
+    links = ''.join(f'<a href="/files/r{i}.pdf">r</a>' for i in range(12)).encode()
+    site.site['/ir'] = ('text/html', b"<html><body>" + links + b"</body></html>")
+    stats = crawl([f"{site.base}/ir"], str(tmp_path / "frontier.db"), str(tmp_path / "reports"), per_host=3)
+    assert len(stats['new_reports']) == 12
+    assert 1 < site.peak <= 3
+
+
+def test_crawl_esg_disclosures_returns_page_html(site):
+    assert b'/ir/reports' in crawl_esg_disclosures(f"{site.base}/ir").encode()
+    assert crawl_esg_disclosures(f"{site.base}/private/page") == ''
@@ -0,0 +1,143 @@
+"""
+Tests for the streaming XBRL / inline XBRL parser on small local sample filings
+"""
+
+import pytest
+
+from data_ingestion.xbrl_parser import iter_xbrl, load_xbrl, parse_xbrl
+
+INSTANCE = """<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:link="http://www.xbrl.org/2003/linkbase"
+    xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:xbrldi="http://xbrl.org/2006/xbrldi"
+    xmlns:iso4217="http://www.xbrl.org/2003/iso4217" xmlns:utr="http://www.xbrl.org/2009/utr"
+    xmlns:esrs="https://xbrl.efrag.org/taxonomy/esrs/2023-12-22" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+  <link:schemaRef xlink:type="simple" xlink:href="https://xbrl.efrag.org/taxonomy/esrs/2023-12-22/esrs_all.xsd"/>
+  <esrs:GrossScope1GreenhouseGasEmissions contextRef="FY2023" unitRef="tCO2e" decimals="0">12345</esrs:GrossScope1GreenhouseGasEmissions>
+  <xbrli:context id="FY2023"><xbrli:entity><xbrli:identifier scheme="http://standards.iso.org/iso/17442">529900EXAMPLE000LEI</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:startDate>2023-01-01</xbrli:startDate><xbrli:endDate>2023-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+  <xbrli:context id="FY2022"><xbrli:entity><xbrli:identifier scheme="http://standards.iso.org/iso/17442">529900EXAMPLE000LEI</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:startDate>2022-01-01</xbrli:startDate><xbrli:endDate>2022-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+  <xbrli:context id="FY2023_DE"><xbrli:entity><xbrli:identifier scheme="http://standards.iso.org/iso/17442">529900EXAMPLE000LEI</xbrli:identifier>
+    <xbrli:segment><xbrldi:explicitMember dimension="esrs:CountryAxis">esrs:DE</xbrldi:explicitMember></xbrli:segment></xbrli:entity>
+    <xbrli:period><xbrli:startDate>2023-01-01</xbrli:startDate><xbrli:endDate>2023-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+  <xbrli:context id="I2023"><xbrli:entity><xbrli:identifier scheme="http://standards.iso.org/iso/17442">529900EXAMPLE000LEI</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:instant>2023-12-31</xbrli:instant></xbrli:period></xbrli:context>
+  <xbrli:unit id="tCO2e"><xbrli:measure>utr:tCO2e</xbrli:measure></xbrli:unit>
+  <xbrli:unit id="MWh"><xbrli:measure>utr:MWh</xbrli:measure></xbrli:unit>
+  <xbrli:unit id="GWh"><xbrli:measure>utr:GWh</xbrli:measure></xbrli:unit>
+  <xbrli:unit id="ktCO2e"><xbrli:measure>utr:ktCO2e</xbrli:measure></xbrli:unit>
+  <xbrli:unit id="pure"><xbrli:measure>xbrli:pure</xbrli:measure></xbrli:unit>
+  <xbrli:unit id="EUR"><xbrli:measure>iso4217:EUR</xbrli:measure></xbrli:unit>
+  <xbrli:unit id="tCO2ePerEUR"><xbrli:divide><xbrli:unitNumerator><xbrli:measure>utr:tCO2e</xbrli:measure></xbrli:unitNumerator><xbrli:unitDenominator><xbrli:measure>iso4217:EUR</xbrli:measure></xbrli:unitDenominator></xbrli:divide></xbrli:unit>
+  <esrs:GrossScope1GreenhouseGasEmissions contextRef="FY2022" unitRef="tCO2e" decimals="0">13100</esrs:GrossScope1GreenhouseGasEmissions>
+  <esrs:GrossScope1GreenhouseGasEmissions contextRef="FY2023_DE" unitRef="tCO2e" decimals="0">4000</esrs:GrossScope1GreenhouseGasEmissions>
+  <esrs:GrossMarketBasedScope2GreenhouseGasEmissions contextRef="FY2023" unitRef="tCO2e" decimals="0">8200</esrs:GrossMarketBasedScope2GreenhouseGasEmissions>
+  <esrs:TotalEnergyConsumptionRelatedToOwnOperations contextRef="FY2023" unitRef="MWh" decimals="0">54000</esrs:TotalEnergyConsumptionRelatedToOwnOperations>
+  <esrs:PercentageOfRenewableSourcesInTotalEnergyConsumption contextRef="FY2023" unitRef="pure" decimals="2">0.38</esrs:PercentageOfRenewableSourcesInTotalEnergyConsumption>
+  <esrs:EnergyConsumptionFromFossilSources contextRef="FY2023" unitRef="GWh" decimals="1">12.5</esrs:EnergyConsumptionFromFossilSources>
+  <esrs:GrossScope3GreenhouseGasEmissions contextRef="FY2023" unitRef="ktCO2e" decimals="1">310.5</esrs:GrossScope3GreenhouseGasEmissions>
+  <esrs:NumberOfEmployeesHeadCount contextRef="I2023" unitRef="pure" decimals="0">1850</esrs:NumberOfEmployeesHeadCount>
+  <esrs:Revenue contextRef="FY2023" unitRef="EUR" decimals="-3">250000000</esrs:Revenue>
+  <esrs:GHGEmissionsIntensityPerNetRevenue contextRef="FY2023" unitRef="tCO2ePerEUR" decimals="6">0.000082</esrs:GHGEmissionsIntensityPerNetRevenue>
+  <esrs:DescriptionOfTransitionPlan contextRef="FY2023">We aim for net zero by 2040.</esrs:DescriptionOfTransitionPlan>
+  <esrs:Scope3Nil contextRef="FY2023" unitRef="tCO2e" xsi:nil="true"/>
+</xbrli:xbrl>"""
+
+INLINE = """<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"
+      xmlns:ixt="http://www.xbrl.org/inlineXBRL/transformation/2020-02-12" xmlns:xbrli="http://www.xbrl.org/2003/instance"
+      xmlns:xbrldi="http://xbrl.org/2006/xbrldi" xmlns:link="http://www.xbrl.org/2003/linkbase" xmlns:xlink="http://www.w3.org/1999/xlink"
+      xmlns:utr="http://www.xbrl.org/2009/utr" xmlns:iso4217="http://www.xbrl.org/2003/iso4217"
+      xmlns:esrs="https://xbrl.efrag.org/taxonomy/esrs/2023-12-22">
+<head><title>Sustainability statement 2023</title></head>
+<body>
+<div style="display:none"><ix:header><ix:hidden>
+  <ix:nonNumeric name="esrs:NameOfReportingEntity" contextRef="c2023">Beispiel AG</ix:nonNumeric>
+</ix:hidden><ix:references><link:schemaRef xlink:type="simple" xlink:href="esrs_all.xsd"/></ix:references>
+<ix:resources>
+  <xbrli:context id="c2023"><xbrli:entity><xbrli:identifier scheme="http://standards.iso.org/iso/17442">529900BEISPIEL00LEI</xbrli:identifier></xbrli:entity>
+    <xbrli:period><xbrli:startDate>2023-01-01</xbrli:startDate><xbrli:endDate>2023-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+  <xbrli:unit id="u_t"><xbrli:measure>utr:tCO2e</xbrli:measure></xbrli:unit>
+  <xbrli:unit id="u_mwh"><xbrli:measure>utr:MWh</xbrli:measure></xbrli:unit>
+  <xbrli:unit id="u_pure"><xbrli:measure>xbrli:pure</xbrli:measure></xbrli:unit>
+</ix:resources></ix:header></div>
+<h1>E1 Climate change</h1>
+<ix:nonNumeric name="esrs:DisclosureOfTransitionPlanForClimateChangeMitigation" contextRef="c2023">
+  <p>Our transition plan targets a reduction of Scope 1 emissions to
+  <ix:nonFraction name="esrs:GrossScope1GreenhouseGasEmissions" contextRef="c2023" unitRef="u_t" decimals="0" scale="3" format="ixt:num-dot-decimal">12.3</ix:nonFraction>
+  thousand tonnes.<ix:exclude> (see page 4)</ix:exclude></p>
+</ix:nonNumeric>
+<table>
+  <tr><td>Total energy consumption (MWh)</td><td><ix:nonFraction name="esrs:TotalEnergyConsumptionRelatedToOwnOperations" contextRef="c2023" unitRef="u_mwh" decimals="0" format="ixt:num-comma-decimal">54.000</ix:nonFraction></td></tr>
+  <tr><td>Share of renewable sources</td><td><ix:nonFraction name="esrs:PercentageOfRenewableSourcesInTotalEnergyConsumption" contextRef="c2023" unitRef="u_pure" decimals="2" scale="-2" format="ixt:num-dot-decimal">38</ix:nonFraction> %</td></tr>
+  <tr><td>Scope 1 (repeated in summary)</td><td><ix:nonFraction name="esrs:GrossScope1GreenhouseGasEmissions" contextRef="c2023" unitRef="u_t" decimals="0" scale="3" format="ixt:num-dot-decimal">12.3</ix:nonFraction></td></tr>
+  <tr><td>Water intensity</td><td><ix:nonFraction name="esrs:WaterIntensity" contextRef="c2023" unitRef="u_pure" decimals="4" scale="-2" format="ixt:num-dot-decimal">0.07</ix:nonFraction></td></tr>
+  <tr><td>Water intensity (summary)</td><td><ix:nonFraction name="esrs:WaterIntensity" contextRef="c2023" unitRef="u_pure" decimals="4" scale="-4" format="ixt:num-dot-decimal">7</ix:nonFraction></td></tr>
+  <tr><td>Fatalities</td><td><ix:nonFraction name="esrs:NumberOfFatalitiesInOwnWorkforce" contextRef="c2023" unitRef="u_pure" decimals="0" format="ixt:fixed-zero">-</ix:nonFraction></td></tr>
+</table>
+</body></html>"""
+
+
+@pytest.fixture
+def instance(tmp_path):
+    path = tmp_path / "esrs_instance.xbrl"
+    path.write_text(INSTANCE, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def inline(tmp_path):
+    path = tmp_path / "sustainability_statement.xhtml"
+    path.write_text(INLINE, encoding='utf-8')
+    return str(path)
+
+
+def test_instance_contexts_units_and_concept_index(instance):
+    index = load_xbrl(instance)
+    assert index.units['tCO2ePerEUR'] == 'utr:tCO2e/iso4217:EUR'
+    assert index.contexts['FY2023_DE']['dimensions'] == {'esrs:CountryAxis': 'esrs:DE'}
+    assert index.periods('GrossScope1GreenhouseGasEmissions') == [('2022-01-01', '2022-12-31'),
+                                                                  ('2023-01-01', '2023-12-31')]
+    totals = index.get('esrs:GrossScope1GreenhouseGasEmissions', year=2023, dimensions={})
+    assert [(f['value'], f['unit'], f['entity']) for f in totals] == [(12345.0, 'utr:tCO2e', '529900EXAMPLE000LEI')]
+    assert [f['value'] for f in index.get('GrossScope1GreenhouseGasEmissions',
+                                          dimensions={'esrs:CountryAxis': 'esrs:DE'})] == [4000.0]
+    headcount = index.get('NumberOfEmployeesHeadCount', period=(None, '2023-12-31'))
+    assert headcount[0]['value'] == 1850.0 and headcount[0]['period_start'] is None
+    assert index.get('Scope3Nil')[0]['value'] is None
+    assert index.get('DescriptionOfTransitionPlan')[0]['value'] == "We aim for net zero by 2040."
+
+
+def test_instance_facts_map_to_kpis(instance):
+    kpis = parse_xbrl(instance)['kpis']
+    assert [(k['name'], k['value'], k['metric_type'], k['year']) for k in kpis] == [
+        ("Scope 1 Emissions", "12,345", 'tCO2e', 2023),
+        ("Scope 1 Emissions", "13,100", 'tCO2e', 2022),
+        ("Scope 2 Emissions (market-based)", "8,200", 'tCO2e', 2023),
+        ("Energy Consumption", "54,000", 'MWh', 2023),
+        ("Renewable Energy Share", "38%", 'percentage', 2023),
+        ("Energy Consumption", "12,500", 'MWh', 2023),
+        ("Scope 3 Emissions", "310,500", 'tCO2e', 2023),
+        ("Total Employees", "1,850", 'count', 2023),
+    ]
+    # Facts in GWh and ktCO2e are converted, so value, metric_type and unit agree
+    assert all(k['unit'] == k['metric_type'] for k in kpis if k['metric_type'] in ('MWh', 'tCO2e'))
+    assert {k['extraction_method'] for k in kpis} == {'xbrl'} and kpis[0]['category'] == 'environmental'
+    assert kpis[0]['concept'] == 'esrs:GrossScope1GreenhouseGasEmissions'
+
+
+def test_inline_xbrl_transformations_and_text_blocks(inline):
+    kinds = [kind for kind, _ in iter_xbrl(inline)]
+    assert kinds.count('context') == 1 and kinds.count('unit') == 3
+    index = load_xbrl(inline)
+    assert len(index.get('GrossScope1GreenhouseGasEmissions')) == 1  # Tagged twice, same fact
+    assert index.get('GrossScope1GreenhouseGasEmissions')[0]['value'] == 12300.0
+    assert index.get('TotalEnergyConsumptionRelatedToOwnOperations')[0]['value'] == 54000.0
+    assert index.get('PercentageOfRenewableSourcesInTotalEnergyConsumption')[0]['value'] == pytest.approx(0.38)
+    assert index.get('NumberOfFatalitiesInOwnWorkforce')[0]['value'] == 0.0
+    # Scaled in decimal: the same value shown with different scales is one fact, without float noise
+    assert [f['value'] for f in index.get('WaterIntensity')] == [0.0007]
+    assert index.get('DisclosureOfTransitionPlanForClimateChangeMitigation')[0]['value'] == (
+        "Our transition plan targets a reduction of Scope 1 emissions to 12.3 thousand tonnes.")
+    assert [(k['name'], k['value']) for k in index.to_kpis()] == [
+        ("Scope 1 Emissions", "12,300"), ("Energy Consumption", "54,000"), ("Renewable Energy Share", "38%")]
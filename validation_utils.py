@@ -5,7 +5,11 @@ Provides functions for data validation, confidence scoring, and quality control
 
 import re
 import json
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+import numpy as np
+
+from kpi_table import KpiTable, MISSING
 
 def validate_metric_units(metric_type: str, category: str) -> bool:
     """Validate if metric units are appropriate for the category"""
@@ -46,6 +50,45 @@ def validate_value_range(value: str, metric_type: str) -> bool:
     except:
         return True  # If can't parse, assume valid
 
+# Rules that need the original case: 'Mt' is million tonnes, while 'mt' often means metric tonnes
+_CASED_UNIT_RULES = [
+    (re.compile(r'\bMt\s*(?i:co2)'), 'tCO2e', 1e6),
+]
+# (pattern, canonical unit, factor to convert into the canonical unit); first match wins
+_UNIT_RULES = [
+    (re.compile(r'\bmega ?ton(?:ne)?s?\b.*co2'), 'tCO2e', 1e6),
+    (re.compile(r'\bkt\s*co2|kilo ?ton(?:ne)?s?\b.*co2'), 'tCO2e', 1e3),
+    (re.compile(r'\bkg\s*(?:of\s*)?co2|kilograms?\b.*co2'), 'tCO2e', 1e-3),
+    (re.compile(r'co2'), 'tCO2e', 1.0),
+    (re.compile(r'\bgwh\b'), 'MWh', 1e3),
+    (re.compile(r'\bmwh\b'), 'MWh', 1.0),
+    (re.compile(r'\bkwh\b'), 'MWh', 1e-3),
+    (re.compile(r'\bgj\b'), 'MWh', 1 / 3.6),
+    (re.compile(r'megalit(?:er|re)s?'), 'm3', 1e3),
+    (re.compile(r'cubic met(?:er|re)s?|\bm3\b|m³'), 'm3', 1.0),
+    (re.compile(r'lit(?:er|re)s?\b'), 'm3', 1e-3),
+    (re.compile(r'%|percent'), '%', 1.0),
+    (re.compile(r'\bkg\b|kilograms?'), 't', 1e-3),
+    (re.compile(r'ton(?:ne)?s?\b|\bt\b'), 't', 1.0),
+    (re.compile(r'\bhours?\b|\bhrs?\b'), 'hours', 1.0),
+    (re.compile(r'\bdays?\b'), 'days', 1.0),
+    (re.compile(r'count|number|employees|people|persons|members|directors|headcount|\bfte\b'), 'count', 1.0),
+]
+
+def normalize_unit(metric_type: str) -> Tuple[str, float]:
+    """Map a free-text unit to (canonical unit, conversion factor), e.g. 'kgCO2e' -> ('tCO2e', 0.001)"""
+    cased = ' '.join((metric_type or '').split())
+    text = cased.lower()
+    if '/' in text or ' per ' in text:
+        return text, 1.0  # Intensities only compare with the same denominator
+    for pattern, canonical, factor in _CASED_UNIT_RULES:
+        if pattern.search(cased):
+            return canonical, factor
+    for pattern, canonical, factor in _UNIT_RULES:
+        if pattern.search(text):
+            return canonical, factor
+    return text, 1.0
+
 def calculate_confidence_score(name: str, value: str, metric_type: str, reference: str) -> Tuple[int, str]:
     """Calculate confidence score and reasoning"""
     score = 50  # Base score
@@ -97,8 +140,11 @@ def validate_response_quality(response_text: str) -> bool:
     except:
         return False
 
-def detect_duplicate_metrics(kpis: List[Dict]) -> List[Dict]:
-    """Detect and flag duplicate metrics"""
+def detect_duplicate_metrics(kpis: Union[List[Dict], KpiTable]) -> Union[List[Dict], KpiTable]:
+    """Detect and flag duplicate metrics (a KpiTable input returns a KpiTable of the duplicates)"""
+    if isinstance(kpis, KpiTable):
+        return kpis.take(kpis.duplicate_rows())
+
     seen = set()
     duplicates = []
     
@@ -113,14 +159,24 @@ def detect_duplicate_metrics(kpis: List[Dict]) -> List[Dict]:
     
     return duplicates
 
-def validate_temporal_consistency(kpis: List[Dict]) -> List[str]:
-    """Validate temporal consistency across KPIs"""
+def validate_temporal_consistency(kpis: Union[List[Dict], KpiTable], company: Optional[str] = None,
+                                  history: Optional[Any] = None) -> List[str]:
+    """Validate temporal consistency across KPIs, and against prior years when a KpiHistoryIndex is given"""
     warnings = []
-    years = [kpi.get('year') for kpi in kpis if kpi.get('year')]
+    if isinstance(kpis, KpiTable) and not kpis.has_extra('year'):
+        years = kpis.column('year')
+        distinct_years = len(np.unique(years[(years != MISSING) & (years != 0)]))
+    else:
+        # A string year such as '2023' stays distinct from 2023, as in a list of dicts
+        distinct_years = len(set(kpi.get('year') for kpi in kpis if kpi.get('year')))
     
-    if len(set(years)) > 3:
+    if distinct_years > 3:
         warnings.append("Multiple reporting years detected - verify temporal consistency")
     
+    if history is not None and company is not None:
+        records = kpis.to_records() if isinstance(kpis, KpiTable) else kpis
+        warnings.extend(history.temporal_warnings(company, records))
+    
     return warnings
 
 def enhance_kpi_with_validation(kpi: Dict) -> Dict:
@@ -169,9 +225,9 @@ def enhance_kpi_with_validation(kpi: Dict) -> Dict:
     
     return kpi
 
-def generate_extraction_metadata(kpis: List[Dict]) -> Dict:
+def generate_extraction_metadata(kpis: Union[List[Dict], KpiTable]) -> Dict:
     """Generate metadata about the extraction process"""
-    if not kpis:
+    if not len(kpis):
         return {
             "total_metrics_found": 0,
             "average_confidence": 0,
@@ -180,13 +236,20 @@ def generate_extraction_metadata(kpis: List[Dict]) -> Dict:
             "processing_notes": "No metrics found"
         }
     
-    confidence_scores = [kpi.get('confidence_score', 0) for kpi in kpis]
-    validation_errors = sum(1 for kpi in kpis if kpi.get('validation_status') == 'error')
-    warnings = sum(1 for kpi in kpis if kpi.get('validation_status') == 'warning')
+    if isinstance(kpis, KpiTable):
+        # Like kpi.get('confidence_score', 0): a KPI without a score counts as 0
+        average_confidence = float(np.nan_to_num(kpis.column('confidence_score')).mean())
+        validation_errors = int(np.count_nonzero(kpis.equals('validation_status', 'error')))
+        warnings = int(np.count_nonzero(kpis.equals('validation_status', 'warning')))
+    else:
+        confidence_scores = [kpi.get('confidence_score', 0) for kpi in kpis]
+        average_confidence = sum(confidence_scores) / len(confidence_scores)
+        validation_errors = sum(1 for kpi in kpis if kpi.get('validation_status') == 'error')
+        warnings = sum(1 for kpi in kpis if kpi.get('validation_status') == 'warning')
     
     return {
         "total_metrics_found": len(kpis),
-        "average_confidence": round(sum(confidence_scores) / len(confidence_scores), 1),
+        "average_confidence": round(average_confidence, 1),
         "validation_errors": validation_errors,
         "warnings": warnings,
         "processing_notes": f"Extracted {len(kpis)} metrics with {validation_errors} errors and {warnings} warnings"